@@ -2,6 +2,7 @@
 Implementation of the factory pattern.
 '''
 from collections.abc import Callable
+import importlib
 import logging
 
 from main.core.configuration import ConfigurationException
@@ -13,6 +14,8 @@ class Factory(Singleton):
     '''
     A class that acts as a repository for mapping configuration types to implementations
     and constructs instances of implementation classes based on configuration.
+    Types can also be registered by the name of the module that implements them,
+    in which case the module is only imported when the type is first constructed.
     '''
 
     def __init__(self) -> None:
@@ -20,6 +23,7 @@ class Factory(Singleton):
         if self.initialised:
             return
         self.types: dict[str, Callable] = {}
+        self.modules: dict[str, str] = {}
         self.initialised: bool = True
 
     def construct(self, type_: str, **kwargs) -> object:
@@ -30,6 +34,10 @@ class Factory(Singleton):
         previously. If either of those conditions is not fulfilled, the method will
         raise a ConfigurationException.
         '''
+        if type_ not in self.types and type_ in self.modules:
+            logger.debug('Importing %s for type %s', self.modules[type_], type_)
+            # the module registers its classes with the factory when it is imported
+            importlib.import_module(self.modules[type_])
         if type_ not in self.types:
             raise ConfigurationException(
                 'Could not find a type adapter for type ' + type_ +
@@ -44,6 +52,15 @@ class Factory(Singleton):
         logger.debug('Registering %s as type %s for factory %s', cls, type_, self.__class__)
         self.types[type_] = cls
 
+    def register_module(self, type_: str, module_name: str):
+        '''
+        Register the module that implements a type with the factory,
+        without importing the module.
+        '''
+        logger.debug('Registering %s as module for type %s for factory %s',
+                     module_name, type_, self.__class__)
+        self.modules[type_] = module_name
+
 
 def factory_register(type_: str, factory: Factory):
     '''
@@ -52,4 +69,5 @@ def factory_register(type_: str, factory: Factory):
     def specific_factory_register(cls: type):
         logger.debug('Registering %s as type %s for factory %s', cls, type_, factory.__class__)
         factory.types[type_] = cls
+        return cls
     return specific_factory_register
@@ -1,16 +1,46 @@
 '''
 Logic to run, end-to-end, the Pokemon team evaluation engine.
 '''
+import logging
+
 from main.core.configuration import configure
+from main.handler.checkpoint import get_partition_fingerprint, is_enrichment_complete, \
+    is_partition_complete, is_resumed
 from main.handler.distribute import handler as distribute_handler
-from main.handler.enrich import handler as enrich_handler
-from main.handler.evaluate import handler as evaluate_handler
+from main.handler.enrich import get_enrichment_fingerprints, handler as enrich_handler
+from main.handler.evaluate import worker_handler as evaluate_worker_handler
 from main.handler.reduce import handler as reduce_handler
+from main.store import read_store, DataType
 
-if __name__ == '__main__':
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+def handler() -> None:
+    '''
+    Run the calculation end to end. When resuming from the run manifest, the
+    enriched libraries and partition results that were stored from the same
+    inputs by an earlier run are reused rather than calculated again.
+    '''
     configure()
-    enrich_handler()
-    partitions = distribute_handler()
-    for partition in partitions:
-        evaluate_handler(event={'permutation': partition}, context={})
+    resumed: bool = is_resumed()
+    fingerprints: dict[str, str] = get_enrichment_fingerprints()
+    pending_enrichment: list[str] = [
+        evaluation_name for evaluation_name, fingerprint in fingerprints.items()
+        if not (resumed and is_enrichment_complete(evaluation_name, fingerprint))]
+    logger.info('Reusing %d of %d enriched libraries',
+                len(fingerprints) - len(pending_enrichment), len(fingerprints))
+    if len(pending_enrichment) > 0:
+        enrich_handler(pending_enrichment)
+    partitions: list[str] = distribute_handler()
+    pending_partitions: list[str] = [
+        permutation for permutation in partitions
+        if not (resumed and is_partition_complete(permutation, get_partition_fingerprint(
+            fingerprints[permutation.split('.')[0]],
+            read_store(DataType.PARTITION, page_title=permutation))))]
+    logger.info('Reusing %d of %d partition results',
+                len(partitions) - len(pending_partitions), len(partitions))
+    evaluate_worker_handler(event={'permutations': pending_partitions}, context={})
     reduce_handler()
+
+if __name__ == '__main__':
+    handler()
@@ -0,0 +1,143 @@
+'''
+Logic to record the progress of a calculation in a durable run manifest,
+so that an interrupted calculation can be resumed without redoing the
+enrichment and the partitions that had already been completed.
+
+The manifest has a page per enriched library, titled with the name of its
+evaluation, and a page per completed partition, titled with the name of the
+partition. Each page records a fingerprint of the inputs that the stored
+data was calculated from, and where the data was stored. A partition size
+that was tuned to the speed of the engine is recorded as well, since the
+partitions, and so the checkpoints of their results, depend on it.
+'''
+import hashlib
+import logging
+from pandas import DataFrame
+
+from main.core.configuration import ConfigurationService
+from main.store import get_fingerprint, read_store, write_store, DataType
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT = 'fingerprint'
+LOCATION = 'location'
+# the column, and the suffix of the page title, with which the manifest records
+# the partition size that an evaluation was distributed with
+PARTITION_SIZE = 'partition-size'
+# data stores whose contents do not outlive the process that wrote them
+VOLATILE_STORES = ['memory']
+
+def _get_location(data_type: DataType, page_title: str) -> str:
+    store_type: str = ConfigurationService().get_configuration_property(
+        'store.' + data_type.value)
+    return store_type + ':' + data_type.value + '.' + page_title
+
+def _is_volatile(data_type: DataType) -> bool:
+    return ConfigurationService().get_configuration_property(
+        'store.' + data_type.value) in VOLATILE_STORES
+
+def _record(page_title: str, fingerprint: str, location: str) -> None:
+    write_store(
+        DataType.MANIFEST,
+        DataFrame({FINGERPRINT: [fingerprint], LOCATION: [location]}),
+        page_title=page_title)
+
+def _is_recorded(page_title: str, fingerprint: str, location: str) -> bool:
+    entry: DataFrame = read_store(DataType.MANIFEST, page_title=page_title)
+    return not entry.empty and entry[FINGERPRINT].values[0] == fingerprint \
+        and entry[LOCATION].values[0] == location
+
+def is_enabled() -> bool:
+    '''
+    Whether a data store is configured for the run manifest.
+    '''
+    return ConfigurationService().get_configuration_property(
+        'store.' + DataType.MANIFEST.value, '') != ''
+
+def is_resumed() -> bool:
+    '''
+    Whether the calculation should resume from the run manifest,
+    rather than start from scratch.
+    '''
+    return is_enabled() and str(ConfigurationService().get_configuration_property(
+        'resume', 'false')).lower() == 'true'
+
+def combine_fingerprints(fingerprints: list[str]) -> str:
+    '''
+    Compute a single fingerprint that changes whenever any of the provided ones does.
+    '''
+    return hashlib.sha1('\0'.join(fingerprints).encode('utf8')).hexdigest()
+
+def record_enrichment(evaluation_name: str, fingerprint: str) -> None:
+    '''
+    Record that the enriched library for the evaluation was stored,
+    along with the fingerprint of the inputs of the enrichment.
+    '''
+    if is_enabled():
+        _record(evaluation_name, fingerprint,
+                _get_location(DataType.ENRICHED_LIBRARY, evaluation_name))
+
+def get_enrichment_fingerprint(evaluation_name: str) -> str:
+    '''
+    Retrieve the recorded fingerprint of the inputs of the enriched library
+    for the evaluation, or an empty string if none is recorded.
+    '''
+    if not is_enabled():
+        return ''
+    entry: DataFrame = read_store(DataType.MANIFEST, page_title=evaluation_name)
+    return '' if entry.empty else entry[FINGERPRINT].values[0]
+
+def is_enrichment_complete(evaluation_name: str, fingerprint: str) -> bool:
+    '''
+    Whether the enriched library for the evaluation was stored from the same
+    inputs in an earlier run, and can still be read.
+    '''
+    return not _is_volatile(DataType.ENRICHED_LIBRARY) and _is_recorded(
+        evaluation_name, fingerprint, _get_location(DataType.ENRICHED_LIBRARY, evaluation_name)) \
+        and not read_store(DataType.ENRICHED_LIBRARY, page_title=evaluation_name).empty
+
+def record_partition_size(evaluation_name: str, partition_size: int) -> None:
+    '''
+    Record the partition size that the evaluation was distributed with,
+    along with the fingerprint of the inputs of its enriched library.
+    '''
+    if is_enabled():
+        write_store(
+            DataType.MANIFEST,
+            DataFrame({
+                FINGERPRINT: [get_enrichment_fingerprint(evaluation_name)],
+                PARTITION_SIZE: [partition_size]}),
+            page_title=evaluation_name + '.' + PARTITION_SIZE)
+
+def get_partition_size(evaluation_name: str) -> int:
+    '''
+    Retrieve the partition size that an earlier run distributed the evaluation with,
+    when resuming with the same enriched library, or None otherwise.
+    '''
+    if not is_resumed():
+        return None
+    entry: DataFrame = read_store(
+        DataType.MANIFEST, page_title=evaluation_name + '.' + PARTITION_SIZE)
+    if entry.empty or entry[FINGERPRINT].values[0] != get_enrichment_fingerprint(evaluation_name):
+        return None
+    return int(entry[PARTITION_SIZE].values[0])
+
+def get_partition_fingerprint(enrichment_fingerprint: str, partition: DataFrame) -> str:
+    '''
+    Compute the fingerprint of the inputs of a partition result.
+    '''
+    return combine_fingerprints([enrichment_fingerprint, get_fingerprint(partition)])
+
+def record_partition(permutation: str, fingerprint: str) -> None:
+    '''
+    Record that the result of the partition was stored.
+    '''
+    if is_enabled():
+        _record(permutation, fingerprint, _get_location(DataType.PARTITION_RESULT, permutation))
+
+def is_partition_complete(permutation: str, fingerprint: str) -> bool:
+    '''
+    Whether the result of the partition was stored from the same inputs in an earlier run.
+    '''
+    return not _is_volatile(DataType.PARTITION_RESULT) and _is_recorded(
+        permutation, fingerprint, _get_location(DataType.PARTITION_RESULT, permutation))
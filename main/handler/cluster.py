@@ -0,0 +1,286 @@
+'''
+Logic to evaluate partitions on several machines: a coordinator serves the
+partitions as work items over TCP to any number of worker processes, which
+evaluate them and upload their results back to the coordinator.
+
+Every request is a single line of JSON on a new connection, answered by a
+single line of JSON. Workers send heartbeats while they work, and the work
+of a worker that has not been heard from for the heartbeat timeout is handed
+to another worker.
+'''
+from collections import deque
+from typing import Any
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pandas import DataFrame
+
+from main.core.configuration import configure, ConfigurationService
+from main.handler.checkpoint import get_enrichment_fingerprint, get_partition_fingerprint, \
+    record_partition
+from main.handler.evaluate import evaluate_partition, get_library_key, get_results_diversity, \
+    to_partition_result
+from main.model.equivalence import Diversity, EquivalenceClasses
+from main.model.evaluation import retrieve_evaluations, Evaluation, EvaluationColumn
+from main.store import flush_store, get_fingerprint, read_store, write_store, DataType
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_HEARTBEAT_INTERVAL = 5
+DEFAULT_HEARTBEAT_TIMEOUT = 30
+
+def _get_cluster_property(key: str, default: Any) -> Any:
+    return ConfigurationService().get_configuration_property('cluster.' + key, default)
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        request: dict[str, Any] = json.loads(self.rfile.readline())
+        response: dict[str, Any] = self.server.coordinator.handle(request)
+        self.wfile.write(json.dumps(response).encode('utf8') + b'\n')
+
+class Coordinator:  # pylint: disable=too-many-instance-attributes
+    '''
+    Serves partitions to workers and stores the results that they upload.
+    Each partition is stored once, even if it was evaluated more than once
+    because its worker was presumed dead.
+    '''
+    def __init__(
+            self,
+            permutations: list[str],
+            address: tuple[str, int],
+            heartbeat_timeout: float) -> None:
+        self.pending: deque[str] = deque(permutations)
+        # partition name -> worker that is evaluating it
+        self.assigned: dict[str, str] = {}
+        self.completed: set[str] = set()
+        self.total: int = len(permutations)
+        self.last_seen: dict[str, float] = {}
+        self.heartbeat_timeout: float = heartbeat_timeout
+        self.evaluations: dict[str, dict[str, Any]] = None
+        # evaluation name -> key of the enriched library served to the workers
+        self.library_keys: dict[str, int] = {}
+        self.lock: threading.Lock = threading.Lock()
+        self.finished: threading.Event = threading.Event()
+        if self.total == 0:
+            self.finished.set()
+        self.server: socketserver.ThreadingTCPServer = socketserver.ThreadingTCPServer(
+            address, _RequestHandler)
+        self.server.daemon_threads = True
+        self.server.coordinator = self
+
+    @property
+    def address(self) -> tuple[str, int]:
+        '''
+        The host and port that the coordinator listens on.
+        '''
+        return self.server.server_address
+
+    def serve(self) -> None:
+        '''
+        Serve work items until the results of all partitions have been stored.
+        '''
+        thread: threading.Thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+        self.finished.wait()
+        self.server.shutdown()
+        self.server.server_close()
+        thread.join()
+
+    def _reassign_dead_work(self) -> None:
+        now: float = time.monotonic()
+        for permutation, worker in list(self.assigned.items()):
+            if now - self.last_seen.get(worker, 0) > self.heartbeat_timeout:
+                logger.warning('Worker %s presumed dead, reassigning %s', worker, permutation)
+                del self.assigned[permutation]
+                self.pending.appendleft(permutation)
+
+    def _next_work(self, worker: str) -> dict[str, Any]:
+        with self.lock:
+            self._reassign_dead_work()
+            if len(self.completed) == self.total:
+                return {'type': 'done'}
+            if len(self.pending) == 0:
+                return {'type': 'wait'}
+            permutation: str = self.pending.popleft()
+            self.assigned[permutation] = worker
+        partition: DataFrame = read_store(DataType.PARTITION, page_title=permutation)
+        return {
+            'type': 'work',
+            'permutation': permutation,
+            'partition': partition.to_dict('list'),
+            'results-size': int(ConfigurationService().get_configuration_property('results-size')),
+            'results-diversity': get_results_diversity().value,
+        }
+
+    def _get_library(self, evaluation_name: str) -> dict[str, Any]:
+        if self.evaluations is None:
+            self.evaluations = {
+                row[EvaluationColumn.EVALUATION_NAME.value]: row
+                for row in read_store(DataType.EVALUATION).to_dict('records')}
+        library: DataFrame = read_store(DataType.ENRICHED_LIBRARY, page_title=evaluation_name)
+        self.library_keys[evaluation_name] = get_library_key(get_fingerprint(library))
+        return {
+            'type': 'library',
+            'evaluation': self.evaluations[evaluation_name],
+            'library': library.to_dict('records'),
+        }
+
+    def _store_result(self, permutation: str, result: dict[str, list]) -> dict[str, Any]:
+        with self.lock:
+            if permutation in self.completed:
+                return {'type': 'ok'}
+            self.assigned.pop(permutation, None)
+            if permutation in self.pending:
+                self.pending.remove(permutation)
+            self.completed.add(permutation)
+        write_store(
+            DataType.PARTITION_RESULT,
+            to_partition_result(
+                result['positions'],
+                result['result'],
+                self.library_keys[permutation.split('.')[0]]),
+            page_title=permutation)
+        record_partition(permutation, get_partition_fingerprint(
+            get_enrichment_fingerprint(permutation.split('.')[0]),
+            read_store(DataType.PARTITION, page_title=permutation)))
+        logger.info('Stored the result of %s, %d of %d partitions completed',
+                    permutation, len(self.completed), self.total)
+        if len(self.completed) == self.total:
+            self.finished.set()
+        return {'type': 'ok'}
+
+    def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        '''
+        Answer a request from a worker.
+        '''
+        with self.lock:
+            self.last_seen[request['worker']] = time.monotonic()
+        if request['type'] == 'request':
+            return self._next_work(request['worker'])
+        if request['type'] == 'library':
+            return self._get_library(request['evaluation'])
+        if request['type'] == 'result':
+            return self._store_result(request['permutation'], request['result'])
+        return {'type': 'ok'}
+
+def _send(address: tuple[str, int], message: dict[str, Any]) -> dict[str, Any]:
+    with socket.create_connection(address) as connection:
+        connection.sendall(json.dumps(message).encode('utf8') + b'\n')
+        with connection.makefile('rb') as response:
+            return json.loads(response.readline())
+
+def _send_heartbeats(
+        address: tuple[str, int],
+        worker: str,
+        interval: float,
+        stopped: threading.Event) -> None:
+    while not stopped.wait(interval):
+        try:
+            _send(address, {'type': 'heartbeat', 'worker': worker})
+        except OSError:
+            return
+
+def run_worker(address: tuple[str, int], heartbeat_interval: float) -> int:
+    '''
+    Evaluate partitions served by the coordinator at the provided address until
+    there are none left, or the coordinator goes away. Returns the number of
+    partitions that the worker evaluated.
+    '''
+    worker: str = socket.gethostname() + '-' + str(os.getpid()) + '-' + uuid.uuid4().hex[:8]
+    libraries: dict[str, tuple[list[dict[str, Any]], Evaluation, EquivalenceClasses]] = {}
+    stopped: threading.Event = threading.Event()
+    threading.Thread(
+        target=_send_heartbeats,
+        args=(address, worker, heartbeat_interval, stopped),
+        daemon=True).start()
+    counter: int = 0
+    try:
+        while True:
+            work: dict[str, Any] = _send(address, {'type': 'request', 'worker': worker})
+            if work['type'] == 'done':
+                break
+            if work['type'] == 'wait':
+                time.sleep(heartbeat_interval)
+                continue
+            evaluation_name: str = work['permutation'].split('.')[0]
+            if evaluation_name not in libraries:
+                library: dict[str, Any] = _send(
+                    address, {'type': 'library', 'worker': worker, 'evaluation': evaluation_name})
+                libraries[evaluation_name] = (
+                    library['library'],
+                    retrieve_evaluations(DataFrame([library['evaluation']]))[0],
+                    EquivalenceClasses(
+                        DataFrame(library['library']), Diversity(work['results-diversity'])))
+            rows, evaluation, classes = libraries[evaluation_name]
+            result = evaluate_partition(
+                DataFrame(work['partition']), rows, evaluation, work['results-size'], classes)
+            _send(address, {
+                'type': 'result',
+                'worker': worker,
+                'permutation': work['permutation'],
+                'result': {
+                    'positions': [[int(i) for i in r.positions] for r in result],
+                    'result': [r.result for r in result]
+                },
+            })
+            counter += 1
+    except ConnectionError:
+        logger.info('Coordinator at %s:%d has gone away', *address)
+    finally:
+        stopped.set()
+    return counter
+
+def start_local_workers(address: tuple[str, int], count: int) -> list[subprocess.Popen]:
+    '''
+    Start worker processes on this machine that connect to the coordinator.
+    '''
+    return [
+        subprocess.Popen([  # pylint: disable=consider-using-with
+            sys.executable, '-m', __name__,
+            'cluster.host=' + address[0],
+            'cluster.port=' + str(address[1]),
+            'cluster.heartbeat-interval=' + str(_get_cluster_property(
+                'heartbeat-interval', DEFAULT_HEARTBEAT_INTERVAL)),
+        ])
+        for _ in range(count)]
+
+def coordinator_handler(event: dict[str, Any], context: dict[str, Any]) -> None:
+    '''
+    Serve the partitions with the provided names to workers on any machine,
+    and store their results, returning once all results are stored. Optionally
+    starts <cluster.local-workers> worker processes on this machine as well.
+    '''
+    configure()
+    coordinator: Coordinator = Coordinator(
+        event['permutations'],
+        (_get_cluster_property('host', DEFAULT_HOST), int(_get_cluster_property('port', 0))),
+        float(_get_cluster_property('heartbeat-timeout', DEFAULT_HEARTBEAT_TIMEOUT)))
+    logger.info('Coordinator listening on %s:%d', *coordinator.address)
+    workers: list[subprocess.Popen] = start_local_workers(
+        coordinator.address, int(_get_cluster_property('local-workers', 0)))
+    coordinator.serve()
+    for worker in workers:
+        worker.wait()
+    flush_store()
+
+def worker_handler(event: dict[str, Any], context: dict[str, Any]) -> int:
+    '''
+    Evaluate partitions served by the coordinator at <cluster.host>:<cluster.port>.
+    '''
+    configure()
+    return run_worker(
+        (_get_cluster_property('host', DEFAULT_HOST), int(_get_cluster_property('port', 0))),
+        float(_get_cluster_property('heartbeat-interval', DEFAULT_HEARTBEAT_INTERVAL)))
+
+if __name__ == '__main__':
+    worker_handler({}, {})
@@ -3,17 +3,33 @@ Logic to distribute the calculation into similarly-sized partitions
 that can be mapped by applying an evaluation function onto the subset
 of the Pokemon library.
 '''
+import datetime
 import logging
 from math import floor
+import time
+import numpy
 from pandas import DataFrame
 
 from main.core.configuration import configure, ConfigurationService
-from main.model.evaluation import EvaluationColumn
-from main.store import read_store, write_store, DataType
+from main.handler.checkpoint import get_partition_size, record_partition_size
+from main.handler.evaluate import evaluate_partition, get_results_diversity
+from main.model.equivalence import EquivalenceClasses
+from main.model.evaluation import retrieve_evaluations, Evaluation
+from main.store import flush_store, read_store, write_store, DataType
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# the partition size with which the partition size is tuned to the speed of the engine
+AUTO_PARTITION_SIZE = 'auto'
+# the time, in seconds, that evaluating a partition should take when tuning the partition size
+DEFAULT_PARTITION_RUNTIME = 60
+# the number of equivalence classes whose teams are evaluated to measure the speed of the engine
+CALIBRATION_CLASSES = 10
+# the column of the partition page, titled with the name of an evaluation, that records
+# how many partitions the latest run created for the evaluation
+PARTITIONS = 'partitions'
+
 def _create_permutations(partitions: list[tuple[int]]) -> list[DataFrame]:
     permutations: list[DataFrame] = []
     for i, partition_1 in enumerate(partitions):
@@ -26,31 +42,160 @@ def _create_permutations(partitions: list[tuple[int]]) -> list[DataFrame]:
                 }))
     return permutations
 
-def _partition(n: int) -> list[tuple[int]]:
-    partition_size: int = ConfigurationService().get_configuration_property('partition-size')
-    block_size: int = floor(partition_size ** (1./3))
+def _partition(n: int, partition_size: int) -> list[tuple[int]]:
+    block_size: int = max(1, floor(partition_size ** (1./3)))
     blocks: list[tuple[int]] = []
     for i in range(0, n, block_size):
-        blocks.append((i, min(i + block_size, n) - 1))
+        blocks.append((i, min(i + block_size, n)))
     return blocks
 
+def get_class_masks(
+        library: DataFrame,
+        evaluation: Evaluation,
+        classes: EquivalenceClasses) -> numpy.ndarray:
+    '''
+    Compile the team rules of the evaluation into a bitmask per equivalence class,
+    from the Pokemon that represents the class, as evaluate_partition does.
+    '''
+    return numpy.array([
+        evaluation.get_team_mask(pokemon) for pokemon in
+        library.iloc[classes.representatives].to_dict('records')], dtype=numpy.int64)
+
+def _count_allowed(pair_masks: numpy.ndarray, third_masks: numpy.ndarray) -> numpy.ndarray:
+    # the number of third classes whose masks allow each pair of first and second classes,
+    # counted per distinct mask, since the team rules only involve a few types
+    distinct_thirds, third_counts = numpy.unique(third_masks, return_counts=True)
+    distinct_pairs, pairs = numpy.unique(pair_masks, return_inverse=True)
+    return (((distinct_pairs[:, None] & distinct_thirds[None, :]) == 0) @ \
+        third_counts)[pairs.reshape(pair_masks.shape)]
+
+def count_teams(
+        partition: DataFrame,
+        sizes: numpy.ndarray,
+        masks: numpy.ndarray = None) -> int:
+    '''
+    Count the teams that evaluating the partition scores, given the sizes of the
+    equivalence classes and, optionally, their team rule masks: all teams of classes
+    in its three segments, except for those that use a class more often than it has
+    members, and those with two classes whose masks share a bit.
+    '''
+    if masks is None:
+        masks = numpy.zeros(len(sizes), dtype=numpy.int64)
+    first, second = numpy.meshgrid(
+        numpy.arange(partition['1'].values[0], partition['1'].values[1]),
+        numpy.arange(partition['2'].values[0], partition['2'].values[1]),
+        indexing='ij')
+    start, end = partition['3'].values[0], partition['3'].values[1]
+    allowed: numpy.ndarray = _count_allowed(masks[first] | masks[second], masks[start:end])
+    # a class that is used again as the third class only gets past the masks without any bits
+    first_in_third: numpy.ndarray = (start <= first) & (first < end) & (masks[first] == 0)
+    second_in_third: numpy.ndarray = (start <= second) & (second < end) & (masks[second] == 0)
+    same: numpy.ndarray = first == second
+    # the number of third classes that are skipped for each pair of first and second classes
+    skipped: numpy.ndarray = numpy.where(
+        same,
+        first_in_third & (sizes[first] <= 2),
+        (first_in_third & (sizes[first] <= 1)).astype(int) + \
+            (second_in_third & (sizes[second] <= 1)))
+    visited: numpy.ndarray = (~same | (sizes[first] >= 2)) & ((masks[first] & masks[second]) == 0)
+    return int((allowed - skipped)[visited].sum())
+
+def _measure_throughput(
+        library: DataFrame,
+        evaluation: Evaluation,
+        classes: EquivalenceClasses) -> float:
+    # evaluate all teams of the first few classes and time how many teams are scored per second
+    n: int = min(len(classes), CALIBRATION_CLASSES)
+    partition: DataFrame = DataFrame({'1': [0, n], '2': [0, n], '3': [0, n]})
+    teams: int = count_teams(
+        partition, classes.sizes, get_class_masks(library, evaluation, classes))
+    if teams == 0:
+        return 0.
+    rows: list[dict] = library.to_dict('records')
+    start: float = time.monotonic()
+    evaluate_partition(partition, rows, evaluation, 1, classes)
+    return teams / max(time.monotonic() - start, 1e-6)
+
+def _tune_partition_size(
+        library: DataFrame,
+        evaluation: Evaluation,
+        classes: EquivalenceClasses) -> tuple[int, float]:
+    '''
+    Pick the partition size for which evaluating a partition takes about the configured
+    time, from a calibration run of the engine, and project the runtime of the
+    evaluation, in seconds, before any partition is evaluated.
+    '''
+    runtime: float = float(ConfigurationService().get_configuration_property(
+        'distribute.partition-runtime', DEFAULT_PARTITION_RUNTIME))
+    throughput: float = _measure_throughput(library, evaluation, classes)
+    if throughput == 0:
+        return 1, 0.
+    partition_size: int = max(1, floor(throughput * runtime))
+    masks: numpy.ndarray = get_class_masks(library, evaluation, classes)
+    teams: int = sum(
+        count_teams(permutation, classes.sizes, masks)
+        for permutation in _create_permutations(_partition(len(classes), partition_size)))
+    logger.info(
+        'Evaluating formula %s for %d teams at %.0f teams per second, in partitions of '
+        '%d teams, is projected to take %s',
+        evaluation.evaluation_name,
+        teams,
+        throughput,
+        partition_size,
+        str(datetime.timedelta(seconds=round(teams / throughput))))
+    return partition_size, teams / throughput
+
+def get_partition_count(evaluation_name: str) -> int:
+    '''
+    The number of partitions that the latest run created for the evaluation, or None
+    if none was recorded. Results of partitions beyond it are left from earlier runs.
+    '''
+    count: DataFrame = read_store(DataType.PARTITION, page_title=evaluation_name)
+    return None if count.empty else int(count[PARTITIONS].values[0])
+
 def handler() -> int:
     '''
     Partition the calculation load. Each partition is assigned to a specific
-    evaluation model, and consists of three segments of the library,
-    one for each Pokemon in a team.
+    evaluation model, and consists of three segments of the equivalence classes
+    of the library, one for each Pokemon in a team. With a partition size of
+    'auto', the partition size of each evaluation is tuned to the speed of
+    the engine, and the runtime of the calculation is projected. Since the speed
+    differs between runs, the tuned size is recorded in the run manifest, and a
+    resumed calculation reuses it, so that its partitions match the checkpoints
+    of their results. The number of partitions of each evaluation is recorded,
+    for reduce to stop at.
     '''
     configure()
-    evaluations: DataFrame = read_store(DataType.EVALUATION)
+    partition_size: str = str(ConfigurationService().get_configuration_property('partition-size'))
     result = []
-    for evaluation_name in evaluations[EvaluationColumn.EVALUATION_NAME.value]:
+    runtime: float = 0.
+    for evaluation in retrieve_evaluations(read_store(DataType.EVALUATION)):
+        evaluation_name: str = evaluation.evaluation_name
         library: DataFrame = read_store(DataType.ENRICHED_LIBRARY, page_title=evaluation_name)
-        partitions: tuple[list[int]] = _partition(len(library))
+        classes: EquivalenceClasses = EquivalenceClasses(library, get_results_diversity())
+        if partition_size == AUTO_PARTITION_SIZE:
+            size: int = get_partition_size(evaluation_name)
+            if size is None:
+                size, evaluation_runtime = _tune_partition_size(library, evaluation, classes)
+                runtime += evaluation_runtime
+                record_partition_size(evaluation_name, size)
+            else:
+                logger.info('Reusing the partition size of %d teams for formula %s',
+                            size, evaluation_name)
+        else:
+            size: int = int(partition_size)
+        partitions: tuple[list[int]] = _partition(len(classes), size)
         permutations: list[DataFrame] = _create_permutations(partitions)
         for i, permutation in enumerate(permutations):
             permutation_name: str = evaluation_name + '.' + str(i)
             result.append(permutation_name)
             write_store(DataType.PARTITION, permutation, page_title=permutation_name)
+        write_store(DataType.PARTITION, DataFrame({PARTITIONS: [len(permutations)]}),
+                    page_title=evaluation_name)
+    if partition_size == AUTO_PARTITION_SIZE:
+        logger.info('The calculation is projected to take %s',
+                    str(datetime.timedelta(seconds=round(runtime))))
+    flush_store()
     return result
 
 if __name__ == '__main__':
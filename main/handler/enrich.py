@@ -2,22 +2,69 @@
 Logic to enrich the Pokemon library with reference data and
 optimise the Pokemon to score their best in an evaluation.
 '''
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
 import logging
+from typing import Any
 import numpy
 from pandas import concat, DataFrame, Series
 
-from main.core.configuration import configure
-from main.model.evaluation import retrieve_evaluations, Evaluation, EvaluationColumn
+from main.core.configuration import configure, ConfigurationService
+from main.handler.checkpoint import combine_fingerprints, record_enrichment
+from main.model.battle import get_effectiveness, get_type_multipliers, get_type_positions, \
+    pack_types, simulate_battles, BattleColumn
+from main.model.evaluation import retrieve_evaluations, Evaluation, EvaluationColumn, \
+    BATTLE_SUFFIX, FEATURE_EVALUATIONS, MATCHUP_SUFFIX
 from main.model.library import EnrichedLibraryColumn, LibraryColumn
 from main.model.referencedata import AttackPerPokemonColumn, \
     ChargedAttackColumn, CpmColumn, FastAttackColumn, PokemonEvolutionColumn, \
         PokemonTypeColumn, PokemonType
-from main.store import read_store, write_store, DataType
+from main.store import flush_store, get_fingerprint, prefetch_store, read_store, \
+    write_store, DataType
+from main.store.compact import compact, concat_compact
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# the individual values that the Pokemon in the meta are assumed to have
+META_IV = 15
+MAX_IV = 15
+# features that are computed from the matchups of the Pokemon against the meta
+META_FEATURES = [EvaluationColumn.META_COVERAGE_WEIGHT, EvaluationColumn.META_BATTLE_WEIGHT]
+# the value of enrich.iv-search.species with which every species in the reference data is searched
+IV_SEARCH_ALL = 'all'
+# the number of hypothetical variants that are kept per species by default
+DEFAULT_IV_VARIANTS = 1
+# the level of Pokemon in evaluations without a CP cap
+MAX_LEVEL = 50
+# the number of IV combinations that are compared with all others at once
+IV_BLOCK_SIZE = 512
+# estimated peak memory per moveset that the optimisation of the attacks considers,
+# when all movesets of a Pokemon are enriched with attack and type data at once
+MOVESET_ROW_BYTES = 2048
+# the columns of the enriched library that hold the names of Pokemon types
+TYPE_COLUMNS = [
+    PokemonTypeColumn.TYPE_1.value,
+    PokemonTypeColumn.TYPE_2.value,
+    FastAttackColumn.TYPE.value,
+    EnrichedLibraryColumn.CHARGED_ATTACK_1_TYPE.value,
+    EnrichedLibraryColumn.CHARGED_ATTACK_2_TYPE.value,
+]
+# the columns with which the species of a library are related to the species they evolve into
+ORIGINAL_SPECIES = 'original species'
+EVOLVED_SPECIES = 'evolved species'
+
+REFERENCE_DATA_TYPES = [
+    DataType.CHARGED_ATTACK_REFERENCE_DATA,
+    DataType.CHARGED_ATTACK_PER_POKEMON_REFERENCE_DATA,
+    DataType.CPM_REFERENCE_DATA,
+    DataType.EVOLUTION,
+    DataType.FAST_ATTACK_REFERENCE_DATA,
+    DataType.FAST_ATTACK_PER_POKEMON_REFERENCE_DATA,
+    DataType.POKEMON_TYPE_REFERENCE_DATA,
+    DataType.TYPE_CHART_REFERENCE_DATA,
+]
+
 def _calculate_cp(lib: DataFrame) -> float:
     max_attack: Series = lib[EnrichedLibraryColumn.MAX_ATTACK.value].astype(int)
     max_defence: Series = lib[EnrichedLibraryColumn.MAX_DEFENCE.value].astype(int)
@@ -188,18 +235,111 @@ def _enrich_with_type_vulnerabilities(library: DataFrame) -> DataFrame:
         library[pokemon_type.value + '_vuln'] = result
     return library
 
+def _calculate_damage(
+        multipliers: numpy.ndarray,
+        attackers: DataFrame,
+        defenders: DataFrame) -> numpy.ndarray:
+    # damage per turn of every attacker against every defender, from its first attack cycle
+    dpt: numpy.ndarray = attackers[EnrichedLibraryColumn.DPT_1.value].to_numpy(dtype=float)
+    attack: numpy.ndarray = attackers[
+        EnrichedLibraryColumn.REAL_ATTACK.value].to_numpy(dtype=float)
+    defence: numpy.ndarray = defenders[
+        EnrichedLibraryColumn.REAL_DEFENCE.value].to_numpy(dtype=float)
+    attack_types: numpy.ndarray = get_type_positions(
+        attackers[EnrichedLibraryColumn.CHARGED_ATTACK_1_TYPE.value])
+    effectiveness: numpy.ndarray = get_effectiveness(
+        multipliers, attack_types[:, None], defenders)
+    return (dpt * attack)[:, None] / defence[None, :] * effectiveness
+
+def _uses_meta(evaluation: Evaluation) -> bool:
+    return any(evaluation.weights[feature] != 0 for feature in META_FEATURES)
+
+def _optimise_meta(meta: DataFrame, evaluation: Evaluation) -> DataFrame:
+    # the opponents are optimised for the evaluation the same way as the library,
+    # so that every Pokemon is matched up against the best version of each of them
+    opponents: DataFrame = DataFrame({
+        LibraryColumn.POKEMON_NAME.value: meta[LibraryColumn.POKEMON_TYPE.value],
+        LibraryColumn.POKEMON_TYPE.value: meta[LibraryColumn.POKEMON_TYPE.value],
+        LibraryColumn.POKEMON_LEVEL.value: 1.0,
+        LibraryColumn.ATTACK.value: META_IV,
+        LibraryColumn.DEFENCE.value: META_IV,
+        LibraryColumn.HP.value: META_IV,
+    })
+    opponents = _filter_with_constraints(opponents, evaluation)
+    opponents = _maximise_level(opponents, evaluation)
+    opponents = _optimise_attacks(opponents, evaluation)
+    return opponents.drop_duplicates(
+        subset=[LibraryColumn.POKEMON_TYPE.value]).reset_index(drop=True)
+
+def _enrich_with_meta_matchups(
+        library: DataFrame,
+        opponents: DataFrame,
+        type_chart: DataFrame) -> DataFrame:
+    logger.info('Enriching the Pokemon library with matchups against the meta')
+    multipliers: numpy.ndarray = get_type_multipliers(type_chart)
+    dealt: numpy.ndarray = _calculate_damage(multipliers, library, opponents)
+    taken: numpy.ndarray = _calculate_damage(multipliers, opponents, library).T
+    hp: numpy.ndarray = library[EnrichedLibraryColumn.REAL_HP.value].to_numpy(dtype=float)
+    opponent_hp: numpy.ndarray = opponents[
+        EnrichedLibraryColumn.REAL_HP.value].to_numpy(dtype=float)
+    # the time an opponent takes to faint the Pokemon over the time the Pokemon
+    # takes to faint the opponent: the Pokemon wins the matchup if this is over 1
+    return DataFrame(
+        (hp[:, None] / taken) / (opponent_hp[None, :] / dealt),
+        columns=opponents[LibraryColumn.POKEMON_TYPE.value] + MATCHUP_SUFFIX,
+        index=library.index)
+
+def _enrich_with_meta_battles(
+        library: DataFrame,
+        opponents: DataFrame,
+        type_chart: DataFrame) -> DataFrame:
+    logger.info('Simulating battles of the Pokemon library against the meta')
+    # every Pokemon is paired with every opponent, and all battles are simulated at once
+    pokemon: numpy.ndarray = numpy.repeat(numpy.arange(len(library)), len(opponents))
+    opponent: numpy.ndarray = numpy.tile(numpy.arange(len(opponents)), len(library))
+    battles: DataFrame = simulate_battles(
+        library.iloc[pokemon], opponents.iloc[opponent], type_chart)
+    outcomes: numpy.ndarray = battles[BattleColumn.REMAINING_HP.value].to_numpy() - \
+        battles[BattleColumn.OPPONENT_REMAINING_HP.value].to_numpy()
+    return DataFrame(
+        outcomes.reshape(len(library), len(opponents)),
+        columns=opponents[LibraryColumn.POKEMON_TYPE.value] + BATTLE_SUFFIX,
+        index=library.index)
+
+def _read_meta_opponents(evaluation: Evaluation) -> DataFrame:
+    if not _uses_meta(evaluation):
+        return None
+    return _optimise_meta(
+        read_store(DataType.META, page_title=evaluation.evaluation_name), evaluation)
+
+def _enrich_with_meta(
+        library: DataFrame,
+        evaluation: Evaluation,
+        opponents: DataFrame) -> DataFrame:
+    if opponents is None:
+        return library
+    type_chart: DataFrame = read_store(DataType.TYPE_CHART_REFERENCE_DATA)
+    enrichments: list[DataFrame] = [library]
+    if evaluation.weights[EvaluationColumn.META_COVERAGE_WEIGHT] != 0:
+        enrichments.append(_enrich_with_meta_matchups(library, opponents, type_chart))
+    if evaluation.weights[EvaluationColumn.META_BATTLE_WEIGHT] != 0:
+        enrichments.append(_enrich_with_meta_battles(library, opponents, type_chart))
+    return concat(enrichments, axis='columns')
+
 def _enrich_with_type_strength(library: DataFrame) -> DataFrame:
     logger.info('Enriching the Pokemon library with type vulnerability data')
     type_chart: DataFrame = read_store(DataType.TYPE_CHART_REFERENCE_DATA)
     for pokemon_type in PokemonType:
         # take the type chart column to check which types the pokemon is strong against
-        type_chart_slice: Series = type_chart[pokemon_type.value]
-        type_chart_slice.index = type_chart['Type']
+        type_chart_slice: Series = Series(
+            type_chart[pokemon_type.value].to_numpy(), index=type_chart['Type'])
         result = library.apply(_calculate_type_strength(type_chart_slice), axis='columns')
         library[pokemon_type.value + '_str'] = result
     return library
 
 def _expand_evolutions(library: DataFrame) -> DataFrame:
+    library = library.assign(**{
+        EnrichedLibraryColumn.ORIGINAL_NAME.value: library[LibraryColumn.POKEMON_NAME.value]})
     evolved: DataFrame = DataFrame(columns=library.columns)
     evol_iter: DataFrame = library
     evolutions: DataFrame = read_store(DataType.EVOLUTION)
@@ -222,12 +362,12 @@ def _expand_evolutions(library: DataFrame) -> DataFrame:
 def _filter_with_constraints(library: DataFrame, evaluation: Evaluation) -> DataFrame:
     filtered = _enrich_with_pokemon_types(library)
     filtered = _enrich_with_cp(filtered)
-    filtered = filtered[filtered.apply(evaluation.matches_constraints, axis='columns')]
+    filtered = filtered[evaluation.library_matches_constraints(filtered)]
     return filtered.reset_index(drop=True)
 
 def _maximise_level(lib: DataFrame, evaluation: Evaluation) -> DataFrame:
     if not EvaluationColumn.MAX_CP_CONSTRAINT in evaluation.constraints:
-        lib[LibraryColumn.POKEMON_LEVEL.value] = Series(numpy.array([50] * len(lib)))
+        lib[LibraryColumn.POKEMON_LEVEL.value] = Series(numpy.array([MAX_LEVEL] * len(lib)))
         return _enrich_with_cp(lib)
     max_cp: int = evaluation.constraints[EvaluationColumn.MAX_CP_CONSTRAINT]
     max_attack: Series = lib[EnrichedLibraryColumn.MAX_ATTACK.value]
@@ -244,6 +384,130 @@ def _maximise_level(lib: DataFrame, evaluation: Evaluation) -> DataFrame:
     # re-calculate CP with the new levels
     return _enrich_with_cp(lib).reset_index(drop=True)
 
+def _get_iv_search() -> tuple[Any, int]:
+    species: Any = ConfigurationService().get_configuration_property(
+        'enrich.iv-search.species', [])
+    if isinstance(species, str) and species != IV_SEARCH_ALL:
+        # species given on the command line arrive as a single comma-separated string
+        species = [pokemon.strip() for pokemon in species.split(',') if pokemon.strip()]
+    variants: int = int(ConfigurationService().get_configuration_property(
+        'enrich.iv-search.variants', DEFAULT_IV_VARIANTS))
+    return species, variants
+
+def _level_ivs(
+        base_stats: numpy.ndarray,
+        cpm: DataFrame,
+        evaluation: Evaluation) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    # a row per combination of attack, defence and HP IVs
+    ivs: numpy.ndarray = numpy.indices((MAX_IV + 1,) * 3).reshape(3, -1).T
+    stats: numpy.ndarray = ivs + base_stats
+    levels: numpy.ndarray = cpm[CpmColumn.LEVEL.value].astype(float).to_numpy()
+    multipliers: numpy.ndarray = cpm[CpmColumn.MULTIPLIER.value].astype(float).to_numpy()
+    # the position of the level of each combination in the CPM reference data,
+    # which may not reach the maximum level
+    level: numpy.ndarray = numpy.full(
+        len(ivs), numpy.searchsorted(levels, MAX_LEVEL, side='right') - 1).clip(0)
+    if EvaluationColumn.MAX_CP_CONSTRAINT in evaluation.constraints:
+        max_cp: float = float(evaluation.constraints[EvaluationColumn.MAX_CP_CONSTRAINT])
+        max_cpm: numpy.ndarray = numpy.sqrt(
+            max_cp * 10 / stats[:, 0] / numpy.sqrt(stats[:, 1]) / numpy.sqrt(stats[:, 2]))
+        level = numpy.searchsorted(multipliers, max_cpm) - 1
+    # combinations that exceed the CP cap even at the lowest level are left out
+    fits: numpy.ndarray = level >= 0
+    return ivs[fits], levels[level[fits]], \
+        numpy.floor(stats[fits] * multipliers[level[fits], None])
+
+def _best_ivs(
+        stats: numpy.ndarray,
+        evaluation: Evaluation,
+        variants: int) -> numpy.ndarray:
+    weights: numpy.ndarray = numpy.array([
+        evaluation.weights[EvaluationColumn.ATTACK_WEIGHT],
+        evaluation.weights[EvaluationColumn.DEFENCE_WEIGHT],
+        evaluation.weights[EvaluationColumn.HP_WEIGHT]], dtype=float)
+    return numpy.argsort(-(stats @ weights), kind='stable')[:variants]
+
+def _non_dominated(stats: numpy.ndarray) -> numpy.ndarray:
+    # the combinations for which no other combination has at least the same real
+    # stats and more of one of them, compared a block of combinations at a time
+    dominated: numpy.ndarray = numpy.zeros(len(stats), dtype=bool)
+    for start in range(0, len(stats), IV_BLOCK_SIZE):
+        block: numpy.ndarray = stats[start:start + IV_BLOCK_SIZE, None, :]
+        dominated[start:start + IV_BLOCK_SIZE] = (
+            (stats[None, :, :] >= block).all(axis=2) &
+            (stats[None, :, :] > block).any(axis=2)).any(axis=1)
+    return numpy.flatnonzero(~dominated)
+
+def _best_ivs_against_meta(
+        candidates: DataFrame,
+        evaluation: Evaluation,
+        opponents: DataFrame,
+        variants: int) -> DataFrame:
+    # the meta features depend on the real stats through the matchups and battles of
+    # each combination, so the candidates are enriched with them as the library is,
+    # and ranked by the score of all the features of each of them on its own
+    levelled: DataFrame = _maximise_level(
+        _filter_with_constraints(candidates.copy(), evaluation), evaluation)
+    if levelled.empty:
+        return candidates.iloc[:0]
+    # the attacks do not depend on the IVs, so the best movesets of the species
+    # are found once; the type vulnerabilities are the same for all candidates
+    attacks: DataFrame = _optimise_attacks(levelled.iloc[:1].copy(), evaluation)
+    enriched: DataFrame = _enrich_with_meta(
+        levelled.merge(attacks.drop(columns=levelled.columns), how='cross'),
+        evaluation,
+        opponents)
+    features: list[EvaluationColumn] = [
+        feature for feature, weight in evaluation.weights.items()
+        if weight != 0 and feature != EvaluationColumn.TYPE_VULNERABILITY_WEIGHT]
+    scores: Series = Series([
+        sum(FEATURE_EVALUATIONS[feature]([pokemon]) * evaluation.weights[feature]
+            for feature in features)
+        for pokemon in enriched.to_dict('records')],
+        index=enriched[EnrichedLibraryColumn.ORIGINAL_NAME.value])
+    best: Series = scores.groupby(level=0, sort=False).max().sort_values(
+        ascending=False, kind='stable')
+    return candidates.set_index(EnrichedLibraryColumn.ORIGINAL_NAME.value, drop=False).loc[
+        best.index[:variants]].reset_index(drop=True)
+
+def _search_ivs(evaluation: Evaluation, opponents: DataFrame) -> DataFrame:
+    # hypothetical Pokemon of the configured species get the IVs with the best stats,
+    # weighted as in the evaluation, or that score best against the meta
+    species, variants = _get_iv_search()
+    if len(species) == 0:
+        return None
+    pokemon_types: DataFrame = read_store(DataType.POKEMON_TYPE_REFERENCE_DATA)
+    if species != IV_SEARCH_ALL:
+        pokemon_types = pokemon_types[pokemon_types[PokemonTypeColumn.POKEMON.value].isin(species)]
+    logger.info('Searching the IVs of %d species for the %s evaluation',
+                len(pokemon_types), evaluation.evaluation_name)
+    cpm: DataFrame = read_store(DataType.CPM_REFERENCE_DATA)
+    hypothetical: list[DataFrame] = []
+    for pokemon in pokemon_types.to_dict('records'):
+        pokemon_type: str = pokemon[PokemonTypeColumn.POKEMON.value]
+        ivs, levels, stats = _level_ivs(numpy.array([
+            pokemon[PokemonTypeColumn.BASE_ATTACK.value],
+            pokemon[PokemonTypeColumn.BASE_DEFENCE.value],
+            pokemon[PokemonTypeColumn.BASE_HP.value]], dtype=float), cpm, evaluation)
+        kept: numpy.ndarray = _non_dominated(stats) if opponents is not None \
+            else _best_ivs(stats, evaluation, variants)
+        names: list[str] = [
+            'Hypothetical ' + pokemon_type + ' ' + '/'.join(str(iv) for iv in ivs[i])
+            for i in kept]
+        candidates: DataFrame = DataFrame({
+            LibraryColumn.POKEMON_NAME.value: [name + ' as ' + pokemon_type for name in names],
+            LibraryColumn.POKEMON_TYPE.value: pokemon_type,
+            LibraryColumn.POKEMON_LEVEL.value: levels[kept],
+            LibraryColumn.ATTACK.value: ivs[kept, 0],
+            LibraryColumn.DEFENCE.value: ivs[kept, 1],
+            LibraryColumn.HP.value: ivs[kept, 2],
+            EnrichedLibraryColumn.ORIGINAL_NAME.value: names,
+        })
+        if opponents is not None and not candidates.empty:
+            candidates = _best_ivs_against_meta(candidates, evaluation, opponents, variants)
+        hypothetical.append(candidates)
+    return concat(hypothetical, ignore_index=True) if len(hypothetical) > 0 else DataFrame()
+
 def _optimise_attacks(library: DataFrame, evaluation: Evaluation) -> DataFrame:
     fast_attacks: DataFrame = read_store(DataType.FAST_ATTACK_PER_POKEMON_REFERENCE_DATA)
     charged_attacks: DataFrame = read_store(DataType.CHARGED_ATTACK_PER_POKEMON_REFERENCE_DATA)
@@ -295,30 +559,181 @@ def _optimise_attacks(library: DataFrame, evaluation: Evaluation) -> DataFrame:
     library[LibraryColumn.POKEMON_NAME.value] += library[LibraryColumn.CHARGED_ATTACK_2.value]
     return library
 
-def _optimise(library: DataFrame, evaluation: Evaluation) -> DataFrame:
-    logger.info('Optimising Pokemon for the %s evaluation', evaluation.evaluation_name)
-    library = _expand_evolutions(library)
+def _count_movesets(library: DataFrame) -> Series:
+    # a Pokemon is optimised as itself and as each of its evolutions, so the movesets of
+    # a species are counted along with those of the species that it evolves into
+    fast_attacks: DataFrame = read_store(DataType.FAST_ATTACK_PER_POKEMON_REFERENCE_DATA)
+    charged_attacks: DataFrame = read_store(DataType.CHARGED_ATTACK_PER_POKEMON_REFERENCE_DATA)
+    evolutions: DataFrame = read_store(DataType.EVOLUTION)
+    fast: Series = fast_attacks.groupby(AttackPerPokemonColumn.POKEMON.value).size()
+    charged: Series = charged_attacks.groupby(AttackPerPokemonColumn.POKEMON.value).size()
+    movesets: Series = (fast * charged * (charged - 1)).fillna(0)
+    species: numpy.ndarray = library[LibraryColumn.POKEMON_TYPE.value].unique()
+    family: DataFrame = DataFrame({ORIGINAL_SPECIES: species, EVOLVED_SPECIES: species})
+    counts: Series = Series(0., index=species)
+    while len(family) > 0:
+        counts = counts.add(family[EVOLVED_SPECIES].map(movesets).fillna(0).groupby(
+            family[ORIGINAL_SPECIES]).sum(), fill_value=0)
+        family = family.merge(
+            evolutions,
+            how='inner',
+            left_on=EVOLVED_SPECIES,
+            right_on=PokemonEvolutionColumn.POKEMON.value)[
+                [ORIGINAL_SPECIES, PokemonEvolutionColumn.EVOLUTION.value]].rename(
+                    columns={PokemonEvolutionColumn.EVOLUTION.value: EVOLVED_SPECIES})
+    return library[LibraryColumn.POKEMON_TYPE.value].map(counts).fillna(0)
+
+def _split_library(library: DataFrame, memory_budget: float) -> list[DataFrame]:
+    '''
+    Split the library into chunks whose movesets, including those of their
+    evolutions, are estimated to fit into the memory budget, in bytes, when they
+    are optimised. All Pokemon with the same name are kept in the same chunk, since
+    the best attacks are chosen per name; a name whose movesets alone exceed the
+    budget makes up a chunk of its own, and names without movesets join the current
+    chunk, so that no chunk ends up empty.
+    '''
+    sizes: Series = _count_movesets(library).groupby(
+        library[LibraryColumn.POKEMON_NAME.value]).sum() * MOVESET_ROW_BYTES
+    chunks: list[DataFrame] = []
+    positions: list[numpy.ndarray] = []
+    size: float = 0
+    for name, indices in library.groupby(
+            LibraryColumn.POKEMON_NAME.value, sort=False).indices.items():
+        if 0 < sizes[name] and 0 < size and size + sizes[name] > memory_budget:
+            chunks.append(library.iloc[numpy.concatenate(positions)].reset_index(drop=True))
+            positions, size = [], 0
+        positions.append(indices)
+        size += sizes[name]
+    if len(positions) > 0:
+        chunks.append(library.iloc[numpy.concatenate(positions)].reset_index(drop=True))
+    return chunks
+
+def _pack_types(library: DataFrame) -> DataFrame:
+    # types are stored as codes in a fixed order, whatever types the chunk contains
+    for column in TYPE_COLUMNS:
+        if column in library.columns:
+            library[column] = pack_types(library[column])
+    return library
+
+def _optimise_chunk(
+        library: DataFrame,
+        evaluation: Evaluation,
+        opponents: DataFrame) -> DataFrame:
+    # every stage works on each Pokemon on its own, so a chunk is optimised
+    # from its expanded evolutions to its compacted enrichment in one go
     library = _filter_with_constraints(library, evaluation)
+    if library.empty:
+        return None
     library = _maximise_level(library, evaluation)
     library = _optimise_attacks(library, evaluation)
     library = _enrich_with_type_vulnerabilities(library)
-    return library
+    library = _enrich_with_meta(library, evaluation, opponents)
+    return _pack_types(compact(library))
+
+def _optimise(library: DataFrame, evaluation: Evaluation) -> DataFrame:
+    logger.info('Optimising Pokemon for the %s evaluation', evaluation.evaluation_name)
+    opponents: DataFrame = _read_meta_opponents(evaluation)
+    # every Pokemon is expanded into its evolutions and all of their movesets before
+    # the best one is chosen, so with a memory budget, in MB, the library is optimised
+    # a chunk at a time, and only the compacted enrichment of each chunk is held
+    memory_budget: float = float(
+        ConfigurationService().get_configuration_property('enrich.memory-budget', 0))
+    chunks: list[DataFrame] = [library]
+    if memory_budget > 0:
+        chunks = _split_library(library, memory_budget * 1024 * 1024)
+    optimised: list[DataFrame] = []
+    for i, chunk in enumerate(chunks):
+        logger.info('Optimising chunk %d of %d of the library', i + 1, len(chunks))
+        optimised.append(_optimise_chunk(_expand_evolutions(chunk), evaluation, opponents))
+    # hypothetical Pokemon are searched per species, so they are not expanded
+    hypothetical: DataFrame = _search_ivs(evaluation, opponents)
+    if hypothetical is not None and not hypothetical.empty:
+        chunks = [hypothetical]
+        if memory_budget > 0:
+            chunks = _split_library(hypothetical, memory_budget * 1024 * 1024)
+        optimised.extend(_optimise_chunk(chunk, evaluation, opponents) for chunk in chunks)
+    optimised = [chunk for chunk in optimised if chunk is not None]
+    return concat_compact(optimised) if len(optimised) > 0 else DataFrame()
+
+def _prefetch_inputs() -> dict[DataType, DataFrame]:
+    # all inputs are read up front and in parallel; the enrichment stages then
+    # read the reference data from the caches of the data stores
+    return prefetch_store([DataType.LIBRARY, DataType.EVALUATION] + REFERENCE_DATA_TYPES)
+
+def get_enrichment_fingerprints(data: dict[DataType, DataFrame] = None) -> dict[str, str]:
+    '''
+    Compute, for each evaluation, a fingerprint of the inputs of its enriched library:
+    the library, the reference data, the configuration of the evaluation, its meta
+    and the IV search.
+    '''
+    if data is None:
+        data = _prefetch_inputs()
+    inputs: list[str] = [
+        get_fingerprint(data[data_type]) for data_type in [DataType.LIBRARY] + REFERENCE_DATA_TYPES]
+    iv_search: tuple[Any, int] = _get_iv_search()
+    result: dict[str, str] = {}
+    for evaluation in retrieve_evaluations(data[DataType.EVALUATION]):
+        evaluation_data: DataFrame = data[DataType.EVALUATION]
+        evaluation_inputs: list[str] = inputs + [get_fingerprint(evaluation_data[
+            evaluation_data[EvaluationColumn.EVALUATION_NAME.value] == \
+                evaluation.evaluation_name])]
+        if _uses_meta(evaluation):
+            evaluation_inputs.append(get_fingerprint(
+                read_store(DataType.META, page_title=evaluation.evaluation_name)))
+        if len(iv_search[0]) > 0:
+            evaluation_inputs.append(str(iv_search))
+        result[evaluation.evaluation_name] = combine_fingerprints(evaluation_inputs)
+    return result
+
+def _initialise_worker(configuration: dict, data: dict[DataType, DataFrame]) -> None:
+    # the worker is handed the configuration and the inputs once, and serves
+    # the inputs from its own in-memory data store to the enrichment stages
+    ConfigurationService().configuration = configuration
+    for data_type, frame in data.items():
+        ConfigurationService().set_configuration_property('store.' + data_type.value, 'memory')
+        write_store(data_type, frame)
+
+def _optimise_in_worker(evaluation: Evaluation) -> DataFrame:
+    return _optimise(read_store(DataType.LIBRARY), evaluation)
+
+def _optimise_all(
+        evaluations: list[Evaluation],
+        data: dict[DataType, DataFrame]) -> Iterator[DataFrame]:
+    processes: int = int(ConfigurationService().get_configuration_property('enrich.processes', 1))
+    if processes <= 1 or len(evaluations) <= 1:
+        for evaluation in evaluations:
+            yield _optimise(data[DataType.LIBRARY], evaluation)
+        return
+    logger.info('Optimising Pokemon for %d evaluations in %d processes',
+                len(evaluations), min(processes, len(evaluations)))
+    with ProcessPoolExecutor(
+            max_workers=min(processes, len(evaluations)),
+            initializer=_initialise_worker,
+            initargs=(ConfigurationService().configuration, data)) as executor:
+        yield from executor.map(_optimise_in_worker, evaluations)
 
-def handler() -> None:
+def handler(evaluation_names: list[str] = None) -> None:
     '''
     Enrich the library of Pokemon with reference data and produce copies of
     the enriched library in which the Pokemon are optimised to be their
-    best versions for the evaluation formula.
+    best versions for the evaluation formula. Optionally, only the libraries
+    for the evaluations with the provided names are produced. With more than
+    one configured enrich process, the evaluations are optimised in parallel
+    worker processes, and the enriched libraries are written by this process.
     '''
     configure()
-    library: DataFrame = read_store(DataType.LIBRARY)
-    evaluations: list[Evaluation] = retrieve_evaluations(read_store(DataType.EVALUATION))
-    for evaluation in evaluations:
-        optimised_library = _optimise(library, evaluation)
+    data: dict[DataType, DataFrame] = _prefetch_inputs()
+    fingerprints: dict[str, str] = get_enrichment_fingerprints(data)
+    evaluations: list[Evaluation] = [
+        evaluation for evaluation in retrieve_evaluations(data[DataType.EVALUATION])
+        if evaluation_names is None or evaluation.evaluation_name in evaluation_names]
+    for evaluation, optimised_library in zip(evaluations, _optimise_all(evaluations, data)):
         write_store(
             DataType.ENRICHED_LIBRARY,
             optimised_library,
             page_title=evaluation.evaluation_name)
+        record_enrichment(evaluation.evaluation_name, fingerprints[evaluation.evaluation_name])
+    flush_store()
 
 if __name__ == '__main__':
     handler()
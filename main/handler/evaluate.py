@@ -6,18 +6,56 @@ from typing import Any
 
 import datetime
 import heapq
+import itertools
 import logging
+import numpy
 from pandas import DataFrame
 
 from main.core.configuration import configure, ConfigurationService
 from main.core.singleton import Singleton
+from main.handler.checkpoint import get_enrichment_fingerprint, get_partition_fingerprint, \
+    record_partition
+from main.model.equivalence import Diversity, EquivalenceClasses
 from main.model.evaluation import retrieve_evaluations, Evaluation, EvaluationResult
-from main.model.library import LibraryColumn
-from main.store import read_store, write_store, DataType
+from main.store import flush_store, get_fingerprint, read_store, write_store, DataType
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+LIBRARY_KEY = 'library'
+
+def get_results_diversity() -> Diversity:
+    '''
+    Read the diversity of the top teams from the configuration.
+    '''
+    return Diversity(ConfigurationService().get_configuration_property(
+        'results-diversity', Diversity.NONE.value))
+
+def get_library_key(fingerprint: str) -> int:
+    '''
+    Shorten the fingerprint of an enriched library into an integer that
+    identifies the library that a partition result refers to.
+    '''
+    return int(fingerprint[:15], 16)
+
+def to_partition_result(
+        positions: list[tuple[int, ...]],
+        scores: list[float],
+        library_key: int) -> DataFrame:
+    '''
+    Represent the top teams of a partition by the positions of their Pokemon
+    in the enriched library, rather than by their names, which are only
+    resolved for the overall top teams when the partition results are reduced.
+    '''
+    teams: numpy.ndarray = numpy.array(positions, dtype=numpy.int32).reshape(-1, 3)
+    return DataFrame({
+        '1': teams[:, 0],
+        '2': teams[:, 1],
+        '3': teams[:, 2],
+        'result': numpy.array(scores, dtype=float),
+        LIBRARY_KEY: numpy.full(len(scores), library_key, dtype=numpy.int64),
+    })
+
 class ReportingService(Singleton):
     '''
     A service that is used to report the progress of a calculation.
@@ -67,55 +105,207 @@ class ReportingService(Singleton):
         self.end_time = datetime.datetime.now()
         logger.info('Calculation completed in %s', str(self.end_time - self.start_time))
 
-_cache: dict[int, dict[str, Any]] = {}
-def _get_pokemon_from_cache(i: int, library: DataFrame) -> dict[str, Any]:
-    if i not in _cache:
-        _cache[i] = library.iloc[i].to_dict()
-    return _cache[i]
+class _TopResults:
+    '''
+    The best <results-size> results of a partition.
+    '''
+    def __init__(self, size: int) -> None:
+        self.size: int = size
+        self.heap: list[EvaluationResult] = []
 
-def handler(event: dict[str, Any], context: dict[str, Any]) -> None:
+    def offer(self, result: EvaluationResult) -> None:
+        '''
+        Keep the result if it is one of the best so far.
+        '''
+        if len(self.heap) >= self.size:
+            heapq.heappushpop(self.heap, result)
+        else:
+            heapq.heappush(self.heap, result)
+
+    def results(self) -> list[EvaluationResult]:
+        '''
+        The results that are kept.
+        '''
+        return self.heap
+
+class _DiverseResults:
     '''
-    Apply the evaluation formula to all teams in the partition, and return
-    the top <results-size> results by evaluation score.
+    The best results of a partition, keeping only the best team per diversity key
+    of the equivalence classes, so that the number of results stays at <results-size>.
     '''
-    configure()
-    evaluation_name: str = event['permutation'].split('.')[0]
-    partition: DataFrame = read_store(DataType.PARTITION, page_title=event['permutation'])
-    library: DataFrame = read_store(DataType.ENRICHED_LIBRARY, page_title=evaluation_name)
-    results_size: int = ConfigurationService().get_configuration_property('results-size')
-    result: list = []
-    evaluation: Evaluation = [e for e in retrieve_evaluations(
-        read_store(DataType.EVALUATION)) if e.evaluation_name == evaluation_name][0]
-    ReportingService().prepare(partition, evaluation_name)
+    def __init__(self, size: int, classes: EquivalenceClasses) -> None:
+        self.size: int = size
+        self.classes: EquivalenceClasses = classes
+        self.heap: list[tuple[float, int, tuple[int, ...], EvaluationResult]] = []
+        # diversity key -> score of the best team with the key that is kept
+        self.keys: dict[tuple[int, ...], float] = {}
+        self.counter = itertools.count()
+
+    def offer(self, result: EvaluationResult) -> None:
+        '''
+        Keep the result if it is the best so far for its key and one of the best overall.
+        '''
+        key: tuple[int, ...] = self.classes.team_key(result.positions)
+        if key in self.keys:
+            if result.result <= self.keys[key]:
+                return
+            self.heap = [entry for entry in self.heap if entry[2] != key]
+            heapq.heapify(self.heap)
+        elif len(self.heap) >= self.size:
+            if result.result <= self.heap[0][0]:
+                return
+            del self.keys[heapq.heappop(self.heap)[2]]
+        heapq.heappush(self.heap, (result.result, next(self.counter), key, result))
+        self.keys[key] = result.result
+
+    def results(self) -> list[EvaluationResult]:
+        '''
+        The results that are kept.
+        '''
+        return [entry[3] for entry in self.heap]
+
+def _get_team_masks(
+        partition: DataFrame,
+        library: list[dict[str, Any]],
+        evaluation: Evaluation,
+        representatives: list[int]) -> dict[int, int]:
+    # the team rules are compiled into bitmasks, so that teams that break them are not evaluated
+    return {
+        i: evaluation.get_team_mask(library[representatives[i]])
+        for column in ['1', '2', '3']
+        for i in range(partition[column].values[0], partition[column].values[1])}
+
+def evaluate_partition(
+        partition: DataFrame,
+        library: list[dict[str, Any]],
+        evaluation: Evaluation,
+        results_size: int,
+        classes: EquivalenceClasses = None) -> list[EvaluationResult]:
+    '''
+    Evaluate all teams in the partition, and return the top <results-size> results.
+    If equivalence classes of the library are provided, the partition consists of
+    classes rather than Pokemon, and each team of classes is evaluated once, by the
+    Pokemon that represent the classes. If the classes have a diversity, only the
+    best team per diversity key is kept.
+    '''
+    representatives: list[int] = list(range(len(library)))
+    sizes: list[int] = [1] * len(library)
+    if classes is not None:
+        representatives = classes.representatives.tolist()
+        sizes = classes.sizes.tolist()
+    kept: _TopResults | _DiverseResults = _TopResults(results_size)
+    if classes is not None and classes.diversity != Diversity.NONE:
+        kept = _DiverseResults(results_size, classes)
+    masks: dict[int, int] = _get_team_masks(partition, library, evaluation, representatives)
+    ReportingService().prepare(partition, evaluation.evaluation_name)
     ReportingService().start()
     for i in range(partition['1'].values[0], partition['1'].values[1]):
-        pokemon1: dict[str, Any] = _get_pokemon_from_cache(i, library)
+        pokemon1: dict[str, Any] = library[representatives[i]]
         for j in range(partition['2'].values[0], partition['2'].values[1]):
-            if i == j:
+            if (i == j and sizes[i] < 2) or masks[i] & masks[j]:
                 continue
-            pokemon2: dict[str, Any] = _get_pokemon_from_cache(j, library)
+            pokemon2: dict[str, Any] = library[representatives[j]]
             for k in range(partition['3'].values[0], partition['3'].values[1]):
-                if k in (i, j):
+                if (k == i) + (k == j) >= sizes[k] or (masks[i] | masks[j]) & masks[k]:
                     continue
-                pokemon3: dict[str, Any] = _get_pokemon_from_cache(k, library)
                 evaluation_result: EvaluationResult = EvaluationResult(
-                    [pokemon1, pokemon2, pokemon3],
-                    evaluation)
-                if len(result) >= results_size:
-                    heapq.heapreplace(result, evaluation_result)
-                else:
-                    heapq.heappush(result, evaluation_result)
+                    [pokemon1, pokemon2, library[representatives[k]]],
+                    evaluation,
+                    (representatives[i], representatives[j], representatives[k]))
+                kept.offer(evaluation_result)
                 ReportingService().report_progress()
-    write_store(
-        DataType.PARTITION_RESULT,
-        DataFrame({
-                '1': [r.team[0][LibraryColumn.POKEMON_NAME.value] for r in result],
-                '2': [r.team[1][LibraryColumn.POKEMON_NAME.value] for r in result],
-                '3': [r.team[2][LibraryColumn.POKEMON_NAME.value] for r in result],
-                'result': [r.result for r in result]
-            }),
-        page_title=event['permutation'])
     ReportingService().end()
+    return kept.results()
+
+class EvaluationWorker(Singleton):
+    '''
+    A long-lived evaluator of partitions. Keeps the evaluations and the enriched
+    libraries, decoded into rows and grouped into equivalence classes, between
+    partitions, and only rebuilds them when the evaluation configuration or
+    the enriched library changes.
+    '''
+    def __init__(self):
+        if self.initialised:
+            return
+        self.evaluations_fingerprint: str = None
+        self.evaluations: dict[str, Evaluation] = {}
+        # evaluation name -> (library DataFrame, library fingerprint, decoded rows, classes)
+        self.libraries: dict[
+            str, tuple[DataFrame, str, list[dict[str, Any]], EquivalenceClasses]] = {}
+        self.initialised = True
+
+    def _refresh_evaluations(self) -> None:
+        evaluation_data: DataFrame = read_store(DataType.EVALUATION)
+        fingerprint: str = get_fingerprint(evaluation_data)
+        if fingerprint == self.evaluations_fingerprint:
+            return
+        logger.info('Evaluation configuration changed, rebuilding evaluations')
+        self.evaluations = {e.evaluation_name: e for e in retrieve_evaluations(evaluation_data)}
+        self.evaluations_fingerprint = fingerprint
+        # the libraries are optimised for the evaluations, so they are decoded again as well
+        self.libraries = {}
+
+    def _get_library(
+            self,
+            evaluation_name: str) -> tuple[list[dict[str, Any]], EquivalenceClasses]:
+        library: DataFrame = read_store(DataType.ENRICHED_LIBRARY, page_title=evaluation_name)
+        diversity: Diversity = get_results_diversity()
+        if evaluation_name in self.libraries:
+            cached_library, fingerprint, rows, classes = self.libraries[evaluation_name]
+            # a data store that caches DataFrames hands back the same object
+            if classes.diversity == diversity and \
+                    (cached_library is library or get_fingerprint(library) == fingerprint):
+                self.libraries[evaluation_name] = (library, fingerprint, rows, classes)
+                return rows, classes
+        logger.info('Decoding the enriched library for the %s evaluation', evaluation_name)
+        rows = library.to_dict('records')
+        self.evaluations[evaluation_name].use_library_columns(list(library.columns))
+        classes = EquivalenceClasses(library, diversity)
+        self.libraries[evaluation_name] = (library, get_fingerprint(library), rows, classes)
+        return rows, classes
+
+    def evaluate_partitions(self, permutations: list[str]) -> None:
+        '''
+        Evaluate each of the partitions with the provided names, and
+        write the top <results-size> results of each partition. Each completed
+        partition is recorded in the run manifest, if one is configured.
+        '''
+        self._refresh_evaluations()
+        results_size: int = ConfigurationService().get_configuration_property('results-size')
+        for permutation in permutations:
+            evaluation_name: str = permutation.split('.')[0]
+            partition: DataFrame = read_store(DataType.PARTITION, page_title=permutation)
+            rows, classes = self._get_library(evaluation_name)
+            result: list[EvaluationResult] = evaluate_partition(
+                partition, rows, self.evaluations[evaluation_name], results_size, classes)
+            write_store(
+                DataType.PARTITION_RESULT,
+                to_partition_result(
+                    [r.positions for r in result],
+                    [r.result for r in result],
+                    get_library_key(self.libraries[evaluation_name][1])),
+                page_title=permutation)
+            record_partition(permutation, get_partition_fingerprint(
+                get_enrichment_fingerprint(evaluation_name), partition))
+
+def handler(event: dict[str, Any], context: dict[str, Any]) -> None:
+    '''
+    Apply the evaluation formula to all teams in the partition, and return
+    the top <results-size> results by evaluation score.
+    '''
+    configure()
+    EvaluationWorker().evaluate_partitions([event['permutation']])
+    flush_store()
+
+def worker_handler(event: dict[str, Any], context: dict[str, Any]) -> None:
+    '''
+    Apply the evaluation formulas to all teams in a batch of partitions, keeping
+    the evaluations and the enriched libraries warm between calls, so that the
+    only cost per partition is reading it and writing its result.
+    '''
+    configure()
+    EvaluationWorker().evaluate_partitions(event['permutations'])
+    flush_store()
 
 if __name__ == '__main__':
     handler({'permutation': 'my-first-gl-evaluation.0'}, {})
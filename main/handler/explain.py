@@ -3,13 +3,176 @@ Logic to drill down into an evaluation result and the feature values
 that constitute it.
 '''
 from typing import Any
+import weakref
 
-from pandas import DataFrame
+import numpy
+from pandas import concat, DataFrame
 
-from main.core.configuration import configure
-from main.model.evaluation import Evaluation, retrieve_evaluations
+from main.core.configuration import configure, ConfigurationService
+from main.core.singleton import Singleton
+from main.model.evaluation import Evaluation, EvaluationColumn, retrieve_evaluations
 from main.model.library import LibraryColumn
-from main.store import read_store, DataType
+from main.store import get_fingerprint, query_store, read_store, write_store, DataType
+
+TEAM_COLUMNS = ['1', '2', '3']
+SCORE = 'score'
+# the fingerprints of the data that stored breakdowns were produced from
+LIBRARY_FINGERPRINT = 'library-fingerprint'
+EVALUATION_FINGERPRINT = 'evaluation-fingerprint'
+
+class ExplanationService(Singleton):
+    '''
+    A service that keeps the evaluations and, for each enriched library,
+    an index from Pokemon name to library row between explanations.
+    Both are only rebuilt when their data changes.
+    '''
+    def __init__(self):
+        if self.initialised:
+            return
+        self.evaluations_fingerprint: str = None
+        self.evaluations: dict[str, Evaluation] = {}
+        # evaluation name -> fingerprint of the configuration of the evaluation
+        self.evaluation_fingerprints: dict[str, str] = {}
+        # evaluation name -> (library, library fingerprint, name index)
+        self.libraries: dict[str, tuple[DataFrame, str, dict[str, int]]] = {}
+        # id of a library -> (weak reference to the library, fingerprint of the library)
+        self.library_fingerprints: dict[int, tuple[weakref.ref, str]] = {}
+        self.initialised = True
+
+    def _get_library_fingerprint(self, library: DataFrame) -> str:
+        # each library object is fingerprinted once, while it exists
+        cached: tuple[weakref.ref, str] = self.library_fingerprints.get(id(library))
+        if cached is not None and cached[0]() is library:
+            return cached[1]
+        fingerprint: str = get_fingerprint(library)
+        self.library_fingerprints = {
+            key: value for key, value in self.library_fingerprints.items()
+            if value[0]() is not None}
+        self.library_fingerprints[id(library)] = (weakref.ref(library), fingerprint)
+        return fingerprint
+
+    def get_evaluation(self, evaluation_name: str) -> Evaluation:
+        '''
+        Retrieve the evaluation with the provided name.
+        '''
+        evaluation_data: DataFrame = read_store(DataType.EVALUATION)
+        fingerprint: str = get_fingerprint(evaluation_data)
+        if fingerprint != self.evaluations_fingerprint:
+            self.evaluations = {
+                e.evaluation_name: e for e in retrieve_evaluations(evaluation_data)}
+            names: DataFrame = evaluation_data[EvaluationColumn.EVALUATION_NAME.value]
+            self.evaluation_fingerprints = {
+                name: get_fingerprint(evaluation_data[names == name].reset_index(drop=True))
+                for name in self.evaluations}
+            self.evaluations_fingerprint = fingerprint
+        return self.evaluations[evaluation_name]
+
+    def get_library(self, evaluation_name: str) -> tuple[DataFrame, dict[str, int]]:
+        '''
+        Retrieve the enriched library for the evaluation with the provided name,
+        along with the index from Pokemon name to the position of its row.
+        '''
+        library: DataFrame = read_store(DataType.ENRICHED_LIBRARY, page_title=evaluation_name)
+        fingerprint: str = self._get_library_fingerprint(library)
+        if evaluation_name in self.libraries:
+            _, cached_fingerprint, index = self.libraries[evaluation_name]
+            if fingerprint == cached_fingerprint:
+                self.libraries[evaluation_name] = (library, fingerprint, index)
+                return library, index
+        index = {
+            name: position for position, name in
+            enumerate(library[LibraryColumn.POKEMON_NAME.value])}
+        self.libraries[evaluation_name] = (library, fingerprint, index)
+        return library, index
+
+    def get_fingerprints(self, evaluation_name: str) -> tuple[str, str]:
+        '''
+        Retrieve the fingerprints of the current enriched library and configuration
+        of the evaluation with the provided name, which the breakdowns depend on.
+        '''
+        self.get_library(evaluation_name)
+        self.get_evaluation(evaluation_name)
+        return self.libraries[evaluation_name][1], self.evaluation_fingerprints[evaluation_name]
+
+def _to_data_frame(teams: list[list[str]], explanations: list[dict[str, Any]]) -> DataFrame:
+    result: dict[str, list[Any]] = {
+        column: [team[position] for team in teams]
+        for position, column in enumerate(TEAM_COLUMNS)}
+    for feature in explanations[0] if len(explanations) > 0 else []:
+        if feature == SCORE:
+            continue
+        result[feature + '-value'] = [e[feature]['value'] for e in explanations]
+        result[feature + '-weight'] = [e[feature]['weight'] for e in explanations]
+    result[SCORE] = [e[SCORE] for e in explanations] if len(explanations) > 0 else []
+    return DataFrame(result)
+
+def _from_row(row: dict[str, Any]) -> dict[str, Any]:
+    result: dict[str, Any] = {}
+    for column, value in row.items():
+        if column.endswith('-value'):
+            feature: str = column[:-len('-value')]
+            result[feature] = {
+                'value': float(value),
+                'weight': float(row[feature + '-weight']),
+            }
+    result[SCORE] = float(row[SCORE])
+    return result
+
+def _merge_explanations(evaluation_name: str, explanations: DataFrame) -> DataFrame:
+    # breakdowns of other teams are kept, and those of the same teams are replaced
+    stored: DataFrame = read_store(DataType.EXPLANATION, page_title=evaluation_name)
+    if stored.empty:
+        return explanations
+    teams: set[tuple[str, ...]] = set(
+        map(tuple, explanations[TEAM_COLUMNS].to_numpy().tolist()))
+    kept: list[bool] = [
+        tuple(team) not in teams for team in stored[TEAM_COLUMNS].to_numpy().tolist()]
+    return concat([stored[kept], explanations], ignore_index=True)
+
+def _lookup_explanation(evaluation_name: str, pokemon_names: list[str]) -> dict[str, Any]:
+    if not ConfigurationService().get_configuration_property(
+            'store.' + DataType.EXPLANATION.value, ''):
+        return None
+    explanations: DataFrame = query_store(
+        DataType.EXPLANATION, TEAM_COLUMNS[0], pokemon_names[:1], page_title=evaluation_name)
+    if explanations.empty:
+        return None
+    # breakdowns of an earlier library or configuration no longer add up to the current score
+    fingerprints: tuple[str, str] = ExplanationService().get_fingerprints(evaluation_name)
+    for row in explanations.to_dict('records'):
+        row_fingerprints: tuple[str, str] = \
+            str(row.get(LIBRARY_FINGERPRINT)), str(row.get(EVALUATION_FINGERPRINT))
+        if [row[column] for column in TEAM_COLUMNS] == list(pokemon_names) and \
+                row_fingerprints == fingerprints:
+            return _from_row(row)
+    return None
+
+def explain_teams(
+        evaluation_name: str,
+        teams: list[list[str]],
+        store: bool = False) -> list[dict[str, Any]]:
+    '''
+    Produce breakdowns of the scores of many teams according to an evaluation
+    model in one pass, looking the Pokemon up by name in an index of the
+    enriched library. Optionally stores the breakdowns as explanation data,
+    along with the fingerprints of the library and the evaluation, next to
+    the stored breakdowns of other teams.
+    '''
+    library, index = ExplanationService().get_library(evaluation_name)
+    positions: numpy.ndarray = numpy.array(
+        [[index[name] for name in team] for team in teams], dtype=int).reshape(-1, 3)
+    explanations: list[dict[str, Any]] = ExplanationService().get_evaluation(
+        evaluation_name).explain_teams(library, positions)
+    if store:
+        library_fingerprint, evaluation_fingerprint = \
+            ExplanationService().get_fingerprints(evaluation_name)
+        write_store(
+            DataType.EXPLANATION,
+            _merge_explanations(evaluation_name, _to_data_frame(teams, explanations).assign(**{
+                LIBRARY_FINGERPRINT: library_fingerprint,
+                EVALUATION_FINGERPRINT: evaluation_fingerprint})),
+            page_title=evaluation_name)
+    return explanations
 
 def handler(event: dict[str, Any], context: dict[str, Any]) -> dict[str, Any]:
     '''
@@ -18,17 +181,38 @@ def handler(event: dict[str, Any], context: dict[str, Any]) -> dict[str, Any]:
     of the feature, and the overall result.
     '''
     configure()
-    lib: DataFrame = read_store(DataType.ENRICHED_LIBRARY, page_title=event['evaluation_name'])
+    stored: dict[str, Any] = _lookup_explanation(
+        event['evaluation_name'], event['pokemon_names'])
+    if stored is not None:
+        return stored
     pokemon_names: list[str] = event['pokemon_names']
+    lib: DataFrame = query_store(
+        DataType.ENRICHED_LIBRARY,
+        LibraryColumn.POKEMON_NAME.value,
+        pokemon_names,
+        page_title=event['evaluation_name'])
     team: list[dict[str, Any]] = [
         lib[lib[LibraryColumn.POKEMON_NAME.value] == pokemon_names[0]].to_dict('records')[0],
         lib[lib[LibraryColumn.POKEMON_NAME.value] == pokemon_names[1]].to_dict('records')[0],
         lib[lib[LibraryColumn.POKEMON_NAME.value] == pokemon_names[2]].to_dict('records')[0],
     ]
-    evaluation: Evaluation = [e for e in retrieve_evaluations(
-        read_store(DataType.EVALUATION)) if e.evaluation_name == event['evaluation_name']][0]
+    evaluation: Evaluation = ExplanationService().get_evaluation(event['evaluation_name'])
+    # the evaluation is kept between explanations, while the library may have changed
+    evaluation.use_library_columns(list(lib.columns))
     return evaluation.explain_team(team)
 
+def batch_handler(event: dict[str, Any], context: dict[str, Any]) -> list[dict[str, Any]]:
+    '''
+    Produce breakdowns of the scores of many teams according to an evaluation
+    model. If the event sets 'store' to true, the breakdowns are also stored as
+    explanation data, from which later single-team explanations are looked up.
+    '''
+    configure()
+    return explain_teams(
+        event['evaluation_name'],
+        event['teams'],
+        store=event.get('store', False))
+
 if __name__ == '__main__':
     print(handler({
         'pokemon_names': [
@@ -2,36 +2,86 @@
 Logic for the 'reduce' step of the calculation process.
 '''
 import logging
-from pandas import concat, DataFrame
+import numpy
+from pandas import concat, DataFrame, Series
 
-from main.core.configuration import configure, ConfigurationService
+from main.core.configuration import configure, ConfigurationException, ConfigurationService
+from main.handler.distribute import get_partition_count
+from main.handler.evaluate import get_library_key, get_results_diversity, LIBRARY_KEY
+from main.model.equivalence import Diversity, EquivalenceClasses
 from main.model.evaluation import EvaluationColumn
-from main.store import read_store, write_store, DataType
+from main.model.library import LibraryColumn
+from main.store import flush_store, get_fingerprint, read_store, write_store, DataType
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+TEAM_COLUMNS = ['1', '2', '3']
+
+def _merge(
+        result: DataFrame,
+        next_result: DataFrame,
+        results_size: int,
+        classes: EquivalenceClasses) -> DataFrame:
+    result = concat([result, next_result]).sort_values(by=['result'], ascending=False)
+    if classes is not None:
+        # only the best team per diversity key is kept, across all partitions
+        keys: Series = Series([
+            classes.team_key(team) for team in result[TEAM_COLUMNS].to_numpy().tolist()])
+        result = result[~keys.duplicated().to_numpy()]
+    return result[:results_size]
+
+def _resolve_names(
+        evaluation_name: str,
+        result: DataFrame,
+        results_size: int,
+        diversity: Diversity) -> DataFrame:
+    library: DataFrame = read_store(DataType.ENRICHED_LIBRARY, page_title=evaluation_name)
+    if (result[LIBRARY_KEY] != get_library_key(get_fingerprint(library))).any():
+        raise ConfigurationException(
+            'Partition results for ' + evaluation_name + ' refer to a different enriched library')
+    names: numpy.ndarray = library[LibraryColumn.POKEMON_NAME.value].to_numpy()
+    # each team of representatives of equivalence classes stands for all the teams
+    # of the members of those classes, which have the same score
+    teams, scores = EquivalenceClasses(library, diversity).expand_teams(
+        result[TEAM_COLUMNS].to_numpy(), result['result'].to_numpy(), results_size)
+    return DataFrame({
+        column: names[teams[:, number]] for number, column in enumerate(TEAM_COLUMNS)
+    } | {'result': scores})
+
 def handler():
     '''
-    Pick the top <results-size> teams for each evaluation from the calculated partitions.
+    Pick the top <results-size> teams for each evaluation from the calculated partitions,
+    expand the teams of equivalence classes into teams of the Pokemon in the classes,
+    and resolve the positions of their Pokemon in the enriched library into names.
+    With a results diversity, only the best team per diversity key is picked.
+    Results of partitions beyond the number that distribute recorded are left
+    from earlier runs, and are not read.
     '''
     configure()
     evaluation_data: DataFrame = read_store(DataType.EVALUATION)
     results_size: int = ConfigurationService().get_configuration_property('results-size')
+    diversity: Diversity = get_results_diversity()
     for evaluation in evaluation_data.to_dict('records'):
         evaluation_name = evaluation[EvaluationColumn.EVALUATION_NAME.value]
         result: DataFrame = DataFrame()
+        classes: EquivalenceClasses = None
+        if diversity != Diversity.NONE:
+            classes = EquivalenceClasses(
+                read_store(DataType.ENRICHED_LIBRARY, page_title=evaluation_name), diversity)
+        partitions: int = get_partition_count(evaluation_name)
         counter = 0
-        while True:
+        while partitions is None or counter < partitions:
             next_result: DataFrame = read_store(
                 DataType.PARTITION_RESULT, evaluation_name + '.' + str(counter))
             if next_result.empty:
                 break
-            result = concat(
-                [result, next_result]).sort_values(
-                    by=['result'], ascending=False)[:results_size]
+            result = _merge(result, next_result, results_size, classes)
             counter += 1
+        if not result.empty:
+            result = _resolve_names(evaluation_name, result, results_size, diversity)
         write_store(DataType.RESULT, result, evaluation_name)
+    flush_store()
 
 if __name__ == '__main__':
     handler()
@@ -0,0 +1,237 @@
+'''
+Logic to search for the best teams of the Pokemon library according to
+an evaluation formula without enumerating every team, within a budget.
+'''
+from typing import Any
+
+import heapq
+import itertools
+import logging
+import time
+from pandas import DataFrame
+
+from main.core.configuration import configure, ConfigurationService
+from main.model.evaluation import retrieve_evaluations, Evaluation, EvaluationResult
+from main.store import read_store, write_store, DataType
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BEAM_WIDTH = 32
+DEFAULT_TIME_BUDGET = 60
+
+class SearchBudget:
+    '''
+    The wall-clock time and the number of team evaluations that a search may spend.
+    A budget of 0 evaluations places no limit on the number of evaluations. A search
+    always completes at least one team, even if that takes it slightly over budget.
+    '''
+    def __init__(self, seconds: float, evaluations: int = 0) -> None:
+        self.deadline: float = time.monotonic() + seconds
+        self.max_evaluations: int = evaluations
+        self.evaluations: int = 0
+
+    def spend(self) -> None:
+        '''
+        Record a team evaluation.
+        '''
+        self.evaluations += 1
+
+    def exhausted(self) -> bool:
+        '''
+        Whether the search should stop and report the best teams found so far.
+        '''
+        return time.monotonic() >= self.deadline or \
+            0 < self.max_evaluations <= self.evaluations
+
+class _TopTeams:
+    '''
+    The best distinct teams found by a search, regardless of the order of their Pokemon.
+    '''
+    def __init__(self, size: int) -> None:
+        self.size: int = size
+        self.heap: list[tuple[float, int, tuple[int, ...], EvaluationResult]] = []
+        self.teams: set[tuple[int, ...]] = set()
+        self.counter = itertools.count()
+
+    def offer(self, team: tuple[int, ...], result: EvaluationResult) -> bool:
+        '''
+        Keep the team if it is one of the best teams found so far,
+        and return whether it was kept as a new team.
+        '''
+        if team in self.teams:
+            return False
+        entry = (result.result, next(self.counter), team, result)
+        if len(self.heap) < self.size:
+            heapq.heappush(self.heap, entry)
+        elif result.result > self.heap[0][0]:
+            self.teams.discard(heapq.heappushpop(self.heap, entry)[2])
+        else:
+            return False
+        self.teams.add(team)
+        return True
+
+    def best(self) -> list[tuple[tuple[int, ...], EvaluationResult]]:
+        '''
+        The teams found so far with their results, best first.
+        '''
+        return [(team, result) for _, _, team, result in sorted(self.heap, reverse=True)]
+
+class _BeamSearch:
+    '''
+    The state of a search for the best teams for an evaluation: the library,
+    the Pokemon that may be part of a team, their team rule masks, and the
+    remaining budget.
+    '''
+    def __init__(
+            self,
+            library: list[dict[str, Any]],
+            evaluation: Evaluation,
+            budget: SearchBudget) -> None:
+        self.library: list[dict[str, Any]] = library
+        self.evaluation: Evaluation = evaluation
+        self.budget: SearchBudget = budget
+        self.candidates: list[int] = [
+            i for i, pokemon in enumerate(library) if evaluation.matches_constraints(pokemon)]
+        if len(self.candidates) < 3:
+            self.candidates = list(range(len(library)))
+        # the team rules are compiled into bitmasks, as in the exhaustive evaluation
+        self.masks: list[int] = [evaluation.get_team_mask(pokemon) for pokemon in library]
+
+    def follows_rules(self, team: tuple[int, ...]) -> bool:
+        '''
+        Whether no two Pokemon in the complete or partial team clash on the team rules.
+        '''
+        mask: int = 0
+        for i in team:
+            if mask & self.masks[i]:
+                return False
+            mask |= self.masks[i]
+        return True
+
+    def evaluate(self, team: tuple[int, ...]) -> EvaluationResult:
+        '''
+        Evaluate a complete team, spending the budget.
+        '''
+        self.budget.spend()
+        return EvaluationResult([self.library[i] for i in team], self.evaluation)
+
+    def extend(self, beam: list[tuple[int, ...]], width: int) -> list[tuple[int, ...]]:
+        '''
+        Extend each partial team in the beam by one more Pokemon, and keep the best
+        <width> of the extended teams. Once the budget is exhausted, stops extending
+        as soon as at least one extended team has been found.
+        '''
+        extended: dict[tuple[int, ...], float] = {}
+        for team in beam:
+            for candidate in self.candidates:
+                new_team: tuple[int, ...] = tuple(sorted(team + (candidate,)))
+                if candidate in team or new_team in extended or not self.follows_rules(new_team):
+                    continue
+                extended[new_team] = self.evaluation.evaluate_team(
+                    [self.library[i] for i in new_team])
+                self.budget.spend()
+                if self.budget.exhausted():
+                    break
+            if self.budget.exhausted() and len(extended) > 0:
+                break
+        return heapq.nlargest(width, extended, key=extended.get)
+
+    def refine(self, top: _TopTeams) -> None:
+        '''
+        Improve the best teams by swapping one Pokemon at a time for a better one,
+        until no swap finds a new team good enough to keep or the budget is exhausted.
+        '''
+        improved: bool = True
+        while improved and not self.budget.exhausted():
+            improved = False
+            for team, result in top.best():
+                for position, candidate in itertools.product(range(3), self.candidates):
+                    if candidate in team:
+                        continue
+                    swapped: tuple[int, ...] = tuple(sorted(
+                        team[:position] + (candidate,) + team[position + 1:]))
+                    if not self.follows_rules(swapped):
+                        continue
+                    swapped_result: EvaluationResult = self.evaluate(swapped)
+                    improved = top.offer(swapped, swapped_result) or improved
+                    if swapped_result.result > result.result:
+                        team, result = swapped, swapped_result
+                    if self.budget.exhausted():
+                        return
+
+def search(
+        library: list[dict[str, Any]],
+        evaluation: Evaluation,
+        results_size: int,
+        beam_width: int,
+        budget: SearchBudget) -> list[EvaluationResult]:
+    '''
+    Search for the best <results-size> teams by beam search: starting from the best
+    individual Pokemon, partial teams are grown one Pokemon at a time, keeping only
+    the best <beam-width> at each step, and the best complete teams are then refined
+    by local swaps. Teams are scored with the same semantics as the exhaustive
+    evaluation, and teams that break the team rules are skipped in the same way,
+    so the results of both can be compared.
+    '''
+    beam_search: _BeamSearch = _BeamSearch(library, evaluation, budget)
+    if len(beam_search.candidates) < 3:
+        return []
+    top: _TopTeams = _TopTeams(results_size)
+    beam: list[tuple[int, ...]] = [()]
+    for _ in range(2):
+        beam = beam_search.extend(beam, beam_width)
+    for team in beam_search.extend(beam, beam_width):
+        top.offer(team, EvaluationResult([library[i] for i in team], evaluation))
+    beam_search.refine(top)
+    return [result for _, result in top.best()]
+
+def handler(event: dict[str, Any], context: dict[str, Any]) -> dict[str, Any]:
+    '''
+    Search for the top <results-size> teams for an evaluation within the configured
+    time and evaluation budget, store them as the evaluation's search result, apart
+    from the result of the exhaustive evaluation that they can be compared to, and report
+    how far the best team found can at most be from the best possible team.
+    '''
+    configure()
+    evaluation_name: str = event['evaluation_name']
+    evaluation: Evaluation = {
+        e.evaluation_name: e for e in retrieve_evaluations(read_store(DataType.EVALUATION))
+    }[evaluation_name]
+    library: list[dict[str, Any]] = read_store(
+        DataType.ENRICHED_LIBRARY, page_title=evaluation_name).to_dict('records')
+    budget: SearchBudget = SearchBudget(
+        float(ConfigurationService().get_configuration_property(
+            'search.time-budget', DEFAULT_TIME_BUDGET)),
+        int(ConfigurationService().get_configuration_property('search.evaluation-budget', 0)))
+    result: list[EvaluationResult] = search(
+        library,
+        evaluation,
+        int(ConfigurationService().get_configuration_property('results-size')),
+        int(ConfigurationService().get_configuration_property(
+            'search.beam-width', DEFAULT_BEAM_WIDTH)),
+        budget)
+    write_store(
+        DataType.SEARCH_RESULT,
+        DataFrame({
+            '1': [r.names[0] for r in result],
+            '2': [r.names[1] for r in result],
+            '3': [r.names[2] for r in result],
+            'result': [r.result for r in result]
+        }),
+        page_title=evaluation_name)
+    # teams that do not match the constraints score 0, so the best score is never below 0
+    upper_bound: float = max(0.0, evaluation.bound_team_score(
+        [p for p in library if evaluation.matches_constraints(p)]))
+    best: float = result[0].result if len(result) > 0 else 0.0
+    logger.info('Best team found for %s scores %f, at most %f below the best possible team',
+                evaluation_name, best, upper_bound - best)
+    return {
+        'best': best,
+        'upper-bound': upper_bound,
+        'gap': upper_bound - best,
+        'evaluations': budget.evaluations,
+    }
+
+if __name__ == '__main__':
+    print(handler({'evaluation_name': 'my-first-gl-evaluation'}, {}))
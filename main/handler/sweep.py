@@ -0,0 +1,184 @@
+'''
+Logic to evaluate a partition of the Pokemon library according to many
+weight vectors of an evaluation formula in a single pass.
+'''
+from typing import Any
+
+import logging
+import numpy
+from pandas import concat, DataFrame, Series
+
+from main.core.configuration import configure, ConfigurationService
+from main.handler.distribute import get_partition_count
+from main.handler.evaluate import get_results_diversity
+from main.model.equivalence import Diversity, EquivalenceClasses
+from main.model.evaluation import evaluate_features, masks_allow_teams, retrieve_evaluations, \
+    Evaluation, EvaluationColumn
+from main.model.library import LibraryColumn
+from main.store import read_store, write_store, DataType
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+WEIGHTS = 'weights'
+
+def _enumerate_teams(
+        partition: DataFrame,
+        first: int,
+        classes: EquivalenceClasses,
+        masks: numpy.ndarray) -> numpy.ndarray:
+    '''
+    All teams of the partition whose first equivalence class is the provided one,
+    in the order in which the evaluate handler visits them, as the positions
+    of the Pokemon that represent the classes. Teams that break the team rules,
+    compiled into the provided bitmasks of the Pokemon, are left out.
+    '''
+    second, third = numpy.meshgrid(
+        numpy.arange(partition['2'].values[0], partition['2'].values[1]),
+        numpy.arange(partition['3'].values[0], partition['3'].values[1]),
+        indexing='ij')
+    teams: numpy.ndarray = numpy.stack(
+        [numpy.full(second.size, first), second.ravel(), third.ravel()], axis=1)
+    teams = classes.representatives[teams[classes.allow(teams)]]
+    return teams[masks_allow_teams(masks[teams[:, 0]], masks[teams[:, 1]], masks[teams[:, 2]])]
+
+def _top(
+        teams: numpy.ndarray,
+        scores: numpy.ndarray,
+        results_size: int,
+        classes: EquivalenceClasses) -> tuple[numpy.ndarray, numpy.ndarray]:
+    if classes.keys is not None:
+        # only the best team per diversity key is kept
+        order: numpy.ndarray = numpy.argsort(-scores, kind='stable')
+        _, first = numpy.unique(
+            numpy.sort(classes.keys[teams[order]], axis=1), axis=0, return_index=True)
+        teams, scores = teams[order[first]], scores[order[first]]
+    if len(scores) > results_size:
+        best: numpy.ndarray = numpy.argpartition(-scores, results_size - 1)[:results_size]
+        return teams[best], scores[best]
+    return teams, scores
+
+def sweep_partition(
+        partition: DataFrame,
+        library: DataFrame,
+        evaluation: Evaluation,
+        weights: DataFrame,
+        results_size: int) -> list[tuple[numpy.ndarray, numpy.ndarray]]:
+    '''
+    Evaluate all teams of equivalence classes in the partition against every
+    weight vector, computing the feature values of each team only once. Returns,
+    for each weight vector, the positions of the Pokemon that represent the classes
+    in the top <results-size> teams and their scores, best first. The classes have
+    the results diversity, like those that distribute partitioned, and only the
+    best team per diversity key is kept.
+    '''
+    classes: EquivalenceClasses = EquivalenceClasses(library, get_results_diversity())
+    features: list[EvaluationColumn] = [
+        EvaluationColumn(column) for column in weights.columns if weights[column].any()]
+    weight_matrix: numpy.ndarray = weights[[f.value for f in features]].to_numpy(dtype=float)
+    masks: numpy.ndarray = evaluation.get_team_masks(library)
+    best: list[tuple[numpy.ndarray, numpy.ndarray]] = [
+        (numpy.zeros((0, 3), dtype=int), numpy.zeros(0))] * len(weights)
+    logger.info('Sweeping %d weight vectors of formula %s',
+                len(weights), evaluation.evaluation_name)
+    for first in range(partition['1'].values[0], partition['1'].values[1]):
+        teams: numpy.ndarray = _enumerate_teams(partition, first, classes, masks)
+        if len(teams) == 0:
+            continue
+        # teams that do not match the constraints score 0 for every weight vector
+        scores: numpy.ndarray = evaluate_features(library, teams, features) @ weight_matrix.T
+        scores[~evaluation.teams_match_constraints(library, teams)] = 0
+        best = [
+            _top(numpy.concatenate([best_teams, teams]),
+                 numpy.concatenate([best_scores, scores[:, column]]),
+                 results_size,
+                 classes)
+            for column, (best_teams, best_scores) in enumerate(best)]
+    return [
+        (best_teams[order], best_scores[order])
+        for best_teams, best_scores in best
+        for order in [numpy.argsort(-best_scores, kind='stable')]]
+
+def _keep_diverse(evaluation_name: str, result: DataFrame, diversity: Diversity) -> DataFrame:
+    library: DataFrame = read_store(DataType.ENRICHED_LIBRARY, page_title=evaluation_name)
+    classes: EquivalenceClasses = EquivalenceClasses(library, diversity)
+    positions: Series = Series(
+        numpy.arange(len(library)), index=library[LibraryColumn.POKEMON_NAME.value])
+    keys: list[tuple[int, ...]] = [
+        classes.team_key(tuple(positions[team].tolist()))
+        for team in result[['1', '2', '3']].to_numpy().tolist()]
+    # the results are sorted best first per weight vector, so the best team per key is kept
+    duplicated: Series = DataFrame({WEIGHTS: result[WEIGHTS].to_numpy(), 'key': keys}).duplicated()
+    return result[~duplicated.to_numpy()]
+
+def handler(event: dict[str, Any], context: dict[str, Any]) -> None:
+    '''
+    Apply every weight vector of the evaluation's weight sweep to all teams in
+    the partition, and store the top <results-size> results of each weight vector.
+    '''
+    configure()
+    permutation: str = event['permutation']
+    evaluation_name: str = permutation.split('.')[0]
+    evaluations: dict[str, Evaluation] = {
+        e.evaluation_name: e for e in retrieve_evaluations(read_store(DataType.EVALUATION))}
+    library: DataFrame = read_store(DataType.ENRICHED_LIBRARY, page_title=evaluation_name)
+    names: numpy.ndarray = library[LibraryColumn.POKEMON_NAME.value].to_numpy()
+    # the partitions are ranges of the classes that distribute grouped the library into
+    classes: EquivalenceClasses = EquivalenceClasses(library, get_results_diversity())
+    results_size: int = ConfigurationService().get_configuration_property('results-size')
+    result: list[tuple[numpy.ndarray, numpy.ndarray]] = [
+        classes.expand_teams(teams, scores, results_size)
+        for teams, scores in sweep_partition(
+            read_store(DataType.PARTITION, page_title=permutation),
+            library,
+            evaluations[evaluation_name],
+            read_store(DataType.WEIGHT_SWEEP, page_title=evaluation_name),
+            results_size)]
+    write_store(
+        DataType.WEIGHT_SWEEP_RESULT,
+        concat([
+            DataFrame({
+                WEIGHTS: number,
+                '1': names[teams[:, 0]],
+                '2': names[teams[:, 1]],
+                '3': names[teams[:, 2]],
+                'result': scores,
+            })
+            for number, (teams, scores) in enumerate(result)
+        ]) if len(result) > 0 else DataFrame(),
+        page_title=permutation)
+
+def reduce_handler() -> None:
+    '''
+    Pick the top <results-size> teams for each weight vector of each evaluation
+    from the swept partitions. With a results diversity, only the best team per
+    diversity key is picked for each weight vector.
+    '''
+    configure()
+    evaluation_data: DataFrame = read_store(DataType.EVALUATION)
+    results_size: int = ConfigurationService().get_configuration_property('results-size')
+    diversity: Diversity = get_results_diversity()
+    for evaluation_name in evaluation_data[EvaluationColumn.EVALUATION_NAME.value]:
+        results: list[DataFrame] = []
+        partitions: int = get_partition_count(evaluation_name)
+        counter = 0
+        while partitions is None or counter < partitions:
+            next_result: DataFrame = read_store(
+                DataType.WEIGHT_SWEEP_RESULT, evaluation_name + '.' + str(counter))
+            if next_result.empty:
+                break
+            results.append(next_result)
+            counter += 1
+        if len(results) == 0:
+            continue
+        result: DataFrame = concat(results).sort_values(
+            by=[WEIGHTS, 'result'], ascending=[True, False], kind='stable')
+        if diversity != Diversity.NONE:
+            result = _keep_diverse(evaluation_name, result, diversity)
+        write_store(
+            DataType.WEIGHT_SWEEP_RESULT,
+            result.groupby(WEIGHTS).head(results_size).reset_index(drop=True),
+            evaluation_name)
+
+if __name__ == '__main__':
+    handler({'permutation': 'my-first-gl-evaluation.0'}, {})
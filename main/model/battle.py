@@ -0,0 +1,201 @@
+'''
+Vectorised simulation of one-on-one PvP battles, advancing many pairings turn by turn at once.
+'''
+from enum import Enum
+
+import numpy
+from pandas import CategoricalDtype, DataFrame, Series
+
+from main.model.library import EnrichedLibraryColumn
+from main.model.referencedata import FastAttackColumn, PokemonType, PokemonTypeColumn
+
+# a battle that nobody has won after this many turns is stopped
+MAX_TURNS = 1000
+MAX_ENERGY = 100
+# multiplier applied to all damage dealt in PvP battles
+PVP_DAMAGE_BONUS = 1.3
+
+CHARGED_ATTACK_COLUMNS = [
+    (EnrichedLibraryColumn.CHARGED_ATTACK_1_DAMAGE,
+     EnrichedLibraryColumn.CHARGED_ATTACK_1_STAB,
+     EnrichedLibraryColumn.CHARGED_ATTACK_1_TYPE,
+     EnrichedLibraryColumn.CHARGED_ATTACK_1_ENERGY_COST),
+    (EnrichedLibraryColumn.CHARGED_ATTACK_2_DAMAGE,
+     EnrichedLibraryColumn.CHARGED_ATTACK_2_STAB,
+     EnrichedLibraryColumn.CHARGED_ATTACK_2_TYPE,
+     EnrichedLibraryColumn.CHARGED_ATTACK_2_ENERGY_COST),
+]
+
+class BattleColumn(Enum):
+    '''
+    Attribute of a DataFrame that represents the outcomes of battles.
+    '''
+    WON = 'Won'
+    REMAINING_HP = 'Remaining HP'
+    OPPONENT_REMAINING_HP = 'Opponent remaining HP'
+    TURNS = 'Turns'
+
+# the names of Pokemon types in the order of PokemonType, followed by the empty type of
+# Pokemon with a single type, so that the codes of type columns with these categories
+# are the positions of their types in the multipliers of get_type_multipliers
+TYPE_CATEGORIES = CategoricalDtype([pokemon_type.value for pokemon_type in PokemonType] + [''])
+
+def pack_types(types: Series) -> Series:
+    '''
+    Store the names of Pokemon types as one-byte codes of TYPE_CATEGORIES, or leave
+    them as they are if any of them is not the name of a type.
+    '''
+    if not types.dropna().isin(TYPE_CATEGORIES.categories).all():
+        return types
+    return types.astype(TYPE_CATEGORIES)
+
+def get_type_positions(types: Series) -> numpy.ndarray:
+    '''
+    Convert the names of Pokemon types into their positions in PokemonType. Missing
+    types are converted into the position of the column of neutral multipliers
+    that get_type_multipliers adds to the type chart.
+    '''
+    if types.dtype == TYPE_CATEGORIES:
+        codes: numpy.ndarray = types.cat.codes.to_numpy(dtype=int)
+        return numpy.where(codes < 0, len(PokemonType), codes)
+    positions: dict[str, int] = {
+        pokemon_type.value: position for position, pokemon_type in enumerate(PokemonType)}
+    return Series(types.to_numpy(dtype=object)).map(positions) \
+        .fillna(len(PokemonType)).to_numpy(dtype=int)
+
+def get_type_multipliers(type_chart: DataFrame) -> numpy.ndarray:
+    '''
+    Convert the type chart into a matrix of damage multipliers with a row per
+    attack type and a column per defending type, plus a column of ones.
+    '''
+    type_names: list[str] = [pokemon_type.value for pokemon_type in PokemonType]
+    chart: DataFrame = type_chart.set_index('Type').loc[type_names, type_names]
+    return numpy.hstack([chart.to_numpy(dtype=float), numpy.ones((len(type_names), 1))])
+
+def get_effectiveness(
+        multipliers: numpy.ndarray,
+        attack_types: numpy.ndarray,
+        defenders: DataFrame) -> numpy.ndarray:
+    '''
+    Compute the damage multipliers of attacks of the provided types against
+    the types of the defenders. The positions of the attack types broadcast
+    against the defenders, so that they can either be paired with them or
+    be given as a column to compute a matrix of attack types and defenders.
+    '''
+    type_1: numpy.ndarray = get_type_positions(defenders[PokemonTypeColumn.TYPE_1.value])
+    type_2: numpy.ndarray = get_type_positions(defenders[PokemonTypeColumn.TYPE_2.value])
+    return multipliers[attack_types, type_1] * multipliers[attack_types, type_2]
+
+def _get_values(pokemon: DataFrame, column: Enum) -> numpy.ndarray:
+    return pokemon[column.value].to_numpy(dtype=float)
+
+class _Combatant:
+    '''
+    One side of many battles at once: the moves of its Pokemon, with their
+    damage against the paired opponents, and the state of the battles.
+    '''
+    # pylint: disable=too-many-instance-attributes
+    def __init__(
+            self,
+            attackers: DataFrame,
+            defenders: DataFrame,
+            multipliers: numpy.ndarray) -> None:
+        ratio: numpy.ndarray = _get_values(attackers, EnrichedLibraryColumn.REAL_ATTACK) / \
+            _get_values(defenders, EnrichedLibraryColumn.REAL_DEFENCE)
+        def damage(power: Enum, stab: Enum, attack_type: Enum) -> numpy.ndarray:
+            effectiveness: numpy.ndarray = get_effectiveness(
+                multipliers, get_type_positions(attackers[attack_type.value]), defenders)
+            return numpy.floor(0.5 * _get_values(attackers, power) * ratio * \
+                _get_values(attackers, stab) * effectiveness * PVP_DAMAGE_BONUS) + 1
+        self.attack: numpy.ndarray = _get_values(attackers, EnrichedLibraryColumn.REAL_ATTACK)
+        self.max_hp: numpy.ndarray = _get_values(attackers, EnrichedLibraryColumn.REAL_HP)
+        self.fast_damage: numpy.ndarray = damage(
+            FastAttackColumn.DAMAGE, EnrichedLibraryColumn.FAST_ATTACK_STAB, FastAttackColumn.TYPE)
+        self.fast_turns: numpy.ndarray = attackers[FastAttackColumn.TURNS.value].to_numpy(dtype=int)
+        self.fast_energy: numpy.ndarray = _get_values(attackers, FastAttackColumn.ENERGY_GENERATED)
+        # a row per charged attack; energy costs are stored as negative numbers
+        self.charged_damage: numpy.ndarray = numpy.array([
+            damage(power, stab, attack_type)
+            for power, stab, attack_type, _ in CHARGED_ATTACK_COLUMNS])
+        self.charged_cost: numpy.ndarray = numpy.array([
+            -_get_values(attackers, cost) for _, _, _, cost in CHARGED_ATTACK_COLUMNS])
+        self.hp: numpy.ndarray = self.max_hp.copy()
+        self.energy: numpy.ndarray = numpy.zeros(len(attackers))
+        # turns until the fast attack in progress lands, or 0 if there is none
+        self.cooldown: numpy.ndarray = numpy.zeros(len(attackers), dtype=int)
+
+    def charge(self, opponent: '_Combatant', active: numpy.ndarray) -> numpy.ndarray:
+        '''
+        Use the most damaging affordable charged attack in the active battles in
+        which no fast attack is in progress, and return where one was used.
+        '''
+        affordable: numpy.ndarray = self.charged_cost <= self.energy
+        fired: numpy.ndarray = active & (self.cooldown == 0) & affordable.any(axis=0)
+        attack: numpy.ndarray = numpy.where(affordable, self.charged_damage, 0).argmax(axis=0)
+        battles: numpy.ndarray = numpy.flatnonzero(fired)
+        opponent.hp[battles] -= self.charged_damage[attack[battles], battles]
+        self.energy[battles] -= self.charged_cost[attack[battles], battles]
+        return fired
+
+    def start_fast(self, idle: numpy.ndarray) -> None:
+        '''
+        Start a fast attack in the provided battles.
+        '''
+        self.cooldown[idle] = self.fast_turns[idle]
+
+    def land_fast(self, opponent: '_Combatant', active: numpy.ndarray) -> None:
+        '''
+        Advance the fast attacks in progress in the active battles by a turn,
+        and deal their damage and gain their energy when they land.
+        '''
+        in_progress: numpy.ndarray = active & (self.cooldown > 0)
+        self.cooldown[in_progress] -= 1
+        landed: numpy.ndarray = in_progress & (self.cooldown == 0)
+        opponent.hp[landed] -= self.fast_damage[landed]
+        self.energy[landed] = numpy.minimum(
+            self.energy[landed] + self.fast_energy[landed], MAX_ENERGY)
+
+    def remaining_hp(self) -> numpy.ndarray:
+        '''
+        The share of its HP that the Pokemon has left in each battle.
+        '''
+        return numpy.maximum(self.hp, 0) / self.max_hp
+
+def simulate_battles(
+        pokemon: DataFrame,
+        opponents: DataFrame,
+        type_chart: DataFrame) -> DataFrame:
+    '''
+    Simulate the battles between the Pokemon and the opponents in the same rows
+    of two enriched libraries, all at once. In each turn, each side without a
+    fast attack in progress uses its most damaging affordable charged attack,
+    the one with the higher attack going first, or starts its fast attack;
+    fast attacks land simultaneously at the end of their duration. Shields
+    and switches are not simulated.
+    '''
+    multipliers: numpy.ndarray = get_type_multipliers(type_chart)
+    first: _Combatant = _Combatant(pokemon, opponents, multipliers)
+    second: _Combatant = _Combatant(opponents, pokemon, multipliers)
+    first_charges_first: numpy.ndarray = first.attack >= second.attack
+    turns: numpy.ndarray = numpy.zeros(len(pokemon), dtype=int)
+    active: numpy.ndarray = numpy.ones(len(pokemon), dtype=bool)
+    for _ in range(MAX_TURNS):
+        if not active.any():
+            break
+        fired: numpy.ndarray = first.charge(second, active & first_charges_first)
+        second_fired: numpy.ndarray = second.charge(first, active & (second.hp > 0))
+        fired |= first.charge(second, active & ~first_charges_first & (first.hp > 0))
+        first.start_fast(active & (first.cooldown == 0) & ~fired & (first.hp > 0))
+        second.start_fast(active & (second.cooldown == 0) & ~second_fired & (second.hp > 0))
+        # both fast attacks land even if the other one faints the Pokemon in the same turn
+        alive: numpy.ndarray = active & (first.hp > 0) & (second.hp > 0)
+        first.land_fast(second, alive)
+        second.land_fast(first, alive)
+        turns[active] += 1
+        active &= (first.hp > 0) & (second.hp > 0)
+    return DataFrame({
+        BattleColumn.WON.value: (first.hp > 0) & (second.hp <= 0),
+        BattleColumn.REMAINING_HP.value: first.remaining_hp(),
+        BattleColumn.OPPONENT_REMAINING_HP.value: second.remaining_hp(),
+        BattleColumn.TURNS.value: turns,
+    }, index=pokemon.index)
@@ -0,0 +1,116 @@
+'''
+Classes of Pokemon in an enriched library that are interchangeable in teams.
+'''
+from collections.abc import Iterator
+from enum import Enum
+from itertools import islice, product
+
+import numpy
+from pandas import DataFrame, factorize
+
+from main.model.evaluation import get_evaluated_columns
+from main.model.library import EnrichedLibraryColumn, LibraryColumn
+
+class Diversity(Enum):
+    '''
+    The way in which the top teams differ from each other: either not at all, or
+    only the best team is kept per set of Pokemon of the original library that their
+    Pokemon were optimised from, or per set of species of their Pokemon.
+    '''
+    NONE = 'none'
+    POKEMON = 'pokemon'
+    SPECIES = 'species'
+
+DIVERSITY_COLUMNS = {
+    Diversity.POKEMON: EnrichedLibraryColumn.ORIGINAL_NAME,
+    Diversity.SPECIES: LibraryColumn.POKEMON_TYPE,
+}
+
+class EquivalenceClasses:
+    '''
+    A grouping of the Pokemon in an enriched library into classes of Pokemon
+    that have the same values in every column that evaluation features and
+    constraints read, such as duplicate catches or different Pokemon that
+    evolve into the same optimised form. Teams can then be enumerated over
+    classes rather than Pokemon, as long as no class is used in a team more
+    often than it has members. Classes are numbered in the order of their
+    first member in the library, and that member represents the class. With a
+    diversity, the members of a class also share the key that teams are told apart by.
+    '''
+    def __init__(self, library: DataFrame, diversity: Diversity = Diversity.NONE) -> None:
+        columns: list[str] = get_evaluated_columns(library.columns)
+        self.diversity: Diversity = diversity
+        self.keys: numpy.ndarray = None
+        if diversity in DIVERSITY_COLUMNS:
+            column: str = DIVERSITY_COLUMNS[diversity].value
+            columns.append(column)
+            self.keys = factorize(library[column])[0]
+        self.classes: numpy.ndarray = numpy.zeros(len(library), dtype=int)
+        if len(library) > 0 and len(columns) > 0:
+            self.classes = library.groupby(
+                columns,
+                sort=False,
+                observed=True,
+                dropna=False).ngroup().to_numpy()
+        _, self.representatives, self.sizes = numpy.unique(
+            self.classes, return_index=True, return_counts=True)
+        members: numpy.ndarray = numpy.argsort(self.classes, kind='stable')
+        self.members: list[numpy.ndarray] = numpy.split(members, numpy.cumsum(self.sizes)[:-1])
+
+    def __len__(self) -> int:
+        return len(self.representatives)
+
+    def allow(self, teams: numpy.ndarray) -> numpy.ndarray:
+        '''
+        Check for many teams of classes at once whether each class
+        in the team has enough members to fill its places in the team.
+        '''
+        first, second, third = teams[:, 0], teams[:, 1], teams[:, 2]
+        places: numpy.ndarray = 1 + (first == second) + (first == third)
+        allowed: numpy.ndarray = self.sizes[first] >= places
+        allowed &= (second == first) | (self.sizes[second] >= 1 + (second == third))
+        return allowed
+
+    def team_key(self, team: tuple[int, ...]) -> tuple[int, ...]:
+        '''
+        The key by which the diversity tells the team of Pokemon at the provided
+        positions in the library apart from other teams, regardless of their order.
+        '''
+        return tuple(sorted(self.keys[list(team)].tolist()))
+
+    def expand(self, team: tuple[int, ...], limit: int) -> Iterator[tuple[int, ...]]:
+        '''
+        Enumerate, up to the limit, the teams of distinct Pokemon that the team
+        of Pokemon at the provided positions in the library stands for, by
+        replacing each Pokemon with each of the members of its class.
+        '''
+        teams: Iterator[tuple[int, ...]] = product(
+            *[self.members[self.classes[position]].tolist() for position in team])
+        return islice(
+            (expanded for expanded in teams if len(set(expanded)) == len(expanded)), limit)
+
+    def expand_teams(
+            self,
+            teams: numpy.ndarray,
+            scores: numpy.ndarray,
+            limit: int) -> tuple[numpy.ndarray, numpy.ndarray]:
+        '''
+        Expand teams, given as an array with a row of three positions in the library
+        per team, in order, into up to <limit> teams of distinct Pokemon, each of
+        which has the score of the team that it was expanded from. With a diversity,
+        each team is only expanded into one team, since the teams that it stands
+        for all have the same key.
+        '''
+        expanded_teams: list[tuple[int, ...]] = []
+        expanded_scores: list[float] = []
+        for team, score in zip(teams.tolist(), scores.tolist()):
+            per_team: int = limit - len(expanded_teams)
+            if self.keys is not None:
+                per_team = min(per_team, 1)
+            for expanded in self.expand(tuple(team), per_team):
+                expanded_teams.append(expanded)
+                expanded_scores.append(score)
+            if len(expanded_teams) >= limit:
+                break
+        return numpy.array(expanded_teams, dtype=int).reshape(-1, 3), \
+            numpy.array(expanded_scores, dtype=float)
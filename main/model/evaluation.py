@@ -5,10 +5,11 @@ from enum import Enum
 from functools import total_ordering
 from typing import Any
 
+import numpy
 from pandas import DataFrame, Series
 
 from main.model.library import EnrichedLibraryColumn, LibraryColumn
-from main.model.referencedata import PokemonType
+from main.model.referencedata import PokemonType, PokemonTypeColumn
 
 class EvaluationColumn(Enum):
     '''
@@ -22,8 +23,15 @@ class EvaluationColumn(Enum):
     ATTACK_CYCLE_LENGTH_INVERTED_WEIGHT = 'attack-cycle-length-inverted-weight'
     ATTACK_CYCLE_DAMAGE_WEIGHT = 'attack-cycle-damage-weight'
     TYPE_VULNERABILITY_WEIGHT = 'type-vulnerability-weight'
+    META_COVERAGE_WEIGHT = 'meta-coverage-weight'
+    META_BATTLE_WEIGHT = 'meta-battle-weight'
     # constraints
     MAX_CP_CONSTRAINT = 'max-cp-constraint'
+    ALLOWED_TYPES_CONSTRAINT = 'allowed-types-constraint'
+    ALLOWED_SPECIES_CONSTRAINT = 'allowed-species-constraint'
+    BANNED_SPECIES_CONSTRAINT = 'banned-species-constraint'
+    # team constraints
+    UNIQUE_TYPES_CONSTRAINT = 'unique-types-constraint'
     # attack evaluation weights
     ATTACK_CYCLE_LENGTH_INVERTED_AE_WEIGHT = 'attack-cycle-length-inverted-attack-evaluation-weight'
     ATTACK_CYCLE_DAMAGE_AE_WEIGHT = 'attack-cycle-damage-attack-evaluation-weight'
@@ -52,6 +60,19 @@ def _sum_inverted_attack_cycle_length(team: list[dict[str, Any]]) -> float:
 def _evaluate_max_cp(pokemon: dict[str, Any], constraint: Any) -> bool:
     return pokemon.get(EnrichedLibraryColumn.CP.value) <= constraint
 
+def _has_type(pokemon: dict[str, Any], pokemon_type: str) -> bool:
+    return pokemon.get(PokemonTypeColumn.TYPE_1.value) == pokemon_type or \
+        pokemon.get(PokemonTypeColumn.TYPE_2.value) == pokemon_type
+
+def _evaluate_allowed_types(pokemon: dict[str, Any], constraint: Any) -> bool:
+    return len(constraint) == 0 or any(_has_type(pokemon, t) for t in constraint)
+
+def _evaluate_allowed_species(pokemon: dict[str, Any], constraint: Any) -> bool:
+    return len(constraint) == 0 or pokemon.get(LibraryColumn.POKEMON_TYPE.value) in constraint
+
+def _evaluate_banned_species(pokemon: dict[str, Any], constraint: Any) -> bool:
+    return pokemon.get(LibraryColumn.POKEMON_TYPE.value) not in constraint
+
 def _sum_attack_cycle_damage(team: list[dict[str, Any]]) -> float:
     return _sum_team_attribute(team, EnrichedLibraryColumn.DPT_1)
 
@@ -77,6 +98,32 @@ def _sum_attack_type_weakness(team: list[dict[str, Any]]) -> float:
         result -= 1.0 if weak else 0.0
     return result
 
+# the enriched library holds a column with this suffix per Pokemon in the configured meta,
+# with the ratio of how long the Pokemon lasts against it to how long the opponent lasts
+MATCHUP_SUFFIX = '_matchup'
+
+# and a column with this suffix per Pokemon in the meta with the outcome of a simulated
+# battle against it: the share of HP the Pokemon has left minus the share the opponent has left
+BATTLE_SUFFIX = '_battle'
+
+def _get_matchup_columns(pokemon: dict[str, Any], suffix: str = MATCHUP_SUFFIX) -> list[str]:
+    return [column for column in pokemon if column.endswith(suffix)]
+
+def _count_meta_coverage(team: list[dict[str, Any]], columns: list[str] = None) -> float:
+    result: float = 0.0
+    for column in _get_matchup_columns(team[0]) if columns is None else columns:
+        for pokemon in team:
+            if pokemon.get(column) > 1.0:
+                result += 1.0
+                break
+    return result
+
+def _sum_best_battle_outcomes(team: list[dict[str, Any]], columns: list[str] = None) -> float:
+    result: float = 0.0
+    for column in _get_matchup_columns(team[0], BATTLE_SUFFIX) if columns is None else columns:
+        result += max(pokemon.get(column) for pokemon in team)
+    return result
+
 FEATURE_EVALUATIONS = {
     EvaluationColumn.ATTACK_WEIGHT: _sum_team_attack,
     EvaluationColumn.DEFENCE_WEIGHT: _sum_team_defence,
@@ -84,12 +131,187 @@ FEATURE_EVALUATIONS = {
     EvaluationColumn.ATTACK_CYCLE_LENGTH_INVERTED_WEIGHT: _sum_inverted_attack_cycle_length,
     EvaluationColumn.ATTACK_CYCLE_DAMAGE_WEIGHT: _sum_attack_cycle_damage,
     EvaluationColumn.TYPE_VULNERABILITY_WEIGHT: _sum_type_vuln_across_team,
+    EvaluationColumn.META_COVERAGE_WEIGHT: _count_meta_coverage,
+    EvaluationColumn.META_BATTLE_WEIGHT: _sum_best_battle_outcomes,
+}
+
+# the suffix of the columns that each feature against the meta reads
+META_FEATURE_SUFFIXES = {
+    EvaluationColumn.META_COVERAGE_WEIGHT: MATCHUP_SUFFIX,
+    EvaluationColumn.META_BATTLE_WEIGHT: BATTLE_SUFFIX,
+}
+
+def _vector_sum_team_attribute(
+        library: DataFrame,
+        teams: numpy.ndarray,
+        attribute: EnrichedLibraryColumn) -> numpy.ndarray:
+    values: numpy.ndarray = library[attribute.value].to_numpy(dtype=float)
+    return values[teams[:, 0]] + values[teams[:, 1]] + values[teams[:, 2]]
+
+def _vector_sum_team_attack(library: DataFrame, teams: numpy.ndarray) -> numpy.ndarray:
+    return _vector_sum_team_attribute(library, teams, EnrichedLibraryColumn.REAL_ATTACK)
+
+def _vector_sum_team_defence(library: DataFrame, teams: numpy.ndarray) -> numpy.ndarray:
+    return _vector_sum_team_attribute(library, teams, EnrichedLibraryColumn.REAL_DEFENCE)
+
+def _vector_sum_team_hp(library: DataFrame, teams: numpy.ndarray) -> numpy.ndarray:
+    return _vector_sum_team_attribute(library, teams, EnrichedLibraryColumn.REAL_HP)
+
+def _vector_sum_inverted_attack_cycle_length(
+        library: DataFrame,
+        teams: numpy.ndarray) -> numpy.ndarray:
+    inverted: numpy.ndarray = 1.0 / library[
+        EnrichedLibraryColumn.ATTACK_CYCLE_1_LENGTH.value].to_numpy(dtype=float)
+    return inverted[teams[:, 0]] + inverted[teams[:, 1]] + inverted[teams[:, 2]]
+
+def _vector_sum_attack_cycle_damage(library: DataFrame, teams: numpy.ndarray) -> numpy.ndarray:
+    return _vector_sum_team_attribute(library, teams, EnrichedLibraryColumn.DPT_1)
+
+def _vector_sum_type_vuln_across_team(
+        library: DataFrame,
+        teams: numpy.ndarray) -> numpy.ndarray:
+    vulnerable: numpy.ndarray = library[
+        [pokemon_type.value + '_vuln' for pokemon_type in PokemonType]].to_numpy(dtype=float) > 1.0
+    team_vulnerable: numpy.ndarray = \
+        vulnerable[teams[:, 0]] & vulnerable[teams[:, 1]] & vulnerable[teams[:, 2]]
+    return -team_vulnerable.sum(axis=1).astype(float)
+
+def _vector_count_meta_coverage(library: DataFrame, teams: numpy.ndarray) -> numpy.ndarray:
+    wins: numpy.ndarray = library[
+        _get_matchup_columns(library.columns)].to_numpy(dtype=float) > 1.0
+    team_wins: numpy.ndarray = wins[teams[:, 0]] | wins[teams[:, 1]] | wins[teams[:, 2]]
+    return team_wins.sum(axis=1).astype(float)
+
+def _vector_sum_best_battle_outcomes(
+        library: DataFrame,
+        teams: numpy.ndarray) -> numpy.ndarray:
+    outcomes: numpy.ndarray = library[
+        _get_matchup_columns(library.columns, BATTLE_SUFFIX)].to_numpy(dtype=float)
+    best: numpy.ndarray = numpy.maximum(
+        numpy.maximum(outcomes[teams[:, 0]], outcomes[teams[:, 1]]), outcomes[teams[:, 2]])
+    return best.sum(axis=1)
+
+# the same features as FEATURE_EVALUATIONS, computed for many teams at once from
+# the rows of the enriched library that the teams consist of
+VECTOR_FEATURE_EVALUATIONS = {
+    EvaluationColumn.ATTACK_WEIGHT: _vector_sum_team_attack,
+    EvaluationColumn.DEFENCE_WEIGHT: _vector_sum_team_defence,
+    EvaluationColumn.HP_WEIGHT: _vector_sum_team_hp,
+    EvaluationColumn.ATTACK_CYCLE_LENGTH_INVERTED_WEIGHT: _vector_sum_inverted_attack_cycle_length,
+    EvaluationColumn.ATTACK_CYCLE_DAMAGE_WEIGHT: _vector_sum_attack_cycle_damage,
+    EvaluationColumn.TYPE_VULNERABILITY_WEIGHT: _vector_sum_type_vuln_across_team,
+    EvaluationColumn.META_COVERAGE_WEIGHT: _vector_count_meta_coverage,
+    EvaluationColumn.META_BATTLE_WEIGHT: _vector_sum_best_battle_outcomes,
 }
 
+# features whose value for a team is the sum of their values for its Pokemon
+ADDITIVE_FEATURES = [
+    EvaluationColumn.ATTACK_WEIGHT,
+    EvaluationColumn.DEFENCE_WEIGHT,
+    EvaluationColumn.HP_WEIGHT,
+    EvaluationColumn.ATTACK_CYCLE_LENGTH_INVERTED_WEIGHT,
+    EvaluationColumn.ATTACK_CYCLE_DAMAGE_WEIGHT,
+]
+
 CONSTRAINT_EVALUATIONS = {
     EvaluationColumn.MAX_CP_CONSTRAINT: _evaluate_max_cp,
+    EvaluationColumn.ALLOWED_TYPES_CONSTRAINT: _evaluate_allowed_types,
+    EvaluationColumn.ALLOWED_SPECIES_CONSTRAINT: _evaluate_allowed_species,
+    EvaluationColumn.BANNED_SPECIES_CONSTRAINT: _evaluate_banned_species,
+}
+
+# constraints on teams rather than on each of their Pokemon
+TEAM_CONSTRAINTS = [EvaluationColumn.UNIQUE_TYPES_CONSTRAINT]
+
+# constraints whose values are lists of types or species
+LIST_CONSTRAINTS = [
+    EvaluationColumn.ALLOWED_TYPES_CONSTRAINT,
+    EvaluationColumn.ALLOWED_SPECIES_CONSTRAINT,
+    EvaluationColumn.BANNED_SPECIES_CONSTRAINT,
+    EvaluationColumn.UNIQUE_TYPES_CONSTRAINT,
+]
+
+def _vector_evaluate_max_cp(library: DataFrame, constraint: Any) -> numpy.ndarray:
+    return library[EnrichedLibraryColumn.CP.value].to_numpy() <= constraint
+
+def _vector_has_type(library: DataFrame, pokemon_type: str) -> numpy.ndarray:
+    return (library[PokemonTypeColumn.TYPE_1.value] == pokemon_type).to_numpy() | \
+        (library[PokemonTypeColumn.TYPE_2.value] == pokemon_type).to_numpy()
+
+def _vector_evaluate_allowed_types(library: DataFrame, constraint: Any) -> numpy.ndarray:
+    if len(constraint) == 0:
+        return numpy.ones(len(library), dtype=bool)
+    return numpy.logical_or.reduce([_vector_has_type(library, t) for t in constraint])
+
+def _vector_evaluate_allowed_species(library: DataFrame, constraint: Any) -> numpy.ndarray:
+    if len(constraint) == 0:
+        return numpy.ones(len(library), dtype=bool)
+    return library[LibraryColumn.POKEMON_TYPE.value].isin(constraint).to_numpy()
+
+def _vector_evaluate_banned_species(library: DataFrame, constraint: Any) -> numpy.ndarray:
+    return ~library[LibraryColumn.POKEMON_TYPE.value].isin(constraint).to_numpy()
+
+# the same constraints as CONSTRAINT_EVALUATIONS, evaluated for every Pokemon in the library
+VECTOR_CONSTRAINT_EVALUATIONS = {
+    EvaluationColumn.MAX_CP_CONSTRAINT: _vector_evaluate_max_cp,
+    EvaluationColumn.ALLOWED_TYPES_CONSTRAINT: _vector_evaluate_allowed_types,
+    EvaluationColumn.ALLOWED_SPECIES_CONSTRAINT: _vector_evaluate_allowed_species,
+    EvaluationColumn.BANNED_SPECIES_CONSTRAINT: _vector_evaluate_banned_species,
 }
 
+def masks_allow_teams(first: Any, second: Any, third: Any) -> Any:
+    '''
+    Check whether the team rule masks of the Pokemon in a team, or in many teams
+    at once, allow the team: no bit may be set in the masks of two of its Pokemon.
+    '''
+    return ((first & second) | (first & third) | (second & third)) == 0
+
+def _read_list(value: Any) -> list[str]:
+    # lists are stored as comma-separated values, so that evaluations fit into tables
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(',') if item.strip() != '']
+    if isinstance(value, list):
+        return value
+    return []
+
+# the columns of the enriched library that the features and constraints read, and
+# the suffixes of the groups of columns that they read
+EVALUATED_COLUMNS = [
+    PokemonTypeColumn.TYPE_1.value,
+    PokemonTypeColumn.TYPE_2.value,
+    EnrichedLibraryColumn.REAL_ATTACK.value,
+    EnrichedLibraryColumn.REAL_DEFENCE.value,
+    EnrichedLibraryColumn.REAL_HP.value,
+    EnrichedLibraryColumn.ATTACK_CYCLE_1_LENGTH.value,
+    EnrichedLibraryColumn.DPT_1.value,
+    EnrichedLibraryColumn.CP.value,
+]
+EVALUATED_SUFFIXES = ('_vuln', MATCHUP_SUFFIX, BATTLE_SUFFIX)
+
+def get_evaluated_columns(columns: list[str]) -> list[str]:
+    '''
+    Select the columns of an enriched library that any evaluation feature or
+    constraint reads, regardless of its weight, so that Pokemon with the same
+    values in these columns are evaluated the same way in every evaluation.
+    '''
+    return [
+        column for column in columns
+        if column in EVALUATED_COLUMNS or column.endswith(EVALUATED_SUFFIXES)]
+
+def evaluate_features(
+        library: DataFrame,
+        teams: numpy.ndarray,
+        features: list[EvaluationColumn]) -> numpy.ndarray:
+    '''
+    Compute the values of the provided features for many teams at once. The teams
+    are given as an array with a row of three positions in the enriched library
+    per team, and the result has a row per team and a column per feature.
+    '''
+    result: numpy.ndarray = numpy.zeros((len(teams), len(features)))
+    for column, feature in enumerate(features):
+        result[:, column] = VECTOR_FEATURE_EVALUATIONS[feature](library, teams)
+    return result
+
 ATTACK_FEATURE_EVALUATIONS = {
     EvaluationColumn.ATTACK_CYCLE_LENGTH_INVERTED_AE_WEIGHT:
         _sum_inverted_attack_cycle_length,
@@ -117,12 +339,22 @@ class Evaluation:
             EvaluationColumn.ATTACK_CYCLE_DAMAGE_WEIGHT: row.get(
                 EvaluationColumn.ATTACK_CYCLE_DAMAGE_WEIGHT.value, 0),
             EvaluationColumn.TYPE_VULNERABILITY_WEIGHT: row.get(
-                EvaluationColumn.TYPE_VULNERABILITY_WEIGHT.value, 0)
+                EvaluationColumn.TYPE_VULNERABILITY_WEIGHT.value, 0),
+            EvaluationColumn.META_COVERAGE_WEIGHT: row.get(
+                EvaluationColumn.META_COVERAGE_WEIGHT.value, 0),
+            EvaluationColumn.META_BATTLE_WEIGHT: row.get(
+                EvaluationColumn.META_BATTLE_WEIGHT.value, 0)
         }
         self.constraints: dict[str, Any] = {
             EvaluationColumn.MAX_CP_CONSTRAINT: row.get(
                 EvaluationColumn.MAX_CP_CONSTRAINT.value, None)
+        } | {
+            constraint: _read_list(row.get(constraint.value, None))
+            for constraint in LIST_CONSTRAINTS if constraint in CONSTRAINT_EVALUATIONS
         }
+        # types of which a team may have at most one Pokemon
+        self.unique_types: list[str] = _read_list(
+            row.get(EvaluationColumn.UNIQUE_TYPES_CONSTRAINT.value, None))
         self.attack_evaluation_weights: dict[str, int] = {
             EvaluationColumn.ATTACK_CYCLE_LENGTH_INVERTED_AE_WEIGHT: row.get(
                 EvaluationColumn.ATTACK_CYCLE_LENGTH_INVERTED_AE_WEIGHT.value, 0),
@@ -131,15 +363,40 @@ class Evaluation:
             EvaluationColumn.ATTACK_TYPE_WEAKNESS_AE_WEIGHT: row.get(
                 EvaluationColumn.ATTACK_TYPE_WEAKNESS_AE_WEIGHT.value, 0)
         }
+        # suffix -> the columns of the enriched library that a feature against the meta reads
+        self.matchup_columns: dict[str, list[str]] = None
+
+    def use_library_columns(self, columns: list[str]) -> None:
+        '''
+        Resolve the columns of the enriched library that the features against
+        the meta read, once for all the teams that are evaluated from it. If it
+        is not called, the columns are resolved from the first team evaluated.
+        '''
+        self.matchup_columns = {
+            suffix: _get_matchup_columns(columns, suffix)
+            for suffix in META_FEATURE_SUFFIXES.values()}
+
+    def _get_matchup_columns(self, pokemon: dict[str, Any], suffix: str) -> list[str]:
+        if self.matchup_columns is None:
+            self.use_library_columns(list(pokemon))
+        return self.matchup_columns[suffix]
+
+    def _evaluate_feature(self, feature: EvaluationColumn, team: list[dict[str, Any]]) -> float:
+        if feature in META_FEATURE_SUFFIXES:
+            return FEATURE_EVALUATIONS[feature](
+                team, self._get_matchup_columns(team[0], META_FEATURE_SUFFIXES[feature]))
+        return FEATURE_EVALUATIONS[feature](team)
 
     def evaluate_team(self, team: list[dict[str, Any]]) -> float:
         '''
         Evaluate the team of the Pokemon by multiplying the evaluation feature
         values by the weights of those features, and summing the results.
+        Features with a weight of 0 are not computed.
         '''
         score = 0
         for feature, weight in self.weights.items():
-            score += FEATURE_EVALUATIONS[feature](team) * weight
+            if weight != 0:
+                score += self._evaluate_feature(feature, team) * weight
         return score
 
     def explain_team(self, team: list[dict[str, Any]]) -> dict[str, float]:
@@ -150,7 +407,7 @@ class Evaluation:
         result = {}
         score = 0
         for feature, weight in self.weights.items():
-            value: float = FEATURE_EVALUATIONS[feature](team)
+            value: float = self._evaluate_feature(feature, team)
             score += value * weight
             result[feature.value.replace('-weight', '')] = {
                 'value': value,
@@ -159,6 +416,52 @@ class Evaluation:
         result['score'] = score
         return result
 
+    def explain_teams(self, library: DataFrame, teams: numpy.ndarray) -> list[dict[str, float]]:
+        '''
+        Provide breakdowns of the evaluations of many teams at once, in the same
+        form as explain_team. The teams are given as an array with a row of three
+        positions in the enriched library per team.
+        '''
+        scores: numpy.ndarray = numpy.zeros(len(teams))
+        features: dict[str, tuple[numpy.ndarray, int]] = {}
+        for feature, weight in self.weights.items():
+            values: numpy.ndarray = VECTOR_FEATURE_EVALUATIONS[feature](library, teams)
+            scores = scores + values * weight
+            features[feature.value.replace('-weight', '')] = (values, weight)
+        result: list[dict[str, float]] = []
+        for team_number, score in enumerate(scores):
+            explanation: dict[str, Any] = {}
+            for feature, (values, weight) in features.items():
+                explanation[feature] = {
+                    'value': float(values[team_number]),
+                    'weight': weight,
+                }
+            explanation['score'] = float(score)
+            result.append(explanation)
+        return result
+
+    def bound_team_score(self, pokemon: list[dict[str, Any]]) -> float:
+        '''
+        Compute an upper bound on the score of any team of three of the provided
+        Pokemon. Additive features are bounded by the three Pokemon that contribute
+        the most to the score, and the other features by their most favourable value.
+        '''
+        weighted: list[EvaluationColumn] = [
+            feature for feature in ADDITIVE_FEATURES if self.weights[feature] != 0]
+        contributions: list[float] = sorted([
+            sum(FEATURE_EVALUATIONS[feature]([p]) * self.weights[feature] for feature in weighted)
+            for p in pokemon], reverse=True)
+        vulnerability_weight: float = self.weights[EvaluationColumn.TYPE_VULNERABILITY_WEIGHT]
+        meta_weight: float = self.weights[EvaluationColumn.META_COVERAGE_WEIGHT]
+        meta_size: int = len(self._get_matchup_columns(pokemon[0], MATCHUP_SUFFIX)) \
+            if pokemon and meta_weight != 0 else 0
+        # battle outcomes are between -1 and 1 per Pokemon in the meta
+        battle_weight: float = self.weights[EvaluationColumn.META_BATTLE_WEIGHT]
+        battles: int = len(self._get_matchup_columns(pokemon[0], BATTLE_SUFFIX)) \
+            if pokemon and battle_weight != 0 else 0
+        return sum(contributions[:3]) + max(0.0, -vulnerability_weight * len(PokemonType)) + \
+            max(0.0, meta_weight * meta_size) + abs(battle_weight) * battles
+
     def matches_constraints(self, pokemon: dict[str, Any]) -> bool:
         '''
         Evaluate whether the team matches the constraint values.
@@ -168,6 +471,48 @@ class Evaluation:
                 return False
         return True
 
+    def library_matches_constraints(self, library: DataFrame) -> numpy.ndarray:
+        '''
+        Evaluate for every Pokemon in the library at once whether it matches the constraint values.
+        '''
+        matches: numpy.ndarray = numpy.ones(len(library), dtype=bool)
+        for constraint, value in self.constraints.items():
+            matches &= VECTOR_CONSTRAINT_EVALUATIONS[constraint](library, value)
+        return matches
+
+    def teams_match_constraints(self, library: DataFrame, teams: numpy.ndarray) -> numpy.ndarray:
+        '''
+        Evaluate for many teams at once whether all their Pokemon match the constraint values.
+        '''
+        matches: numpy.ndarray = self.library_matches_constraints(library)
+        return matches[teams[:, 0]] & matches[teams[:, 1]] & matches[teams[:, 2]]
+
+    def get_team_mask(self, pokemon: dict[str, Any]) -> int:
+        '''
+        Compile the team rules for the Pokemon into a bitmask, with a bit set for each
+        type of which a team may have at most one Pokemon that the Pokemon has.
+        '''
+        mask: int = 0
+        for bit, pokemon_type in enumerate(self.unique_types):
+            if _has_type(pokemon, pokemon_type):
+                mask |= 1 << bit
+        return mask
+
+    def get_team_masks(self, library: DataFrame) -> numpy.ndarray:
+        '''
+        Compile the team rules into a bitmask for every Pokemon in the library at once.
+        '''
+        masks: numpy.ndarray = numpy.zeros(len(library), dtype=numpy.int64)
+        for bit, pokemon_type in enumerate(self.unique_types):
+            masks |= _vector_has_type(library, pokemon_type).astype(numpy.int64) << bit
+        return masks
+
+    def team_follows_rules(self, team: list[dict[str, Any]]) -> bool:
+        '''
+        Evaluate whether the team follows the team rules.
+        '''
+        return masks_allow_teams(*[self.get_team_mask(pokemon) for pokemon in team])
+
     def evaluate_attacks(self, pokemon: dict[str, Any]) -> int:
         '''
         Evaluate the attack combinations of the Pokemon in the team
@@ -185,11 +530,18 @@ class EvaluationResult:
     A class that represents the application of an evaluation model
     to a team of Pokemon. This class is sortable by evaluation result.
     '''
-    def __init__(self, team: list[dict[str, Any]], e: Evaluation):
+    def __init__(
+            self,
+            team: list[dict[str, Any]],
+            e: Evaluation,
+            positions: tuple[int, ...] = None):
         self.team: list[dict[str, Any]] = team
+        # the positions of the Pokemon in the enriched library, if known
+        self.positions: tuple[int, ...] = positions
         self.evaluation_name: str = e.evaluation_name
         self.names: list[str] = [pokemon[LibraryColumn.POKEMON_NAME.value] for pokemon in team]
-        team_matches: bool = all(e.matches_constraints(p) for p in team)
+        team_matches: bool = all(e.matches_constraints(p) for p in team) and \
+            e.team_follows_rules(team)
         self.result: float = 0 if not team_matches else e.evaluate_team(team)
 
     def __lt__(self, other) -> bool:
@@ -23,6 +23,7 @@ class EnrichedLibraryColumn(Enum):
     Attribute of a DataFrame that represents the Pokemon
     library, post-enrichment.
     '''
+    ORIGINAL_NAME = 'Original name'
     MAX_ATTACK = 'Max attack'
     MAX_DEFENCE = 'Max defence'
     MAX_HP = 'Max HP'
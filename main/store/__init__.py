@@ -2,10 +2,14 @@
 Interface and implementations for data storage.
 '''
 
-from main.store.core import clear_cache, read_store, write_store, DataType
+from main.store.core import clear_cache, flush_store, get_fingerprint, prefetch_store, \
+    query_store, read_store, write_store, DataStoreFactory, DataType
 
-# read the submodules to register the type adapters
-import main.store.configuration
-import main.store.googlesheets
-import main.store.localcsvfile
-import main.store.memory
+# register the type adapters by module, so that a module (and its dependencies)
+# is only imported when a data type is first configured to use it
+DataStoreFactory().register_module('configuration', 'main.store.configuration')
+DataStoreFactory().register_module('googlesheets', 'main.store.googlesheets')
+DataStoreFactory().register_module('localcsvfile', 'main.store.localcsvfile')
+DataStoreFactory().register_module('localnpyfile', 'main.store.localnpyfile')
+DataStoreFactory().register_module('memory', 'main.store.memory')
+DataStoreFactory().register_module('sqlite', 'main.store.sqlite')
@@ -0,0 +1,83 @@
+'''
+Size-bounded caching of DataFrames for data store implementations.
+'''
+from collections import OrderedDict
+from collections.abc import Callable
+import logging
+import threading
+from pandas import DataFrame
+
+logger = logging.getLogger(__name__)
+
+def get_size(data: DataFrame) -> int:
+    '''
+    Measure the number of bytes a DataFrame takes up in memory,
+    including the contents of object columns.
+    '''
+    return int(data.memory_usage(deep=True).sum())
+
+class DataFrameCache:
+    '''
+    A least-recently-used cache of DataFrames that is bounded by the total
+    memory usage of the cached DataFrames rather than by their number.
+    When the cache grows over its maximum size, the least recently used
+    DataFrames are evicted and handed to the optional eviction callback.
+    The cache can be shared between threads.
+    '''
+    def __init__(
+            self,
+            max_size: int,
+            on_evict: Callable[[str, DataFrame], None] = None) -> None:
+        self.max_size: int = max_size
+        self.on_evict: Callable[[str, DataFrame], None] = on_evict
+        self.entries: OrderedDict[str, tuple[DataFrame, int]] = OrderedDict()
+        self.size: int = 0
+        self.evictions: int = 0
+        self.lock: threading.RLock = threading.RLock()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> DataFrame:
+        '''
+        Retrieve a DataFrame from the cache and mark it as the most recently used,
+        or return None if the key is not cached.
+        '''
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+
+    def put(self, key: str, data: DataFrame) -> None:
+        '''
+        Add a DataFrame to the cache, evicting the least recently used
+        DataFrames if the cache grows over its maximum size.
+        '''
+        data_size: int = get_size(data)
+        with self.lock:
+            self.pop(key)
+            self.entries[key] = (data, data_size)
+            self.size += data_size
+            while self.size > self.max_size and self.entries:
+                evicted_key, (evicted, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+                logger.debug('Evicted %s (%d bytes) from the cache', evicted_key, evicted_size)
+                if self.on_evict is not None:
+                    self.on_evict(evicted_key, evicted)
+
+    def pop(self, key: str) -> DataFrame:
+        '''
+        Remove a DataFrame from the cache without treating it as an eviction,
+        and return it, or None if the key is not cached.
+        '''
+        with self.lock:
+            if key not in self.entries:
+                return None
+            data, data_size = self.entries.pop(key)
+            self.size -= data_size
+            return data
@@ -0,0 +1,71 @@
+'''
+Compact in-memory representation of DataFrames that keeps every value intact.
+'''
+import numpy
+from pandas import concat, CategoricalDtype, DataFrame, Index, Series
+
+# columns with at most this share of distinct values are stored as categories
+CATEGORY_RATIO = 0.5
+# largest magnitude up to which quarter steps are exact in 32-bit floating point
+FLOAT32_LIMIT = 2 ** 21
+INTEGER_TYPES = [numpy.int8, numpy.int16, numpy.int32]
+
+def _is_categorical(column: Series) -> bool:
+    return len(column) > 0 and column.nunique() <= len(column) * CATEGORY_RATIO
+
+def _compact_integers(column: Series) -> Series:
+    if column.empty:
+        return column
+    for integer_type in INTEGER_TYPES:
+        limits: numpy.iinfo = numpy.iinfo(integer_type)
+        if limits.min <= column.min() and column.max() <= limits.max:
+            return column.astype(integer_type)
+    return column
+
+def _compact_floats(column: Series) -> Series:
+    if _is_categorical(column):
+        return column.astype('category')
+    values: numpy.ndarray = column.to_numpy()
+    present: numpy.ndarray = values[~numpy.isnan(values)]
+    # quarter steps, such as levels and floored stats, are exact in 32 bits and
+    # print the same in text formats, so every consumer still sees the same values
+    if len(present) > 0 and numpy.abs(present).max() < FLOAT32_LIMIT and \
+            numpy.array_equal(present * 4, numpy.round(present * 4)):
+        return column.astype(numpy.float32)
+    return column
+
+def compact(data: DataFrame) -> DataFrame:
+    '''
+    Shrink the memory usage of a DataFrame without changing any of its values:
+    repeated strings and numbers become categories, and integers and exactly
+    representable floating point numbers use the narrowest type that holds them.
+    '''
+    columns: dict[str, Series] = {}
+    for column_name in data.columns:
+        column: Series = data[column_name]
+        kind: str = column.dtype.kind
+        if kind in 'iu':
+            column = _compact_integers(column)
+        elif kind == 'f':
+            column = _compact_floats(column)
+        elif kind == 'O' and _is_categorical(column):
+            column = column.astype('category')
+        columns[column_name] = column
+    return DataFrame(columns, index=data.index)
+
+def concat_compact(frames: list[DataFrame]) -> DataFrame:
+    '''
+    Concatenate compacted DataFrames with the same columns into one compacted
+    DataFrame. A column that holds categories in any of the DataFrames holds the
+    categories of all of them in the result, rather than falling back to objects,
+    and keeps its categories in their order if they are the same in all of them.
+    '''
+    dtypes: dict[str, CategoricalDtype] = {}
+    for column_name in frames[0].columns:
+        columns: list[Series] = [frame[column_name] for frame in frames]
+        if all(column.dtype == columns[0].dtype for column in columns):
+            continue
+        if any(isinstance(column.dtype, CategoricalDtype) for column in columns):
+            dtypes[column_name] = CategoricalDtype(Index(numpy.concatenate(
+                [numpy.asarray(column.dropna().unique()) for column in columns])).unique())
+    return compact(concat([frame.astype(dtypes) for frame in frames], ignore_index=True))
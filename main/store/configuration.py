@@ -9,7 +9,8 @@ from main.core.configuration import ConfigurationService, ConfigurationException
 from main.core.factory import factory_register
 from main.core.singleton import Singleton
 from main.model.evaluation import ATTACK_FEATURE_EVALUATIONS, CONSTRAINT_EVALUATIONS,\
-    FEATURE_EVALUATIONS, EvaluationColumn
+    FEATURE_EVALUATIONS, LIST_CONSTRAINTS, EvaluationColumn
+from main.model.library import LibraryColumn
 from main.store.core import DataStoreFactory, DataType
 
 TYPE = 'configuration'
@@ -23,6 +24,32 @@ def _extract_values(
         result[column.value].append(int(configuration.get(column.value.replace(suffix, ''), 0)))
     return result
 
+def _extract_lists(
+        configuration: dict[str, Any],
+        result: dict[str, list[str]],
+        columns: list[EvaluationColumn],
+        suffix: str):
+    for column in columns:
+        values: list[str] = configuration.get(column.value.replace(suffix, ''), [])
+        if isinstance(values, str):
+            # a single value may be given without a list
+            values = [values]
+        result[column.value].append(','.join(values))
+    return result
+
+def _read_weight_sweep(evaluation_name: str) -> DataFrame:
+    result: dict[str, list[int]] = {column.value: [] for column in FEATURE_EVALUATIONS}
+    weight_vectors: list[dict[str, Any]] = ConfigurationService().get_configuration_property(
+        'evaluation.' + evaluation_name + '.weight-sweep', default=[])
+    for weights in weight_vectors:
+        result = _extract_values(weights, result, FEATURE_EVALUATIONS.keys(), '-weight')
+    return DataFrame(result)
+
+def _read_meta(evaluation_name: str) -> DataFrame:
+    pokemon: list[str] = ConfigurationService().get_configuration_property(
+        'evaluation.' + evaluation_name + '.meta', default=[])
+    return DataFrame({LibraryColumn.POKEMON_TYPE.value: pokemon}, dtype=str)
+
 @factory_register(TYPE, DataStoreFactory())
 class ConfigurationStore(Singleton):
     '''
@@ -37,8 +64,13 @@ class ConfigurationStore(Singleton):
 
     def read_store(self, data_type: DataType, page_title: str = '') -> DataFrame:
         '''
-        Retrieve the DataFrame from values defined in configuration.
+        Retrieve the DataFrame from values defined in configuration. Weight sweeps
+        and meta lists are paged by the name of the evaluation they belong to.
         '''
+        if data_type == DataType.WEIGHT_SWEEP:
+            return _read_weight_sweep(page_title)
+        if data_type == DataType.META:
+            return _read_meta(page_title)
         if data_type != DataType.EVALUATION:
             raise ConfigurationException(
                 'Data type ' + data_type.value + ' not supported for configuration storage')
@@ -59,7 +91,12 @@ class ConfigurationStore(Singleton):
             result = _extract_values(
                 configs[model_name].get('constraints', {}),
                 result,
-                CONSTRAINT_EVALUATIONS.keys(),
+                [c for c in CONSTRAINT_EVALUATIONS if c not in LIST_CONSTRAINTS],
+                '-constraint')
+            result = _extract_lists(
+                configs[model_name].get('constraints', {}),
+                result,
+                LIST_CONSTRAINTS,
                 '-constraint')
             result = _extract_values(
                 configs[model_name].get('attack-evaluation-weights', {}),
@@ -2,15 +2,27 @@
 API for reading and writing data using underlying configured
 storage implementations.
 '''
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+import hashlib
+from itertools import groupby
 import logging
-from pandas import DataFrame
+import os
+import queue
+import threading
+from typing import Any
+import numpy
+from pandas import util, DataFrame
 
-from main.core.configuration import ConfigurationService
+from main.core.configuration import ConfigurationException, ConfigurationService
 from main.core.factory import Factory
+from main.core.singleton import Singleton
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PREFETCH_THREADS = 8
+
 class DataType(Enum):
     '''
     Types of data used in the calculation.
@@ -23,14 +35,20 @@ class DataType(Enum):
     CPM_REFERENCE_DATA = 'cpm-reference-data'
     DELTA = 'delta'
     ENRICHED_LIBRARY = 'enriched-library'
+    EXPLANATION = 'explanation'
     FAST_ATTACK_REFERENCE_DATA = 'fast-attack-reference-data'
     FAST_ATTACK_PER_POKEMON_REFERENCE_DATA = 'fast-attack-per-pokemon-reference-data'
     LIBRARY = 'library'
+    MANIFEST = 'manifest'
+    META = 'meta'
     PARTITION = 'partition'
     PARTITION_RESULT = 'partition-result'
     POKEMON_TYPE_REFERENCE_DATA = 'pokemon-type-reference-data'
     RESULT = 'result'
+    SEARCH_RESULT = 'search-result'
     TYPE_CHART_REFERENCE_DATA = 'type-chart-reference-data'
+    WEIGHT_SWEEP = 'weight-sweep'
+    WEIGHT_SWEEP_RESULT = 'weight-sweep-result'
 
 class DataStoreFactory(Factory):
     '''
@@ -38,6 +56,100 @@ class DataStoreFactory(Factory):
     storage provider classes.
     '''
 
+class _WriteBehind(Singleton):
+    '''
+    A queue of writes that a background thread applies to the data stores in
+    the order in which they were made. The writes that are queued while the
+    thread is busy are coalesced: of consecutive writes of the same data type,
+    only the last write of each page is applied, and data stores that can
+    write several pages at once get them in a single batch. Until a write is
+    applied, reads of its page see the pending data. A write that fails does
+    not keep the other writes from being applied, and the first error of a
+    write is raised by the next write or flush.
+    '''
+    def __init__(self) -> None:
+        if self.initialised:
+            return
+        self.queue: queue.Queue = queue.Queue()
+        self.lock: threading.Lock = threading.Lock()
+        # (data type, page title) -> data of the last write of the page that is not applied yet
+        self.pending: dict[tuple[DataType, str], DataFrame] = {}
+        self.error: Exception = None
+        self.thread: threading.Thread = None
+        # the thread does not survive when the process is forked, and the queue is left
+        # to the parent process, which applies the writes that were queued before the fork
+        os.register_at_fork(after_in_child=self._reset)
+        self.initialised = True
+
+    def _reset(self) -> None:
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.error = None
+        self.thread = None
+
+    def put(
+            self,
+            data_store: object,
+            data_type: DataType,
+            data: DataFrame,
+            page_title: str) -> None:
+        '''
+        Queue a write of the DataFrame to the page of the data store.
+        '''
+        self.raise_error()
+        with self.lock:
+            self.pending[(data_type, page_title)] = data
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+        self.queue.put((data_store, data_type, page_title, data))
+
+    def get(self, data_type: DataType, page_title: str) -> DataFrame:
+        '''
+        The data of the pending write of the page, or None if there is none.
+        '''
+        with self.lock:
+            return self.pending.get((data_type, page_title))
+
+    def flush(self) -> None:
+        '''
+        Wait until all queued writes are applied.
+        '''
+        self.queue.join()
+        self.raise_error()
+
+    def raise_error(self) -> None:
+        '''
+        Raise the error of a write that failed, if any, once.
+        '''
+        error: Exception = self.error
+        if error is not None:
+            self.error = None
+            raise error
+
+    def _run(self) -> None:
+        while True:
+            writes: list[tuple[object, DataType, str, DataFrame]] = [self.queue.get()]
+            while True:
+                try:
+                    writes.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for (data_store, data_type), batch in groupby(
+                    writes, key=lambda write: (write[0], write[1])):
+                try:
+                    _write_pages(data_store, data_type, {
+                        page_title: data for _, _, page_title, data in batch})
+                except Exception as error: # pylint: disable=broad-exception-caught
+                    self.error = self.error or error
+            with self.lock:
+                for _, data_type, page_title, data in writes:
+                    if self.pending.get((data_type, page_title)) is data:
+                        del self.pending[(data_type, page_title)]
+            for _ in writes:
+                self.queue.task_done()
+
 def read_store(
         data_type: DataType,
         page_title: str = '') -> DataFrame:
@@ -46,7 +158,11 @@ def read_store(
     that is configured for the provided data type.
     '''
     data_store = _get_data_store(data_type)
-    data: DataFrame = data_store.read_store(data_type, page_title)
+    data: DataFrame = _WriteBehind().get(data_type, page_title)
+    if data is not None:
+        logger.info('Read %d rows of pending %s data', len(data), data_type.value)
+        return data
+    data = data_store.read_store(data_type, page_title)
     logger.info('Read %d rows of %s data via a %s', len(data), data_type.value, type(data_store))
     return data
 
@@ -56,12 +172,67 @@ def write_store(
         page_title: str = '') -> None:
     '''
     Write the provided DataFrame to the type of data store
-    that is configured for the provided data type.
+    that is configured for the provided data type. With store.write-behind
+    enabled, the write is queued and applied in the background; see flush_store.
     '''
     data_store = _get_data_store(data_type)
+    if str(ConfigurationService().get_configuration_property(
+            'store.write-behind', 'false')).lower() == 'true':
+        _WriteBehind().put(data_store, data_type, data, page_title)
+        logger.info('Queued %d rows of %s data for a %s',
+                    len(data), data_type.value, type(data_store))
+        return
     data_store.write_store(data_type, data, page_title)
     logger.info('Written %d rows of %s data via a %s', len(data), data_type.value, type(data_store))
 
+def query_store(
+        data_type: DataType,
+        column: str,
+        values: list[Any],
+        page_title: str = '') -> DataFrame:
+    '''
+    Read the rows of a DataFrame whose value in the provided column is one
+    of the provided values. Data stores that support indexed lookups answer
+    the query directly; for the others, the whole DataFrame is read and filtered.
+    '''
+    data_store = _get_data_store(data_type)
+    data: DataFrame = _WriteBehind().get(data_type, page_title)
+    if data is not None:
+        if not data.empty:
+            data = data[data[column].isin(values)]
+    elif hasattr(data_store, 'query_store'):
+        data = data_store.query_store(data_type, column, values, page_title)
+    else:
+        data = data_store.read_store(data_type, page_title)
+        if not data.empty:
+            data = data[data[column].isin(values)]
+    logger.info('Queried %d rows of %s data via a %s', len(data), data_type.value, type(data_store))
+    return data
+
+def flush_store() -> None:
+    '''
+    Wait until the writes that are queued with store.write-behind are applied,
+    and raise the error of any write that failed. Handlers flush before they exit.
+    '''
+    _WriteBehind().flush()
+
+def prefetch_store(data_types: list[DataType]) -> dict[DataType, DataFrame]:
+    '''
+    Read the DataFrames of several data types in parallel, so that slow
+    data stores are waited on once rather than once per data type. The
+    reads go through read_store, so every data store keeps the DataFrames
+    in its own cache as usual.
+    '''
+    # construct the data stores up front, so that the threads do not race to initialise them
+    for data_type in data_types:
+        _get_data_store(data_type)
+    threads: int = int(ConfigurationService().get_configuration_property(
+        'prefetch-threads', DEFAULT_PREFETCH_THREADS))
+    with ThreadPoolExecutor(max_workers=max(1, min(threads, len(data_types)))) as executor:
+        data: list[DataFrame] = list(executor.map(read_store, data_types))
+    logger.info('Prefetched %d data types', len(data_types))
+    return dict(zip(data_types, data))
+
 def clear_cache(data_type: DataType) -> None:
     '''
     Re-initialise the data store that is used for the provider
@@ -71,6 +242,78 @@ def clear_cache(data_type: DataType) -> None:
     data_store.initialised = False
     logger.info('Cleared cache from %s', type(data_store))
 
+def _normalise_dtypes(data: DataFrame) -> DataFrame:
+    # the same values hash the same however they are stored: categories are decoded,
+    # numbers are 64-bit floats, and empty strings are missing, as in text formats
+    columns: list[numpy.ndarray] = []
+    for position in range(data.shape[1]):
+        values: numpy.ndarray = numpy.asarray(data.iloc[:, position])
+        if values.dtype.kind in 'iuf':
+            values = values.astype(numpy.float64)
+        elif values.dtype.kind == 'O':
+            values = numpy.where(values == '', numpy.nan, values)
+        columns.append(values)
+    return DataFrame(dict(enumerate(columns)))
+
+def get_fingerprint(data: DataFrame) -> str:
+    '''
+    Compute a fingerprint of the contents of a DataFrame, including its
+    column names and the order of its rows, that changes whenever the
+    contents change. The fingerprint only depends on the values, so the
+    same data has the same fingerprint in memory, in compact dtypes and
+    when it is read back from any data store.
+    '''
+    fingerprint = hashlib.sha1()
+    fingerprint.update('\0'.join(str(column) for column in data.columns).encode('utf8'))
+    if not data.empty:
+        fingerprint.update(util.hash_pandas_object(
+            _normalise_dtypes(data), index=False).to_numpy().tobytes())
+    return fingerprint.hexdigest()
+
+def get_local_directory(store_type: str) -> str:
+    '''
+    Resolve the local file system directory configured for a file-based
+    data store, creating it if it does not exist yet.
+    '''
+    directory: str = ConfigurationService().get_configuration_property(
+        store_type + '.directory', '')
+    if not os.path.exists(directory):
+        os.mkdir(directory)
+    if not os.path.isdir(directory):
+        raise ConfigurationException(directory + ' is not a directory')
+    return directory
+
+def _write_pages(data_store: object, data_type: DataType, pages: dict[str, DataFrame]) -> None:
+    if len(pages) > 1 and hasattr(data_store, 'write_pages'):
+        try:
+            data_store.write_pages(data_type, pages)
+            logger.info('Written %d pages of %s data via a %s',
+                        len(pages), data_type.value, type(data_store))
+            return
+        except Exception: # pylint: disable=broad-exception-caught
+            # a write replaces the whole page, so the pages can be written again one at a time
+            logger.warning('Writing %d pages of %s data at once failed, writing them one by one',
+                           len(pages), data_type.value)
+    # a page that fails to be written does not keep the others from being written,
+    # and the first error is raised once all of them have been tried
+    first_error: Exception = None
+    for page_title, data in pages.items():
+        try:
+            data_store.write_store(data_type, data, page_title)
+        except Exception as error: # pylint: disable=broad-exception-caught
+            logger.error('Writing page %s of %s data failed: %s',
+                         page_title, data_type.value, error)
+            first_error = first_error or error
+    if first_error is not None:
+        raise first_error
+    logger.info('Written %d pages of %s data via a %s',
+                len(pages), data_type.value, type(data_store))
+
 def _get_data_store(data_type: DataType) -> object:
     store_type: str = ConfigurationService().get_configuration_property('store.' + data_type.value)
     return DataStoreFactory().construct(store_type)
+
+@atexit.register
+def _flush_at_exit() -> None:
+    # writes that are still queued when a handler did not flush are applied before the process exits
+    _WriteBehind().queue.join()
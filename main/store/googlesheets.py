@@ -1,22 +1,31 @@
 '''
 Data store implementation using the Google Sheets API.
 '''
+import json
+import logging
 import os
-
+import threading
+import time
+import numpy
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build, Resource
-from pandas import DataFrame
+from pandas import to_numeric, DataFrame
 
 from main.core.configuration import ConfigurationService, ConfigurationException
 from main.core.factory import factory_register
 from main.core.singleton import Singleton
 from main.store.core import DataStoreFactory, DataType
+from main.store.schema import get_schema
+
+logger = logging.getLogger(__name__)
 
+TYPE = 'googlesheets'
 CREDENTIALS_FILE = 'credentials.json'
 TOKEN_FILE = 'token.json'
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
+DEFAULT_CACHE_DIRECTORY = '.googlesheets-cache'
 
 def _login() -> Credentials:
     creds: Credentials = None
@@ -33,40 +42,147 @@ def _login() -> Credentials:
             token.write(creds.to_json())
     return creds
 
-@factory_register('googlesheets', DataStoreFactory())
+def _get_sheet_range(data_type: DataType) -> tuple[str, str]:
+    spreadsheet_id: str = ConfigurationService().get_configuration_property(
+        TYPE + '.' + data_type.value + '.spreadsheet')
+    sheet_name: str = ConfigurationService().get_configuration_property(
+        TYPE + '.' + data_type.value + '.sheetname')
+    range_name: str = ConfigurationService().get_configuration_property(
+        TYPE + '.' + data_type.value + '.range')
+    return (spreadsheet_id, sheet_name + '!' + range_name)
+
+def _get_configured_data_types(data_type: DataType) -> list[DataType]:
+    '''
+    All data types that are stored in Google Sheets in this run, starting
+    with the data type that is being read.
+    '''
+    result: list[DataType] = [data_type]
+    for other_data_type in DataType:
+        if other_data_type == data_type:
+            continue
+        store_type: str = ConfigurationService().get_configuration_property(
+            'store.' + other_data_type.value, '')
+        if store_type == TYPE and ConfigurationService().get_configuration_property(
+                TYPE + '.' + other_data_type.value + '.spreadsheet', ''):
+            result.append(other_data_type)
+    return result
+
+def _apply_schema(data: DataFrame, data_type: DataType) -> DataFrame:
+    for column, column_type in get_schema(data_type).items():
+        if column not in data.columns or column_type is str:
+            continue
+        values = to_numeric(data[column])
+        # integer columns with missing values stay floating point, as they would in a CSV file
+        data[column] = values if values.isna().any() else values.astype(column_type)
+    return data
+
+def _to_data_frame(data_type: DataType, values: list[list]) -> DataFrame:
+    if len(values) == 0:
+        return DataFrame()
+    columns: list[str] = values[0]
+    # empty cells are missing values, and the API leaves them out at the end of a row
+    rows: list[list] = [
+        [numpy.nan if cell == '' else cell for cell in row] + \
+            [numpy.nan] * (len(columns) - len(row))
+        for row in values[1:]]
+    return _apply_schema(DataFrame(columns=columns, data=rows), data_type)
+
+@factory_register(TYPE, DataStoreFactory())
 class GoogleSheetsStore(Singleton):
     '''
     An implementation of the data store that reads pandas
-    DataFrames from Google Sheets spreadsheets.
+    DataFrames from Google Sheets spreadsheets. The first read fetches
+    every sheet configured for the run in one request per spreadsheet.
+    Responses can be cached on disk for a configured number of seconds,
+    so that later runs do not need to call the API at all.
     '''
     def __init__(self) -> None:
         super().__init__()
         if self.initialised:
             return
-        self.credentials: Credentials = _login()
-        self.sheets_service: Resource = build(
-            'sheets', 'v4', credentials=self.credentials).spreadsheets()
+        self.sheets_service: Resource = None
+        self.cache: dict[DataType, DataFrame] = {}
+        # concurrent reads wait for a single batch request rather than each sending their own
+        self.lock: threading.Lock = threading.Lock()
+        self.cache_directory: str = ConfigurationService().get_configuration_property(
+            TYPE + '.cache-directory', DEFAULT_CACHE_DIRECTORY)
+        self.cache_ttl: int = int(ConfigurationService().get_configuration_property(
+            TYPE + '.cache-ttl', 0))
         self.initialised = True
 
+    def _get_sheets_service(self) -> Resource:
+        if self.sheets_service is None:
+            self.sheets_service = build(
+                'sheets', 'v4', credentials=_login()).spreadsheets()
+        return self.sheets_service
+
+    def _get_cache_file_name(self, data_type: DataType) -> str:
+        return os.path.join(self.cache_directory, data_type.value + '.json')
+
+    def _read_cached_values(self, data_type: DataType) -> list[list]:
+        if self.cache_ttl <= 0:
+            return None
+        filename: str = self._get_cache_file_name(data_type)
+        if not os.path.exists(filename) or \
+                time.time() - os.path.getmtime(filename) > self.cache_ttl:
+            return None
+        with open(filename, 'r', encoding='utf8') as cache_file:
+            cached: dict = json.load(cache_file)
+        if cached['range'] != list(_get_sheet_range(data_type)):
+            return None
+        return cached['values']
+
+    def _write_cached_values(self, data_type: DataType, values: list[list]) -> None:
+        if self.cache_ttl <= 0:
+            return
+        os.makedirs(self.cache_directory, exist_ok=True)
+        with open(self._get_cache_file_name(data_type), 'w', encoding='utf8') as cache_file:
+            json.dump({'range': list(_get_sheet_range(data_type)), 'values': values}, cache_file)
+
+    def _fetch(self, data_types: list[DataType]) -> dict[DataType, list[list]]:
+        ranges_per_spreadsheet: dict[str, list[tuple[DataType, str]]] = {}
+        for data_type in data_types:
+            spreadsheet_id, range_name = _get_sheet_range(data_type)
+            ranges_per_spreadsheet.setdefault(spreadsheet_id, []).append((data_type, range_name))
+        result: dict[DataType, list[list]] = {}
+        for spreadsheet_id, ranges in ranges_per_spreadsheet.items():
+            logger.info('Fetching %d sheets from spreadsheet %s', len(ranges), spreadsheet_id)
+            response: dict = (
+                self._get_sheets_service().values()
+                .batchGet(
+                    spreadsheetId=spreadsheet_id,
+                    ranges=[range_name for _, range_name in ranges],
+                    valueRenderOption='UNFORMATTED_VALUE')
+                .execute()
+            )
+            # value ranges are returned in the order in which they were requested
+            for (data_type, _), value_range in zip(ranges, response.get('valueRanges', [])):
+                result[data_type] = value_range.get('values', [])
+        return result
+
     def read_store(self, data_type: DataType, page_title: str = '') -> DataFrame:
         '''
         Retrieve the DataFrame from data in a Google Sheets spreadsheet.
         '''
         if page_title != '':
             raise ConfigurationException('Pagination not supported for Google Sheets storage')
-        spreadsheet_id: str = ConfigurationService().get_configuration_property(
-            'googlesheets.' + data_type.value + '.spreadsheet')
-        sheet_name: str = ConfigurationService().get_configuration_property(
-            'googlesheets.' + data_type.value + '.sheetname')
-        range_name: str = ConfigurationService().get_configuration_property(
-            'googlesheets.' + data_type.value + '.range')
-        result = (
-            self.sheets_service.values()
-            .get(spreadsheetId=spreadsheet_id, range=sheet_name + '!' + range_name)
-            .execute()
-        )
-        values: list = result.get('values', [])
-        return DataFrame(columns=values[0], data=values[1:])
+        if data_type in self.cache:
+            return self.cache[data_type]
+        with self.lock:
+            missing: list[DataType] = []
+            for configured_data_type in _get_configured_data_types(data_type):
+                if configured_data_type in self.cache:
+                    continue
+                values: list[list] = self._read_cached_values(configured_data_type)
+                if values is None:
+                    missing.append(configured_data_type)
+                else:
+                    self.cache[configured_data_type] = _to_data_frame(configured_data_type, values)
+            if len(missing) > 0:
+                for fetched_data_type, values in self._fetch(missing).items():
+                    self._write_cached_values(fetched_data_type, values)
+                    self.cache[fetched_data_type] = _to_data_frame(fetched_data_type, values)
+            return self.cache[data_type]
 
     def write_store(self, data_type: DataType, data: DataFrame, page_title: str = '') -> None:
         '''
@@ -4,12 +4,15 @@ Data store implementation that uses CSV files in the local file system.
 import os
 from pandas import read_csv, DataFrame
 
-from main.core.configuration import ConfigurationException, ConfigurationService
 from main.core.factory import factory_register
 from main.core.singleton import Singleton
-from main.store.core import DataStoreFactory, DataType
+from main.core.configuration import ConfigurationService
+from main.store.cache import DataFrameCache
+from main.store.core import get_local_directory, DataStoreFactory, DataType
+from main.store.schema import get_schema
 
 TYPE = 'localcsvfile'
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024
 
 def _get_file_name(directory: str, data_type: DataType, page_title: str = '') -> str:
     result = directory + '/'
@@ -19,23 +22,27 @@ def _get_file_name(directory: str, data_type: DataType, page_title: str = '') ->
     result += 'csv'
     return result
 
+def _get_file_stats(filename: str) -> tuple[int, int]:
+    stats: os.stat_result = os.stat(filename)
+    return (stats.st_mtime_ns, stats.st_size)
+
 @factory_register(TYPE, DataStoreFactory())
 class LocalCsvFileStore(Singleton):
     '''
     An implementation of the data store that stores pandas DataFrames
-    in CSV files in the local file system.
+    in CSV files in the local file system. Columns with declared types
+    are parsed as those types, and parsed files are kept in a cache of
+    bounded size that is invalidated when a file changes on disk.
     '''
     def __init__(self) -> None:
         super().__init__()
         if self.initialised:
             return
-        self.directory: str = ConfigurationService().get_configuration_property(
-            TYPE + '.directory', '')
-        if not os.path.exists(self.directory):
-            os.mkdir(self.directory)
-        if not os.path.isdir(self.directory):
-            raise ConfigurationException(self.directory + ' is not a directory')
-        self.cache: dict[str, DataFrame] = {}
+        self.directory: str = get_local_directory(TYPE)
+        self.cache: DataFrameCache = DataFrameCache(int(
+            ConfigurationService().get_configuration_property(
+                TYPE + '.cache-size', DEFAULT_CACHE_SIZE)))
+        self.file_stats: dict[str, tuple[int, int]] = {}
         self.initialised = True
 
     def read_store(self, data_type: DataType, page_title: str = '') -> DataFrame:
@@ -45,10 +52,14 @@ class LocalCsvFileStore(Singleton):
         filename: str = _get_file_name(self.directory, data_type, page_title)
         if not os.path.exists(filename):
             return DataFrame()
-        if filename in self.cache:
-            return self.cache[filename]
-        result: DataFrame = read_csv(filename)
-        self.cache[filename] = result
+        file_stats: tuple[int, int] = _get_file_stats(filename)
+        cached: DataFrame = self.cache.get(filename)
+        if cached is not None and self.file_stats.get(filename) == file_stats:
+            return cached
+        result: DataFrame = read_csv(
+            filename, dtype=get_schema(data_type), float_precision='round_trip')
+        self.cache.put(filename, result)
+        self.file_stats[filename] = file_stats
         return result
 
     def write_store(self, data_type: DataType, data: DataFrame, page_title: str = '') -> None:
@@ -56,6 +67,7 @@ class LocalCsvFileStore(Singleton):
         Store the DataFrame in a CSV file in the local file system.
         '''
         filename: str = _get_file_name(self.directory, data_type, page_title)
-        self.cache[filename] = data
         with open(filename, 'w', encoding='utf8') as csvfile:
             data.to_csv(csvfile, index=False)
+        self.cache.put(filename, data)
+        self.file_stats[filename] = _get_file_stats(filename)
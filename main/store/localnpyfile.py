@@ -0,0 +1,132 @@
+'''
+Data store implementation that uses memory-mappable NumPy binary
+files in the local file system, one file per DataFrame column.
+'''
+import json
+import os
+import numpy
+from pandas import Categorical, CategoricalDtype, DataFrame, Series
+
+from main.core.factory import factory_register
+from main.core.singleton import Singleton
+from main.store.core import get_local_directory, DataStoreFactory, DataType
+
+TYPE = 'localnpyfile'
+SCHEMA_FILE = 'schema.json'
+# numpy dtype kinds that are persisted as they are and can be memory-mapped
+NATIVE_KINDS = 'biuf'
+
+def _get_directory_name(directory: str, data_type: DataType, page_title: str = '') -> str:
+    result = directory + '/'
+    result += data_type.value + '.'
+    if page_title != '':
+        result += page_title + '.'
+    result += 'columns'
+    return result
+
+def _get_column_file_name(directory: str, column_number: int, suffix: str = '') -> str:
+    return directory + '/' + str(column_number) + suffix + '.npy'
+
+def _save(file_name: str, values: numpy.ndarray) -> None:
+    # replace rather than overwrite, so that existing memory maps of the file stay valid
+    with open(file_name + '.tmp', 'wb') as npyfile:
+        numpy.save(npyfile, values)
+    os.replace(file_name + '.tmp', file_name)
+
+def _write_categories(directory: str, column_number: int, column: Series) -> dict:
+    # categories are persisted as their integer codes plus a separate file of categories
+    _save(_get_column_file_name(directory, column_number), column.cat.codes.to_numpy())
+    categories: Series = Series(column.cat.categories)
+    category_schema: dict = _write_column(directory, column_number, categories, '.categories')
+    return {'dtype': 'category', 'nulls': False, 'categories': category_schema['dtype']}
+
+def _write_column(directory: str, column_number: int, column: Series, suffix: str = '') -> dict:
+    if isinstance(column.dtype, CategoricalDtype):
+        return _write_categories(directory, column_number, column)
+    if column.dtype.kind in NATIVE_KINDS:
+        values: numpy.ndarray = column.to_numpy()
+        _save(_get_column_file_name(directory, column_number, suffix), values)
+        return {'dtype': values.dtype.str, 'nulls': False}
+    # anything else is persisted as fixed-width unicode, with a separate null mask
+    nulls: numpy.ndarray = column.isna().to_numpy()
+    values = numpy.array(column.where(~nulls, '').astype(str).to_numpy(), dtype=str)
+    _save(_get_column_file_name(directory, column_number, suffix), values)
+    if nulls.any():
+        _save(_get_column_file_name(directory, column_number, suffix + '.nulls'), nulls)
+    return {'dtype': 'str', 'nulls': bool(nulls.any())}
+
+def _read_column(directory: str, column_number: int, column_schema: dict) \
+        -> numpy.ndarray | Categorical:
+    # copy-on-write mapping, so that in-place edits by the handlers never reach the file
+    values: numpy.ndarray = numpy.load(
+        _get_column_file_name(directory, column_number), mmap_mode='c')
+    if column_schema['dtype'] == 'category':
+        categories: numpy.ndarray = numpy.load(
+            _get_column_file_name(directory, column_number, '.categories'))
+        if column_schema['categories'] == 'str':
+            categories = categories.astype(object)
+        return Categorical.from_codes(values, categories)
+    if column_schema['dtype'] != 'str':
+        return values
+    result: numpy.ndarray = values.astype(object)
+    if column_schema['nulls']:
+        nulls: numpy.ndarray = numpy.load(
+            _get_column_file_name(directory, column_number, '.nulls'), mmap_mode='r')
+        result[nulls] = numpy.nan
+    return result
+
+@factory_register(TYPE, DataStoreFactory())
+class LocalNpyFileStore(Singleton):
+    '''
+    An implementation of the data store that stores pandas DataFrames as
+    typed NumPy column files in the local file system. Numeric columns are
+    memory-mapped on read rather than parsed, and round-trip without loss
+    of precision.
+    '''
+    def __init__(self) -> None:
+        super().__init__()
+        if self.initialised:
+            return
+        self.cache: dict[str, DataFrame] = {}
+        self.directory: str = get_local_directory(TYPE)
+        self.initialised = True
+
+    def read_store(self, data_type: DataType, page_title: str = '') -> DataFrame:
+        '''
+        Read the DataFrame from NumPy column files in the local file system.
+        '''
+        directory: str = _get_directory_name(self.directory, data_type, page_title)
+        schema_file: str = directory + '/' + SCHEMA_FILE
+        if not os.path.exists(schema_file):
+            return DataFrame()
+        if directory in self.cache:
+            return self.cache[directory]
+        with open(schema_file, 'r', encoding='utf8') as schema_json:
+            schema: dict = json.load(schema_json)
+        columns: dict[str, numpy.ndarray | Categorical] = {}
+        for column_number, column_schema in enumerate(schema['columns']):
+            columns[column_schema['name']] = _read_column(directory, column_number, column_schema)
+        result: DataFrame = DataFrame(columns, copy=False)
+        self.cache[directory] = result
+        return result
+
+    def write_store(self, data_type: DataType, data: DataFrame, page_title: str = '') -> None:
+        '''
+        Store the DataFrame as NumPy column files in the local file system.
+        '''
+        directory: str = _get_directory_name(self.directory, data_type, page_title)
+        self.cache[directory] = data
+        schema_file: str = directory + '/' + SCHEMA_FILE
+        if not os.path.exists(directory):
+            os.mkdir(directory)
+        if os.path.exists(schema_file):
+            os.remove(schema_file)
+        schema: dict = {'rows': len(data), 'columns': []}
+        for column_number, column_name in enumerate(data.columns):
+            column_schema: dict = _write_column(
+                directory, column_number, data[column_name])
+            column_schema['name'] = column_name
+            schema['columns'].append(column_schema)
+        # the schema is written last so that a partially written page is never read
+        with open(schema_file, 'w', encoding='utf8') as schema_json:
+            json.dump(schema, schema_json)
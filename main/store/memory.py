@@ -1,13 +1,21 @@
 '''
 In-memory data store implementation.
 '''
-from pandas import DataFrame
+import logging
+import os
+import tempfile
+from pandas import read_pickle, DataFrame
 
+from main.core.configuration import ConfigurationService
 from main.core.factory import factory_register
 from main.core.singleton import Singleton
+from main.store.cache import get_size, DataFrameCache
 from main.store.core import DataStoreFactory, DataType
 
+logger = logging.getLogger(__name__)
+
 TYPE = 'memory'
+DEFAULT_CACHE_SIZE = 1024 * 1024 * 1024
 
 def _get_cache_key(data_type: DataType, page_title: str) -> str:
     cache_key: str = data_type.value
@@ -19,21 +27,59 @@ def _get_cache_key(data_type: DataType, page_title: str) -> str:
 class InMemoryStore(Singleton):
     '''
     An implementation of the data store that stores pandas DataFrames using an in-memory cache.
+    The cache is bounded by the memory usage of the stored DataFrames; when it grows over
+    its maximum size, the least recently used DataFrames are spilled to a temporary
+    directory and transparently read back into the cache when they are next requested.
     '''
     def __init__(self) -> None:
         super().__init__()
         if self.initialised:
             return
-        self.cache: dict[str, DataFrame] = {}
+        self.cache: DataFrameCache = DataFrameCache(
+            int(ConfigurationService().get_configuration_property(
+                TYPE + '.cache-size', DEFAULT_CACHE_SIZE)),
+            on_evict=self._spill)
+        spill_parent_directory: str = ConfigurationService().get_configuration_property(
+            TYPE + '.spill-directory', tempfile.gettempdir())
+        # the directory is removed when the store is re-initialised or the process exits
+        self.spill_directory = tempfile.TemporaryDirectory( # pylint: disable=consider-using-with
+            prefix='pg-calc-engine-', dir=spill_parent_directory)
+        self.spilled: dict[str, str] = {}
+        self.statistics: dict[str, int] = {
+            'spilled': 0,
+            'spilled-bytes': 0,
+            'reloaded': 0,
+        }
         self.initialised = True
 
+    def _spill(self, cache_key: str, data: DataFrame) -> None:
+        # the DataFrame is spilled again even if it was read back unchanged, because
+        # the callers of read_store are free to modify the DataFrames they are given
+        filename: str = self.spilled.get(cache_key, os.path.join(
+            self.spill_directory.name, str(self.statistics['spilled']) + '.pkl'))
+        data.to_pickle(filename)
+        self.spilled[cache_key] = filename
+        self.statistics['spilled'] += 1
+        self.statistics['spilled-bytes'] += os.path.getsize(filename)
+        logger.debug('Spilled %s to %s', cache_key, filename)
+
     def read_store(self, data_type: DataType, page_title: str = '') -> DataFrame:
         '''
-        Retrieve the DataFrame from the in-memory cache.
+        Retrieve the DataFrame from the in-memory cache, reading it back from
+        the spill directory if it has been evicted. A DataFrame that is larger
+        than the cache is read from the spill directory every time.
         '''
         cache_key = _get_cache_key(data_type, page_title)
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        cached: DataFrame = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        if cache_key in self.spilled:
+            data: DataFrame = read_pickle(self.spilled[cache_key])
+            self.statistics['reloaded'] += 1
+            # a DataFrame larger than the whole cache would only be spilled again
+            if get_size(data) <= self.cache.max_size:
+                self.cache.put(cache_key, data)
+            return data
         return DataFrame()
 
     def write_store(self, data_type: DataType, data: DataFrame, page_title: str = '') -> None:
@@ -41,4 +87,17 @@ class InMemoryStore(Singleton):
         Store the DataFrame in the in-memory cache.
         '''
         cache_key = _get_cache_key(data_type, page_title)
-        self.cache[cache_key] = data
+        if cache_key in self.spilled:
+            os.remove(self.spilled.pop(cache_key))
+        self.cache.put(cache_key, data)
+
+    def get_statistics(self) -> dict[str, int]:
+        '''
+        Report the usage of the in-memory cache and of the spill directory.
+        '''
+        return {
+            'cached': len(self.cache),
+            'cached-bytes': self.cache.size,
+            'evicted': self.cache.evictions,
+            **self.statistics,
+        }
@@ -0,0 +1,121 @@
+'''
+Declared column types of the data used in the calculation, for data
+stores that parse text and would otherwise have to infer them.
+'''
+from enum import Enum
+import numpy
+
+from main.model.library import EnrichedLibraryColumn, LibraryColumn
+from main.model.referencedata import AttackPerPokemonColumn, ChargedAttackColumn, \
+    CpmColumn, FastAttackColumn, PokemonEvolutionColumn, PokemonTypeColumn, PokemonType
+from main.store.core import DataType
+
+TYPE_CHART_TYPE_COLUMN = 'Type'
+
+def _columns(columns: list[Enum], column_type: type) -> dict[str, type]:
+    return {column.value: column_type for column in columns}
+
+CPM_SCHEMA: dict[str, type] = _columns(CpmColumn, float)
+
+ATTACK_PER_POKEMON_SCHEMA: dict[str, type] = _columns(AttackPerPokemonColumn, str)
+
+CHARGED_ATTACK_SCHEMA: dict[str, type] = {
+    **_columns([ChargedAttackColumn.ATTACK, ChargedAttackColumn.TYPE], str),
+    **_columns([ChargedAttackColumn.DAMAGE, ChargedAttackColumn.ENERGY_COST], int),
+}
+
+FAST_ATTACK_SCHEMA: dict[str, type] = {
+    **_columns([FastAttackColumn.ATTACK, FastAttackColumn.TYPE], str),
+    **_columns([
+        FastAttackColumn.TURNS,
+        FastAttackColumn.DAMAGE,
+        FastAttackColumn.ENERGY_GENERATED], int),
+}
+
+POKEMON_TYPE_SCHEMA: dict[str, type] = {
+    **_columns([
+        PokemonTypeColumn.POKEMON,
+        PokemonTypeColumn.TYPE_1,
+        PokemonTypeColumn.TYPE_2], str),
+    **_columns([
+        PokemonTypeColumn.BASE_ATTACK,
+        PokemonTypeColumn.BASE_DEFENCE,
+        PokemonTypeColumn.BASE_HP], int),
+}
+
+EVOLUTION_SCHEMA: dict[str, type] = _columns(PokemonEvolutionColumn, str)
+
+TYPE_CHART_SCHEMA: dict[str, type] = {
+    TYPE_CHART_TYPE_COLUMN: str,
+    **_columns(PokemonType, float),
+}
+
+LIBRARY_SCHEMA: dict[str, type] = {
+    **_columns([
+        LibraryColumn.POKEMON_NAME,
+        LibraryColumn.POKEMON_TYPE,
+        LibraryColumn.FAST_ATTACK,
+        LibraryColumn.CHARGED_ATTACK_1,
+        LibraryColumn.CHARGED_ATTACK_2], str),
+    **_columns([LibraryColumn.ATTACK, LibraryColumn.DEFENCE, LibraryColumn.HP], int),
+    LibraryColumn.POKEMON_LEVEL.value: float,
+}
+
+ENRICHED_LIBRARY_SCHEMA: dict[str, type] = {
+    **LIBRARY_SCHEMA,
+    **POKEMON_TYPE_SCHEMA,
+    **CPM_SCHEMA,
+    **FAST_ATTACK_SCHEMA,
+    **_columns(EnrichedLibraryColumn, float),
+    **_columns([
+        EnrichedLibraryColumn.ORIGINAL_NAME,
+        EnrichedLibraryColumn.CHARGED_ATTACK_1_TYPE,
+        EnrichedLibraryColumn.CHARGED_ATTACK_2_TYPE], str),
+    **_columns([
+        EnrichedLibraryColumn.MAX_ATTACK,
+        EnrichedLibraryColumn.MAX_DEFENCE,
+        EnrichedLibraryColumn.MAX_HP,
+        EnrichedLibraryColumn.CHARGED_ATTACK_1_DAMAGE,
+        EnrichedLibraryColumn.CHARGED_ATTACK_1_ENERGY_COST,
+        EnrichedLibraryColumn.CHARGED_ATTACK_2_DAMAGE,
+        EnrichedLibraryColumn.CHARGED_ATTACK_2_ENERGY_COST], int),
+    **{pokemon_type.value + '_vuln': float for pokemon_type in PokemonType},
+    **{pokemon_type.value + '_str': float for pokemon_type in PokemonType},
+}
+
+# positions of the teams in the enriched library, see main.handler.evaluate
+PARTITION_RESULT_SCHEMA: dict[str, type] = {
+    '1': numpy.int32,
+    '2': numpy.int32,
+    '3': numpy.int32,
+    'result': float,
+    'library': numpy.int64,
+}
+
+# entries of the run manifest, see main.handler.checkpoint
+MANIFEST_SCHEMA: dict[str, type] = {
+    'fingerprint': str,
+    'location': str,
+}
+
+SCHEMAS: dict[DataType, dict[str, type]] = {
+    DataType.CHARGED_ATTACK_REFERENCE_DATA: CHARGED_ATTACK_SCHEMA,
+    DataType.CHARGED_ATTACK_PER_POKEMON_REFERENCE_DATA: ATTACK_PER_POKEMON_SCHEMA,
+    DataType.CPM_REFERENCE_DATA: CPM_SCHEMA,
+    DataType.ENRICHED_LIBRARY: ENRICHED_LIBRARY_SCHEMA,
+    DataType.EVOLUTION: EVOLUTION_SCHEMA,
+    DataType.FAST_ATTACK_REFERENCE_DATA: FAST_ATTACK_SCHEMA,
+    DataType.FAST_ATTACK_PER_POKEMON_REFERENCE_DATA: ATTACK_PER_POKEMON_SCHEMA,
+    DataType.LIBRARY: LIBRARY_SCHEMA,
+    DataType.MANIFEST: MANIFEST_SCHEMA,
+    DataType.PARTITION_RESULT: PARTITION_RESULT_SCHEMA,
+    DataType.POKEMON_TYPE_REFERENCE_DATA: POKEMON_TYPE_SCHEMA,
+    DataType.TYPE_CHART_REFERENCE_DATA: TYPE_CHART_SCHEMA,
+}
+
+def get_schema(data_type: DataType) -> dict[str, type]:
+    '''
+    Retrieve the declared column types for the data type, or
+    an empty schema if the column types are not declared.
+    '''
+    return SCHEMAS.get(data_type, {})
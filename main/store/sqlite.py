@@ -0,0 +1,203 @@
+'''
+Data store implementation that keeps all data types in a single
+SQLite database file in the local file system.
+'''
+from contextlib import contextmanager
+from collections.abc import Iterator
+import json
+import queue
+import sqlite3
+import threading
+from typing import Any
+import numpy
+from pandas import CategoricalDtype, DataFrame
+
+from main.core.configuration import ConfigurationService
+from main.core.factory import factory_register
+from main.core.singleton import Singleton
+from main.model.library import LibraryColumn
+from main.store.core import DataStoreFactory, DataType
+
+TYPE = 'sqlite'
+DEFAULT_DATABASE = 'pg-calc-engine.db'
+PAGE_TITLE_COLUMN = 'page_title'
+# columns that get an index, in addition to the page title, if a page contains them
+INDEXED_COLUMNS = [LibraryColumn.POKEMON_NAME.value]
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+def _get_table_name(data_type: DataType) -> str:
+    return data_type.value.replace('-', '_')
+
+def _get_column_kind(data: DataFrame, column: str) -> str:
+    dtype = data[column].dtype
+    if isinstance(dtype, CategoricalDtype):
+        # categories are stored as their values
+        dtype = dtype.categories.dtype
+    kind: str = dtype.kind
+    if kind == 'b':
+        return 'bool'
+    if kind in 'iu':
+        return 'int'
+    if kind == 'f':
+        return 'float'
+    return 'str'
+
+def _restore_column_kinds(data: DataFrame, column_kinds: dict[str, str]) -> DataFrame:
+    for column, kind in column_kinds.items():
+        nulls: bool = data[column].isna().any()
+        if kind == 'float' or (kind == 'int' and nulls):
+            data[column] = data[column].astype(float)
+        elif kind in ('int', 'bool') and not nulls:
+            data[column] = data[column].astype(kind)
+        elif kind == 'str' and nulls:
+            data[column] = data[column].where(data[column].notna(), numpy.nan)
+    return data
+
+def _connect(database: str) -> sqlite3.Connection:
+    connection: sqlite3.Connection = sqlite3.connect(
+        database, timeout=60, check_same_thread=False, isolation_level=None)
+    # write-ahead logging lets any number of processes read while one of them writes
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+@factory_register(TYPE, DataStoreFactory())
+class SqliteStore(Singleton):
+    '''
+    An implementation of the data store that stores pandas DataFrames in
+    a SQLite database, with one table per data type. Pages are rows of the
+    table with the same page title, and are indexed by page title and,
+    where applicable, by Pokemon name.
+    '''
+    def __init__(self) -> None:
+        super().__init__()
+        if self.initialised:
+            return
+        self.database: str = ConfigurationService().get_configuration_property(
+            TYPE + '.database', DEFAULT_DATABASE)
+        self.write_lock: threading.Lock = threading.Lock()
+        self.write_connection: sqlite3.Connection = _connect(self.database)
+        self.write_connection.execute(
+            'CREATE TABLE IF NOT EXISTS pages (data_type TEXT, page_title TEXT, ' + \
+                'columns TEXT, PRIMARY KEY (data_type, page_title))')
+        self.read_connections: queue.SimpleQueue = queue.SimpleQueue()
+        self.initialised = True
+
+    @contextmanager
+    def _read_connection(self) -> Iterator[sqlite3.Connection]:
+        try:
+            connection: sqlite3.Connection = self.read_connections.get_nowait()
+        except queue.Empty:
+            connection = _connect(self.database)
+        try:
+            yield connection
+        finally:
+            self.read_connections.put(connection)
+
+    def _create_table(self, data_type: DataType, data: DataFrame) -> None:
+        table: str = _quote(_get_table_name(data_type))
+        # columns are declared without a type, so that values keep the type they are written with
+        self.write_connection.execute(
+            'CREATE TABLE IF NOT EXISTS ' + table + ' (' + PAGE_TITLE_COLUMN + ' TEXT)')
+        existing_columns: set[str] = {
+            row[1] for row in self.write_connection.execute('PRAGMA table_info(' + table + ')')}
+        for column in data.columns:
+            if column not in existing_columns:
+                self.write_connection.execute(
+                    'ALTER TABLE ' + table + ' ADD COLUMN ' + _quote(column))
+        self.write_connection.execute(
+            'CREATE INDEX IF NOT EXISTS ' + _quote(_get_table_name(data_type) + '_page') + \
+                ' ON ' + table + ' (' + PAGE_TITLE_COLUMN + ')')
+        for column in INDEXED_COLUMNS:
+            if column in data.columns:
+                index: str = _quote(_get_table_name(data_type) + '_' + column)
+                self.write_connection.execute(
+                    'CREATE INDEX IF NOT EXISTS ' + index + ' ON ' + table + \
+                        ' (' + PAGE_TITLE_COLUMN + ', ' + _quote(column) + ')')
+
+    def _select(
+            self,
+            data_type: DataType,
+            page_title: str,
+            condition: str = '',
+            parameters: list[Any] = None) -> DataFrame:
+        with self._read_connection() as connection:
+            page: tuple = connection.execute(
+                'SELECT columns FROM pages WHERE data_type = ? AND page_title = ?',
+                (data_type.value, page_title)).fetchone()
+            if page is None:
+                return DataFrame()
+            column_kinds: dict[str, str] = json.loads(page[0])
+            if len(column_kinds) == 0:
+                return DataFrame()
+            rows: list[tuple] = connection.execute(
+                'SELECT ' + ', '.join(_quote(column) for column in column_kinds) + \
+                    ' FROM ' + _quote(_get_table_name(data_type)) + \
+                    ' WHERE ' + PAGE_TITLE_COLUMN + ' = ?' + condition + ' ORDER BY rowid',
+                [page_title] + (parameters or [])).fetchall()
+        return _restore_column_kinds(
+            DataFrame(rows, columns=list(column_kinds)), column_kinds)
+
+    def read_store(self, data_type: DataType, page_title: str = '') -> DataFrame:
+        '''
+        Read the DataFrame from the SQLite database.
+        '''
+        return self._select(data_type, page_title)
+
+    def query_store(
+            self,
+            data_type: DataType,
+            column: str,
+            values: list[Any],
+            page_title: str = '') -> DataFrame:
+        '''
+        Read the rows of the DataFrame whose value in the column is one of
+        the provided values from the SQLite database, using an index if the
+        column is indexed.
+        '''
+        condition: str = ' AND ' + _quote(column) + ' IN (' + ', '.join('?' * len(values)) + ')'
+        return self._select(data_type, page_title, condition, list(values))
+
+    def _insert_page(self, data_type: DataType, data: DataFrame, page_title: str) -> None:
+        column_kinds: dict[str, str] = {
+            column: _get_column_kind(data, column) for column in data.columns}
+        rows: list[list[Any]] = [
+            [page_title] + row for row in
+            data.astype(object).where(data.notna(), None).values.tolist()]
+        table: str = _quote(_get_table_name(data_type))
+        self._create_table(data_type, data)
+        self.write_connection.execute(
+            'DELETE FROM ' + table + ' WHERE ' + PAGE_TITLE_COLUMN + ' = ?',
+            (page_title,))
+        self.write_connection.executemany(
+            'INSERT INTO ' + table + ' (' + PAGE_TITLE_COLUMN + ''.join(
+                ', ' + _quote(column) for column in data.columns) + \
+                ') VALUES (?' + ', ?' * len(data.columns) + ')',
+            rows)
+        self.write_connection.execute(
+            'INSERT OR REPLACE INTO pages VALUES (?, ?, ?)',
+            (data_type.value, page_title, json.dumps(column_kinds)))
+
+    def write_store(self, data_type: DataType, data: DataFrame, page_title: str = '') -> None:
+        '''
+        Store the DataFrame in the SQLite database, replacing the page
+        in a single transaction.
+        '''
+        self.write_pages(data_type, {page_title: data})
+
+    def write_pages(self, data_type: DataType, pages: dict[str, DataFrame]) -> None:
+        '''
+        Store the DataFrames of several pages, by page title, in the SQLite
+        database, replacing all of the pages in a single transaction.
+        '''
+        with self.write_lock:
+            self.write_connection.execute('BEGIN IMMEDIATE')
+            try:
+                for page_title, data in pages.items():
+                    self._insert_page(data_type, data, page_title)
+                self.write_connection.execute('COMMIT')
+            except Exception:
+                self.write_connection.execute('ROLLBACK')
+                raise
@@ -0,0 +1,8 @@
+from main.core.factory import factory_register
+
+from test.core.test_factory import DummyFactory
+
+@factory_register('test3', DummyFactory())
+class Instance3(object):
+    def __init__(self, **kwargs) -> None:
+        self.kwargs = kwargs
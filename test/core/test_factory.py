@@ -1,3 +1,4 @@
+import sys
 import pytest
 from typing import Any
 
@@ -33,4 +34,13 @@ def test_factory_constructs_object_from_type_registered_with_method_call():
 
 def test_factory_raises_exception_for_undefined_type():
     with pytest.raises(ConfigurationException, match='Could not find a type adapter for type not-a-type and factory <class \'test.core.test_factory.DummyFactory\'>'):
-        DummyFactory().construct('not-a-type')
\ No newline at end of file
+        DummyFactory().construct('not-a-type')
+
+def test_factory_imports_module_registered_for_type():
+    DummyFactory().register_module('test3', 'test.core.dummy_module')
+    assert 'test.core.dummy_module' not in sys.modules
+
+    instance = DummyFactory().construct('test3', dependency=3)
+
+    assert 'test.core.dummy_module' in sys.modules
+    assert instance.kwargs == {'dependency': 3}
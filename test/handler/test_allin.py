@@ -0,0 +1,79 @@
+import shutil
+import pytest
+
+from main.core.configuration import configure
+import main.handler.enrich
+import main.handler.evaluate
+from main.handler.allin import handler
+from main.handler.checkpoint import record_partition
+from main.handler.evaluate import EvaluationWorker
+from main.store import clear_cache, read_store, DataType
+
+@pytest.fixture
+def allin_setup(mocker, tmp_path):
+    mock_sys = mocker.patch('main.core.configuration.sys')
+    mock_sys.argv = [
+        'main.py',
+        'test/integration/configuration/integration-test-configuration.yaml',
+        'localnpyfile.directory=' + str(tmp_path),
+        'store.enriched-library=localnpyfile',
+        'store.partition-result=localnpyfile',
+        'store.manifest=localnpyfile',
+    ]
+    configure()
+    clear_cache(DataType.MANIFEST)
+    EvaluationWorker().initialised = False
+    yield mock_sys
+
+def _restart(mock_sys):
+    # a new process starts with empty in-process caches and resumes from the manifest
+    mock_sys.argv = mock_sys.argv + ['resume=true']
+    configure()
+    clear_cache(DataType.MANIFEST)
+    EvaluationWorker().initialised = False
+
+def test_resume_reuses_completed_work(allin_setup, mocker):
+    handler()
+    expected = read_store(DataType.RESULT, page_title='integration-test-evaluation')
+    _restart(allin_setup)
+    optimise = mocker.spy(main.handler.enrich, '_optimise')
+    evaluate_partition = mocker.spy(main.handler.evaluate, 'evaluate_partition')
+
+    handler()
+
+    assert optimise.call_count == 0
+    assert evaluate_partition.call_count == 0
+    assert read_store(DataType.RESULT, page_title='integration-test-evaluation').equals(expected)
+
+def test_resume_recalculates_a_missing_enriched_library(allin_setup, mocker, tmp_path):
+    handler()
+    shutil.rmtree(tmp_path / 'enriched-library.integration-test-evaluation.columns')
+    _restart(allin_setup)
+    optimise = mocker.spy(main.handler.enrich, '_optimise')
+
+    handler()
+
+    assert optimise.call_count == 1
+
+def test_resume_recalculates_changed_partitions(allin_setup, mocker):
+    handler()
+    expected = read_store(DataType.RESULT, page_title='integration-test-evaluation')
+    record_partition('integration-test-evaluation.3', 'stale-fingerprint')
+    _restart(allin_setup)
+    evaluate_partition = mocker.spy(main.handler.evaluate, 'evaluate_partition')
+
+    handler()
+
+    assert evaluate_partition.call_count == 1
+    assert read_store(DataType.RESULT, page_title='integration-test-evaluation').equals(expected)
+
+def test_run_without_resume_starts_from_scratch(allin_setup, mocker):
+    handler()
+    clear_cache(DataType.MANIFEST)
+    optimise = mocker.spy(main.handler.enrich, '_optimise')
+    evaluate_partition = mocker.spy(main.handler.evaluate, 'evaluate_partition')
+
+    handler()
+
+    assert optimise.call_count == 1
+    assert evaluate_partition.call_count == 10
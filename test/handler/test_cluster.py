@@ -0,0 +1,92 @@
+import threading
+
+from pandas import DataFrame
+import pytest
+
+from main.core.configuration import configure
+from main.handler.cluster import _send, run_worker, start_local_workers, Coordinator
+from main.handler.evaluate import EvaluationWorker
+from main.store import read_store, write_store, DataType
+
+from test.model.test_evaluation import CHARMANDER, IVYSAUR, PIDGEOT
+
+LIBRARY = DataFrame([IVYSAUR, CHARMANDER, PIDGEOT, {**PIDGEOT, 'Name': 'Pidgeot 2', 'CP': 1400}])
+PERMUTATIONS = ['test-evaluation.0', 'test-evaluation.1', 'test-evaluation.2']
+
+@pytest.fixture
+def cluster_setup(mocker):
+    mock_sys = mocker.patch('main.core.configuration.sys')
+    mock_sys.argv = [
+        'main.py',
+        'test/test-assets/test-configuration.yaml',
+        'store.enriched-library=memory',
+        'store.partition=memory',
+        'store.partition-result=memory',
+    ]
+    configure()
+    EvaluationWorker().initialised = False
+    write_store(DataType.ENRICHED_LIBRARY, LIBRARY, page_title='test-evaluation')
+    write_store(DataType.PARTITION, DataFrame({'1': [0, 4], '2': [0, 4], '3': [0, 4]}),
+                page_title='test-evaluation.0')
+    write_store(DataType.PARTITION, DataFrame({'1': [1, 4], '2': [1, 4], '3': [1, 4]}),
+                page_title='test-evaluation.1')
+    write_store(DataType.PARTITION, DataFrame({'1': [0, 2], '2': [2, 4], '3': [0, 4]}),
+                page_title='test-evaluation.2')
+    EvaluationWorker().evaluate_partitions(PERMUTATIONS)
+    expected = {
+        permutation: read_store(DataType.PARTITION_RESULT, page_title=permutation)
+        for permutation in PERMUTATIONS}
+    for permutation in PERMUTATIONS:
+        write_store(DataType.PARTITION_RESULT, DataFrame(), page_title=permutation)
+    yield expected
+
+def _serve(coordinator):
+    thread = threading.Thread(target=coordinator.serve)
+    thread.start()
+    return thread
+
+def _assert_results(expected):
+    for permutation, expected_result in expected.items():
+        result = read_store(DataType.PARTITION_RESULT, page_title=permutation)
+        assert list(result['result']) == list(expected_result['result'])
+        assert list(result['1']) == list(expected_result['1'])
+
+def test_workers_evaluate_all_partitions(cluster_setup):
+    coordinator = Coordinator(PERMUTATIONS, ('127.0.0.1', 0), heartbeat_timeout=30)
+    thread = _serve(coordinator)
+
+    counts = []
+    workers = [
+        threading.Thread(target=lambda: counts.append(run_worker(coordinator.address, 0.1)))
+        for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+    thread.join(timeout=30)
+
+    assert sum(counts) == len(PERMUTATIONS)
+    _assert_results(cluster_setup)
+
+def test_work_of_dead_worker_is_reassigned(cluster_setup):
+    coordinator = Coordinator(PERMUTATIONS, ('127.0.0.1', 0), heartbeat_timeout=0.2)
+    thread = _serve(coordinator)
+    # a worker that takes a partition and dies without sending heartbeats or a result
+    work = _send(coordinator.address, {'type': 'request', 'worker': 'dead-worker'})
+
+    count = run_worker(coordinator.address, 0.05)
+    thread.join(timeout=30)
+
+    assert work['permutation'] == PERMUTATIONS[0]
+    assert count == len(PERMUTATIONS)
+    _assert_results(cluster_setup)
+
+def test_local_worker_processes(cluster_setup):
+    coordinator = Coordinator(PERMUTATIONS, ('127.0.0.1', 0), heartbeat_timeout=30)
+    thread = _serve(coordinator)
+
+    processes = start_local_workers(coordinator.address, 2)
+    thread.join(timeout=60)
+
+    assert all(process.wait(timeout=60) == 0 for process in processes)
+    _assert_results(cluster_setup)
@@ -0,0 +1,96 @@
+import logging
+
+from pandas import DataFrame
+import pytest
+
+from main.core.configuration import configure, ConfigurationService
+from main.handler.distribute import count_teams, get_class_masks, get_partition_count, \
+    handler
+from main.handler.evaluate import evaluate_partition, ReportingService
+from main.model.equivalence import EquivalenceClasses
+from main.model.evaluation import retrieve_evaluations
+from main.store import read_store, write_store, DataType
+
+from test.model.test_evaluation import CHARMANDER, IVYSAUR, PIDGEOT
+
+# three classes, of one, two and three members
+LIBRARY = DataFrame([
+    IVYSAUR,
+    CHARMANDER,
+    {**CHARMANDER, 'Name': 'Charmander 2'},
+    PIDGEOT,
+    {**PIDGEOT, 'Name': 'Pidgeot 2'},
+    {**PIDGEOT, 'Name': 'Pidgeot 3'},
+])
+
+@pytest.fixture
+def distribute_setup(mocker):
+    mock_sys = mocker.patch('main.core.configuration.sys')
+    mock_sys.argv = [
+        'main.py',
+        'test/test-assets/test-configuration.yaml',
+        'store.enriched-library=memory',
+        'store.partition=memory',
+        'partition-size=auto',
+    ]
+    configure()
+    write_store(DataType.ENRICHED_LIBRARY, LIBRARY, page_title='test-evaluation')
+    return mock_sys
+
+def test_count_teams_matches_evaluated_teams(distribute_setup):
+    evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+    classes = EquivalenceClasses(LIBRARY)
+    rows = LIBRARY.to_dict('records')
+    blocks = [(0, 1), (1, 3)]
+    for first in blocks:
+        for second in blocks:
+            for third in blocks:
+                partition = DataFrame({'1': first, '2': second, '3': third})
+
+                evaluate_partition(partition, rows, evaluation, 2, classes)
+
+                assert count_teams(partition, classes.sizes) == ReportingService().counter
+
+def test_count_teams_matches_evaluated_teams_with_team_rules(distribute_setup):
+    ConfigurationService().set_configuration_property(
+        'evaluation.test-evaluation.constraints.unique-types', ['Fire', 'Flying'])
+    evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+    classes = EquivalenceClasses(LIBRARY)
+    masks = get_class_masks(LIBRARY, evaluation, classes)
+    rows = LIBRARY.to_dict('records')
+    blocks = [(0, 1), (1, 3)]
+    for first in blocks:
+        for second in blocks:
+            for third in blocks:
+                partition = DataFrame({'1': first, '2': second, '3': third})
+
+                evaluate_partition(partition, rows, evaluation, 2, classes)
+
+                assert count_teams(partition, classes.sizes, masks) == ReportingService().counter
+    assert count_teams(DataFrame({'1': (0, 3), '2': (0, 3), '3': (0, 3)}), classes.sizes, masks) \
+        < count_teams(DataFrame({'1': (0, 3), '2': (0, 3), '3': (0, 3)}), classes.sizes)
+
+def test_partition_size_is_tuned_to_throughput(distribute_setup, mocker, caplog):
+    # 8 teams per partition at the default runtime of 60 seconds makes blocks of 2 classes
+    mocker.patch('main.handler.distribute._measure_throughput', return_value=8 / 60)
+
+    with caplog.at_level(logging.INFO):
+        partitions = handler()
+
+    assert len(partitions) == 4
+    assert get_partition_count('test-evaluation') == 4
+    assert 'The calculation is projected to take 0:01:08' in caplog.messages
+
+def test_resume_reuses_the_tuned_partition_size(distribute_setup, mocker):
+    distribute_setup.argv = distribute_setup.argv + ['store.manifest=memory']
+    mocker.patch('main.handler.distribute._measure_throughput', return_value=8 / 60)
+    partitions = handler()
+    # the engine runs at a different speed in the next run
+    measure_throughput = mocker.patch(
+        'main.handler.distribute._measure_throughput', return_value=1000.)
+    distribute_setup.argv = distribute_setup.argv + ['resume=true']
+
+    assert handler() == partitions
+    measure_throughput.assert_not_called()
+    assert read_store(DataType.PARTITION, page_title='test-evaluation.3').equals(
+        DataFrame({'1': [2, 3], '2': [2, 3], '3': [2, 3]}))
@@ -0,0 +1,198 @@
+from itertools import product
+
+import numpy
+from pandas import DataFrame
+import pytest
+
+from main.core.configuration import configure, ConfigurationService
+import main.handler.enrich
+from main.handler.enrich import _filter_with_constraints, _get_iv_search, _level_ivs, \
+    _maximise_level, _optimise, _split_library, get_enrichment_fingerprints, handler
+from main.model.evaluation import retrieve_evaluations, EvaluationColumn
+from main.store import clear_cache, get_fingerprint, read_store, write_store, DataType
+
+META = ['Azumarill', 'Medicham', 'Skarmory']
+
+@pytest.fixture
+def meta_setup(mocker):
+    mock_sys = mocker.patch('main.core.configuration.sys')
+    mock_sys.argv = [
+        'main.py',
+        'test/integration/configuration/integration-test-configuration.yaml',
+        'store.meta=configuration',
+        'evaluation.integration-test-evaluation.weights.meta-coverage=100',
+    ]
+    configure()
+    ConfigurationService().set_configuration_property(
+        'evaluation.integration-test-evaluation.meta', META)
+    return mock_sys
+
+def _get_evaluation():
+    return retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+
+def test_library_is_enriched_with_meta_matchups(meta_setup):
+    evaluation = _get_evaluation()
+
+    library = _optimise(read_store(DataType.LIBRARY), evaluation)
+
+    columns = [pokemon + '_matchup' for pokemon in META]
+    matchups = library[columns].to_numpy(dtype=float)
+    assert numpy.isfinite(matchups).all()
+    assert (matchups > 0).all()
+    teams = numpy.array([[0, 1, 2], [3, 4, 5], [0, 0, 0]])
+    records = library.to_dict('records')
+    assert [explanation['meta-coverage']['value'] for explanation in
+            evaluation.explain_teams(library, teams)] == \
+        [evaluation.explain_team([records[i] for i in team])['meta-coverage']['value']
+         for team in teams]
+
+def test_library_without_meta_weight_has_no_matchups(meta_setup):
+    evaluation = _get_evaluation()
+    evaluation.weights[EvaluationColumn.META_COVERAGE_WEIGHT] = 0
+
+    library = _optimise(read_store(DataType.LIBRARY), evaluation)
+
+    assert not any(column.endswith('_matchup') for column in library.columns)
+
+def test_meta_changes_enrichment_fingerprint(meta_setup):
+    fingerprints = get_enrichment_fingerprints()
+    ConfigurationService().set_configuration_property(
+        'evaluation.integration-test-evaluation.meta', META[:2])
+
+    assert get_enrichment_fingerprints() != fingerprints
+
+def test_library_is_enriched_with_meta_battles(meta_setup):
+    evaluation = _get_evaluation()
+    evaluation.weights[EvaluationColumn.META_COVERAGE_WEIGHT] = 0
+    evaluation.weights[EvaluationColumn.META_BATTLE_WEIGHT] = 100
+
+    library = _optimise(read_store(DataType.LIBRARY), evaluation)
+
+    outcomes = library[[pokemon + '_battle' for pokemon in META]].to_numpy(dtype=float)
+    assert not any(column.endswith('_matchup') for column in library.columns)
+    assert ((outcomes >= -1) & (outcomes <= 1)).all()
+    teams = numpy.array([[0, 1, 2], [3, 4, 5]])
+    records = library.to_dict('records')
+    assert [explanation['meta-battle']['value'] for explanation in
+            evaluation.explain_teams(library, teams)] == pytest.approx(
+        [evaluation.explain_team([records[i] for i in team])['meta-battle']['value']
+         for team in teams])
+
+def test_chunked_enrichment_matches_enrichment_at_once(meta_setup, mocker):
+    evaluation = _get_evaluation()
+    library = read_store(DataType.LIBRARY)
+    expected = _optimise(library, evaluation)
+    ConfigurationService().set_configuration_property('enrich.memory-budget', 0.01)
+    chunks = _split_library(library, 0.01 * 1024 * 1024)
+    expand_evolutions = mocker.spy(main.handler.enrich, '_expand_evolutions')
+    optimise_chunk = mocker.spy(main.handler.enrich, '_optimise_chunk')
+
+    result = _optimise(library, evaluation)
+
+    # every stage runs on one chunk of the library at a time
+    assert len(chunks) > 1
+    assert [len(call.args[0]) for call in expand_evolutions.call_args_list] == \
+        [len(chunk) for chunk in chunks]
+    assert optimise_chunk.call_count == len(chunks)
+    assert list(result.columns) == list(expected.columns)
+    assert sorted(result.to_dict('records'), key=lambda pokemon: pokemon['Name']) == \
+        sorted(expected.to_dict('records'), key=lambda pokemon: pokemon['Name'])
+
+def test_parallel_enrichment_matches_serial_enrichment(mocker):
+    mock_sys = mocker.patch('main.core.configuration.sys')
+    mock_sys.argv = [
+        'main.py',
+        'test/integration/configuration/integration-test-configuration.yaml',
+        'evaluation.second-evaluation.weights.attack=1',
+        'evaluation.second-evaluation.constraints.max-cp=2500',
+    ]
+    handler()
+    expected = {name: read_store(DataType.ENRICHED_LIBRARY, page_title=name)
+                for name in ['integration-test-evaluation', 'second-evaluation']}
+    mock_sys.argv = mock_sys.argv + ['enrich.processes=2']
+
+    handler()
+
+    for name, library in expected.items():
+        assert read_store(DataType.ENRICHED_LIBRARY, page_title=name) is not library
+        assert read_store(DataType.ENRICHED_LIBRARY, page_title=name).equals(library)
+
+def test_iv_search_adds_the_best_hypothetical_pokemon_under_the_cp_cap(meta_setup):
+    evaluation = _get_evaluation()
+    ConfigurationService().set_configuration_property('enrich.iv-search.species', ['Medicham'])
+    ConfigurationService().set_configuration_property('enrich.iv-search.variants', 2)
+    all_ivs = DataFrame([
+        {'Name': 'Medicham', 'Pokemon': 'Medicham', 'Level': 1,
+         'IV attack': attack, 'IV defence': defence, 'IV HP': hp}
+        for attack, defence, hp in product(range(16), repeat=3)])
+    levelled = _maximise_level(_filter_with_constraints(all_ivs, evaluation), evaluation)
+    stats = levelled['Real attack'] + levelled['Real defence'] + levelled['Real HP']
+
+    library = _optimise(read_store(DataType.LIBRARY), evaluation)
+
+    hypothetical = library[library['Original name'].astype(str).str.startswith(
+        'Hypothetical Medicham')].astype({'CP': int, 'Real attack': float,
+                                          'Real defence': float, 'Real HP': float})
+    assert hypothetical['Original name'].nunique() == 2
+    assert (hypothetical['CP'] <= 1500).all()
+    assert (hypothetical['Real attack'] + hypothetical['Real defence'] + \
+        hypothetical['Real HP']).max() == stats.max()
+
+def test_enriched_library_survives_a_csv_round_trip(meta_setup, tmp_path):
+    library = _optimise(read_store(DataType.LIBRARY), _get_evaluation())
+    ConfigurationService().set_configuration_property('localcsvfile.directory', str(tmp_path))
+    ConfigurationService().set_configuration_property('store.enriched-library', 'localcsvfile')
+    clear_cache(DataType.ENRICHED_LIBRARY)
+    write_store(DataType.ENRICHED_LIBRARY, library, page_title='integration-test-evaluation')
+    # a new process starts with an empty cache and parses the file
+    clear_cache(DataType.ENRICHED_LIBRARY)
+
+    parsed = read_store(DataType.ENRICHED_LIBRARY, page_title='integration-test-evaluation')
+
+    assert parsed is not library
+    assert list(parsed['Original name']) == list(library['Original name'])
+    assert get_fingerprint(parsed) == get_fingerprint(library)
+    # later tests read from the configured directory again
+    clear_cache(DataType.ENRICHED_LIBRARY)
+
+def test_iv_search_ranks_the_ivs_by_their_battles_against_the_meta(meta_setup):
+    evaluation = _get_evaluation()
+    evaluation.weights[EvaluationColumn.META_COVERAGE_WEIGHT] = 0
+    evaluation.weights[EvaluationColumn.META_BATTLE_WEIGHT] = 1
+    for feature in [EvaluationColumn.ATTACK_WEIGHT, EvaluationColumn.DEFENCE_WEIGHT,
+                    EvaluationColumn.HP_WEIGHT]:
+        evaluation.weights[feature] = 0
+    ConfigurationService().set_configuration_property('enrich.iv-search.species', ['Medicham'])
+    sample = product(range(0, 16, 5), repeat=3)
+    sampled = DataFrame([
+        {'Name': 'Medicham ' + str(number), 'Pokemon': 'Medicham', 'Level': 1,
+         'IV attack': attack, 'IV defence': defence, 'IV HP': hp}
+        for number, (attack, defence, hp) in enumerate(sample)])
+    battles = [pokemon + '_battle' for pokemon in META]
+
+    expected = _optimise(sampled, evaluation)[battles].astype(float).sum(axis=1).max()
+    library = _optimise(read_store(DataType.LIBRARY), evaluation)
+
+    hypothetical = library[library['Original name'].astype(str).str.startswith(
+        'Hypothetical Medicham')]
+    assert hypothetical['Original name'].nunique() == 1
+    assert hypothetical[battles].astype(float).sum(axis=1).max() >= expected
+
+def test_iv_search_without_cp_cap_stays_within_the_cpm_reference_data(meta_setup):
+    evaluation = _get_evaluation()
+    del evaluation.constraints[EvaluationColumn.MAX_CP_CONSTRAINT]
+    cpm = read_store(DataType.CPM_REFERENCE_DATA)
+    cpm = cpm[cpm['Level'].astype(float) <= 40]
+
+    ivs, levels, stats = _level_ivs(numpy.array([200.0, 150.0, 180.0]), cpm, evaluation)
+
+    assert len(ivs) == 16 ** 3
+    assert (levels == 40).all()
+    multiplier = cpm[cpm['Level'].astype(float) == 40]['Multiplier'].astype(float).iloc[0]
+    assert (stats[:, 0] == numpy.floor((ivs[:, 0] + 200) * multiplier)).all()
+
+def test_iv_search_species_from_the_command_line_are_split(meta_setup):
+    meta_setup.argv = meta_setup.argv + ['enrich.iv-search.species=Medicham,Azumarill']
+    configure()
+
+    assert _get_iv_search()[0] == ['Medicham', 'Azumarill']
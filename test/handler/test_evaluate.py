@@ -0,0 +1,99 @@
+import subprocess
+import sys
+
+from pandas import DataFrame
+import pytest
+
+from main.core.configuration import configure, ConfigurationService
+import main.handler.evaluate
+from main.handler.evaluate import evaluate_partition, handler, worker_handler, \
+    EvaluationWorker, ReportingService
+from main.model.evaluation import retrieve_evaluations
+from main.store import read_store, write_store, DataType
+
+from test.model.test_evaluation import CHARMANDER, IVYSAUR, PIDGEOT
+
+# cumulative import time of the evaluate entry point, in microseconds
+IMPORT_TIME_BUDGET = 1000000
+
+def test_evaluate_import_time_budget():
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         'import sys; import main.handler.evaluate; print(sorted(sys.modules))'],
+        capture_output=True, text=True, check=True)
+    import_times = {
+        line.split('|')[2].strip(): int(line.split('|')[1])
+        for line in process.stderr.splitlines() if line.startswith('import time:') and '|' in line
+        and not line.split('|')[1].strip().startswith('cumulative')}
+    imported_modules = process.stdout
+
+    assert 'googleapiclient' not in imported_modules
+    assert 'main.store.googlesheets' not in imported_modules
+    assert import_times['main.handler.evaluate'] < IMPORT_TIME_BUDGET
+
+LIBRARY = DataFrame([IVYSAUR, CHARMANDER, PIDGEOT, {**PIDGEOT, 'Name': 'Pidgeot 2', 'CP': 1400}])
+PARTITION_0 = DataFrame({'1': [0, 4], '2': [0, 4], '3': [0, 4]})
+PARTITION_1 = DataFrame({'1': [1, 4], '2': [1, 4], '3': [1, 4]})
+
+@pytest.fixture
+def evaluate_setup(mocker):
+    mock_sys = mocker.patch('main.core.configuration.sys')
+    mock_sys.argv = [
+        'main.py',
+        'test/test-assets/test-configuration.yaml',
+        'store.enriched-library=memory',
+        'store.partition=memory',
+        'store.partition-result=memory',
+    ]
+    configure()
+    EvaluationWorker().initialised = False
+    write_store(DataType.ENRICHED_LIBRARY, LIBRARY, page_title='test-evaluation')
+    write_store(DataType.PARTITION, PARTITION_0, page_title='test-evaluation.0')
+    write_store(DataType.PARTITION, PARTITION_1, page_title='test-evaluation.1')
+
+def test_worker_matches_handler(evaluate_setup):
+    handler({'permutation': 'test-evaluation.0'}, {})
+    handler({'permutation': 'test-evaluation.1'}, {})
+    expected_0 = read_store(DataType.PARTITION_RESULT, page_title='test-evaluation.0')
+    expected_1 = read_store(DataType.PARTITION_RESULT, page_title='test-evaluation.1')
+    EvaluationWorker().initialised = False
+
+    worker_handler({'permutations': ['test-evaluation.0', 'test-evaluation.1']}, {})
+
+    assert read_store(DataType.PARTITION_RESULT, page_title='test-evaluation.0').equals(expected_0)
+    assert read_store(DataType.PARTITION_RESULT, page_title='test-evaluation.1').equals(expected_1)
+    assert len(expected_0) == 2
+
+def test_worker_keeps_evaluations_and_library_warm(evaluate_setup, mocker):
+    retrieve_evaluations = mocker.spy(main.handler.evaluate, 'retrieve_evaluations')
+
+    worker_handler({'permutations': ['test-evaluation.0']}, {})
+    rows = EvaluationWorker().libraries['test-evaluation'][2]
+    worker_handler({'permutations': ['test-evaluation.1']}, {})
+
+    assert retrieve_evaluations.call_count == 1
+    assert EvaluationWorker().libraries['test-evaluation'][2] is rows
+
+def test_worker_reloads_changed_library(evaluate_setup):
+    worker_handler({'permutations': ['test-evaluation.0']}, {})
+    rows = EvaluationWorker().libraries['test-evaluation'][2]
+    write_store(DataType.ENRICHED_LIBRARY, LIBRARY.iloc[::-1].reset_index(drop=True),
+                page_title='test-evaluation')
+
+    worker_handler({'permutations': ['test-evaluation.0']}, {})
+
+    assert EvaluationWorker().libraries['test-evaluation'][2] is not rows
+    assert EvaluationWorker().libraries['test-evaluation'][2][0]['Name'] == 'Pidgeot 2'
+
+def test_teams_that_break_team_rules_are_not_evaluated(evaluate_setup):
+    ConfigurationService().set_configuration_property(
+        'evaluation.test-evaluation.constraints.unique-types', ['Normal'])
+    evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+
+    result = evaluate_partition(PARTITION_0, LIBRARY.to_dict('records'), evaluation, 10)
+
+    # the two Pidgeot are never in the same team, and the 12 orderings of teams with both
+    # of them are not evaluated
+    assert len(result) == 10
+    assert all(not {'Pidgeot', 'Pidgeot 2'} <= set(r.names) for r in result)
+    assert ReportingService().counter == 4 * 3 * 2 - 2 * 3 * 2
@@ -0,0 +1,117 @@
+from pandas import DataFrame
+import pytest
+
+from main.core.configuration import configure
+import main.handler.explain
+from main.handler.explain import batch_handler, handler, ExplanationService
+from main.model.evaluation import EvaluationColumn
+from main.store import read_store, write_store, DataType
+
+from test.model.test_evaluation import CHARMANDER, IVYSAUR, PIDGEOT
+
+LIBRARY = DataFrame([IVYSAUR, CHARMANDER, PIDGEOT])
+TEAMS = [
+    ['Ivysaur', 'Charmander', 'Pidgeot'],
+    ['Charmander', 'Charmander', 'Pidgeot'],
+]
+
+@pytest.fixture
+def explain_setup(mocker):
+    mock_sys = mocker.patch('main.core.configuration.sys')
+    mock_sys.argv = [
+        'main.py',
+        'test/test-assets/test-configuration.yaml',
+        'store.enriched-library=memory',
+        'store.explanation=memory',
+    ]
+    configure()
+    ExplanationService().initialised = False
+    write_store(DataType.ENRICHED_LIBRARY, LIBRARY, page_title='test-evaluation')
+    write_store(DataType.EXPLANATION, DataFrame(), page_title='test-evaluation')
+    return mock_sys
+
+def test_batch_matches_single_explanations(explain_setup):
+    expected = [
+        handler({'evaluation_name': 'test-evaluation', 'pokemon_names': team}, {})
+        for team in TEAMS]
+
+    explanations = batch_handler({'evaluation_name': 'test-evaluation', 'teams': TEAMS}, {})
+
+    assert explanations == expected
+
+def test_batch_stores_explanations(explain_setup, mocker):
+    explanations = batch_handler(
+        {'evaluation_name': 'test-evaluation', 'teams': TEAMS, 'store': True}, {})
+    explain_team = mocker.spy(main.handler.explain.Evaluation, 'explain_team')
+
+    stored = handler({'evaluation_name': 'test-evaluation', 'pokemon_names': TEAMS[1]}, {})
+
+    assert stored == explanations[1]
+    assert explain_team.call_count == 0
+    assert list(read_store(DataType.EXPLANATION, page_title='test-evaluation')['1']) == \
+        ['Ivysaur', 'Charmander']
+
+def test_stored_explanations_are_recomputed_when_their_inputs_change(explain_setup, mocker):
+    batch_handler({'evaluation_name': 'test-evaluation', 'teams': TEAMS, 'store': True}, {})
+    explain_team = mocker.spy(main.handler.explain.Evaluation, 'explain_team')
+    explain_setup.argv = explain_setup.argv + ['evaluation.test-evaluation.weights.attack=7']
+
+    reweighted = handler({'evaluation_name': 'test-evaluation', 'pokemon_names': TEAMS[0]}, {})
+
+    assert explain_team.call_count == 1
+    assert reweighted['attack']['weight'] == 7
+    write_store(DataType.ENRICHED_LIBRARY, LIBRARY.assign(**{'Max attack': 1.0}),
+                page_title='test-evaluation')
+
+    handler({'evaluation_name': 'test-evaluation', 'pokemon_names': TEAMS[0]}, {})
+
+    assert explain_team.call_count == 2
+
+def test_index_is_kept_until_library_changes(explain_setup):
+    batch_handler({'evaluation_name': 'test-evaluation', 'teams': TEAMS}, {})
+    index = ExplanationService().libraries['test-evaluation'][2]
+    batch_handler({'evaluation_name': 'test-evaluation', 'teams': TEAMS}, {})
+
+    assert ExplanationService().libraries['test-evaluation'][2] is index
+
+    write_store(DataType.ENRICHED_LIBRARY, LIBRARY.iloc[::-1].reset_index(drop=True),
+                page_title='test-evaluation')
+    batch_handler({'evaluation_name': 'test-evaluation', 'teams': TEAMS}, {})
+
+    assert ExplanationService().libraries['test-evaluation'][2] == \
+        {'Pidgeot': 0, 'Charmander': 1, 'Ivysaur': 2}
+
+def test_stored_explanations_keep_fractional_weights(explain_setup, mocker):
+    ExplanationService().get_evaluation('test-evaluation').weights[
+        EvaluationColumn.ATTACK_WEIGHT] = 0.5
+    batch_handler({'evaluation_name': 'test-evaluation', 'teams': TEAMS, 'store': True}, {})
+    explain_team = mocker.spy(main.handler.explain.Evaluation, 'explain_team')
+
+    stored = handler({'evaluation_name': 'test-evaluation', 'pokemon_names': TEAMS[0]}, {})
+
+    assert explain_team.call_count == 0
+    assert stored['attack']['weight'] == 0.5
+
+def test_stored_explanations_are_merged(explain_setup, mocker):
+    batch_handler({'evaluation_name': 'test-evaluation', 'teams': TEAMS, 'store': True}, {})
+    batch_handler({'evaluation_name': 'test-evaluation', 'teams': TEAMS[1:], 'store': True}, {})
+    explain_team = mocker.spy(main.handler.explain.Evaluation, 'explain_team')
+
+    for team in TEAMS:
+        handler({'evaluation_name': 'test-evaluation', 'pokemon_names': team}, {})
+
+    assert explain_team.call_count == 0
+    assert list(read_store(DataType.EXPLANATION, page_title='test-evaluation')['1']) == \
+        ['Ivysaur', 'Charmander']
+
+def test_library_is_fingerprinted_once(explain_setup, mocker):
+    batch_handler({'evaluation_name': 'test-evaluation', 'teams': TEAMS}, {})
+    library = LIBRARY.iloc[::-1].reset_index(drop=True)
+    write_store(DataType.ENRICHED_LIBRARY, library, page_title='test-evaluation')
+    get_fingerprint = mocker.spy(main.handler.explain, 'get_fingerprint')
+
+    for _ in range(2):
+        batch_handler({'evaluation_name': 'test-evaluation', 'teams': TEAMS, 'store': True}, {})
+        handler({'evaluation_name': 'test-evaluation', 'pokemon_names': TEAMS[0]}, {})
+
+    assert [call.args[0] is library for call in get_fingerprint.call_args_list].count(True) == 1
@@ -0,0 +1,135 @@
+from itertools import permutations
+
+from pandas import DataFrame
+import pytest
+
+from main.core.configuration import configure
+from main.handler.evaluate import handler as evaluate_handler, EvaluationWorker
+from main.handler.reduce import handler
+from main.model.evaluation import retrieve_evaluations, EvaluationResult
+from main.store import read_store, write_store, DataType
+
+from test.model.test_evaluation import CHARMANDER, IVYSAUR, PIDGEOT
+
+LIBRARY = DataFrame([IVYSAUR, CHARMANDER, PIDGEOT, {**PIDGEOT, 'Name': 'Pidgeot 2', 'CP': 1400}])
+
+@pytest.fixture
+def reduce_setup(mocker):
+    mock_sys = mocker.patch('main.core.configuration.sys')
+    mock_sys.argv = [
+        'main.py',
+        'test/test-assets/test-configuration.yaml',
+        'store.enriched-library=memory',
+        'store.partition=memory',
+        'store.partition-result=memory',
+        'store.result=memory',
+    ]
+    configure()
+    EvaluationWorker().initialised = False
+    write_store(DataType.ENRICHED_LIBRARY, LIBRARY, page_title='test-evaluation')
+    write_store(DataType.PARTITION, DataFrame({'1': [0, 4], '2': [0, 4], '3': [0, 4]}),
+                page_title='test-evaluation.0')
+    write_store(DataType.PARTITION, DataFrame({'1': [1, 4], '2': [1, 4], '3': [1, 4]}),
+                page_title='test-evaluation.1')
+    write_store(DataType.PARTITION, DataFrame({'partitions': [2]}), page_title='test-evaluation')
+    write_store(DataType.PARTITION_RESULT, DataFrame(), page_title='test-evaluation.2')
+    evaluate_handler({'permutation': 'test-evaluation.0'}, {})
+    evaluate_handler({'permutation': 'test-evaluation.1'}, {})
+    return mock_sys
+
+def test_partition_results_hold_library_positions(reduce_setup):
+    result = read_store(DataType.PARTITION_RESULT, page_title='test-evaluation.0')
+
+    assert list(result.columns) == ['1', '2', '3', 'result', 'library']
+    assert [str(dtype) for dtype in result.dtypes] == \
+        ['int32', 'int32', 'int32', 'float64', 'int64']
+    assert result['library'].nunique() == 1
+
+def test_reduce_resolves_names(reduce_setup):
+    partition_results = [
+        read_store(DataType.PARTITION_RESULT, page_title='test-evaluation.' + str(i))
+        for i in range(2)]
+
+    handler()
+
+    result = read_store(DataType.RESULT, page_title='test-evaluation')
+    assert list(result.columns) == ['1', '2', '3', 'result']
+    assert len(result) == 2
+    best = max(partition_results, key=lambda r: r['result'].max())
+    best = best.sort_values(by=['result'], ascending=False).iloc[0]
+    assert result['result'].iloc[0] == best['result']
+    assert list(result.iloc[0][['1', '2', '3']]) == \
+        [LIBRARY['Name'][best[column]] for column in ['1', '2', '3']]
+
+def test_reduce_rejects_results_for_another_library(reduce_setup):
+    write_store(DataType.ENRICHED_LIBRARY, LIBRARY.iloc[::-1].reset_index(drop=True),
+                page_title='test-evaluation')
+
+    with pytest.raises(Exception, match='refer to a different enriched library'):
+        handler()
+
+def test_reduce_ignores_results_left_from_an_earlier_run(reduce_setup):
+    stale = read_store(DataType.PARTITION_RESULT, page_title='test-evaluation.0')
+    write_store(DataType.PARTITION_RESULT, stale.assign(library=0, result=stale['result'] + 1),
+                page_title='test-evaluation.2')
+
+    handler()
+
+    assert len(read_store(DataType.RESULT, page_title='test-evaluation')) == 2
+
+def test_reduce_expands_equivalent_pokemon(reduce_setup):
+    library = DataFrame([
+        IVYSAUR,
+        CHARMANDER,
+        {**IVYSAUR, 'Name': 'Ivysaur 2'},
+        {**CHARMANDER, 'Name': 'Charmander 2'},
+    ])
+    write_store(DataType.ENRICHED_LIBRARY, library, page_title='test-evaluation')
+    # the two classes of the library, each of which has two members
+    write_store(DataType.PARTITION, DataFrame({'1': [0, 2], '2': [0, 2], '3': [0, 2]}),
+                page_title='test-evaluation.0')
+    write_store(DataType.PARTITION_RESULT, DataFrame(), page_title='test-evaluation.1')
+    evaluate_handler({'permutation': 'test-evaluation.0'}, {})
+
+    handler()
+
+    result = read_store(DataType.RESULT, page_title='test-evaluation')
+    evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+    rows = library.to_dict('records')
+    expected = sorted(
+        EvaluationResult([rows[i] for i in team], evaluation)
+        for team in permutations(range(len(rows)), 3))[::-1][:2]
+    assert list(result['result']) == [r.result for r in expected]
+    assert all(len(set(team)) == 3 for team in result[['1', '2', '3']].to_numpy().tolist())
+
+def test_reduce_keeps_the_best_team_per_species(reduce_setup):
+    reduce_setup.argv = reduce_setup.argv + ['results-diversity=species']
+    library = DataFrame([
+        IVYSAUR,
+        CHARMANDER,
+        PIDGEOT,
+        {**IVYSAUR, 'Name': 'Ivysaur 2', 'CP': 1400},
+        {**CHARMANDER, 'Name': 'Charmander 2', 'CP': 1000},
+        {**PIDGEOT, 'Name': 'Pidgeot 2', 'CP': 1400},
+    ])
+    write_store(DataType.ENRICHED_LIBRARY, library, page_title='test-evaluation')
+    write_store(DataType.PARTITION, DataFrame({'1': [0, 6], '2': [0, 6], '3': [0, 6]}),
+                page_title='test-evaluation.0')
+    write_store(DataType.PARTITION_RESULT, DataFrame(), page_title='test-evaluation.1')
+    evaluate_handler({'permutation': 'test-evaluation.0'}, {})
+
+    handler()
+
+    result = read_store(DataType.RESULT, page_title='test-evaluation')
+    evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+    rows = library.to_dict('records')
+    species = dict(zip(library['Name'], library['Pokemon']))
+    best = {}
+    for team in permutations(range(len(rows)), 3):
+        key = tuple(sorted(rows[i]['Pokemon'] for i in team))
+        score = EvaluationResult([rows[i] for i in team], evaluation).result
+        best[key] = max(best.get(key, 0), score)
+    assert list(result['result']) == sorted(best.values(), reverse=True)[:2]
+    keys = [tuple(sorted(species[name] for name in team))
+            for team in result[['1', '2', '3']].to_numpy().tolist()]
+    assert len(set(keys)) == len(keys)
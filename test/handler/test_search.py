@@ -0,0 +1,85 @@
+import itertools
+
+from pandas import DataFrame
+import pytest
+
+from main.core.configuration import configure, ConfigurationService
+from main.handler.search import handler, search, SearchBudget
+from main.model.evaluation import retrieve_evaluations, EvaluationResult
+from main.store import read_store, write_store, DataType
+
+from test.model.test_evaluation import CHARMANDER, IVYSAUR, PIDGEOT
+
+LIBRARY = DataFrame([
+    {**pokemon, 'Name': pokemon['Name'] + ' ' + str(level),
+     'Real attack': pokemon['Real attack'] + level * 7 % 11,
+     'Real HP': pokemon['Real HP'] + level * 5 % 13,
+     'CP': pokemon['CP'] + level * 40 % 90 - 40}
+    for pokemon in [IVYSAUR, CHARMANDER, PIDGEOT] for level in range(5)])
+
+@pytest.fixture
+def search_setup(mocker):
+    mock_sys = mocker.patch('main.core.configuration.sys')
+    mock_sys.argv = [
+        'main.py',
+        'test/test-assets/test-configuration.yaml',
+        'store.enriched-library=memory',
+        'store.result=memory',
+        'store.search-result=memory',
+        'results-size=3',
+    ]
+    configure()
+    write_store(DataType.ENRICHED_LIBRARY, LIBRARY, page_title='test-evaluation')
+
+def _exhaustive(library, evaluation, results_size):
+    results = [
+        EvaluationResult(list(team), evaluation)
+        for team in itertools.combinations(library, 3)]
+    return sorted(results, reverse=True)[:results_size]
+
+def test_search_matches_exhaustive_evaluation(search_setup):
+    evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+    library = LIBRARY.to_dict('records')
+
+    result = search(library, evaluation, 3, 4, SearchBudget(60))
+
+    expected = _exhaustive(library, evaluation, 3)
+    assert [r.result for r in result] == pytest.approx([r.result for r in expected])
+
+def test_search_skips_teams_that_break_team_rules(search_setup):
+    ConfigurationService().set_configuration_property(
+        'evaluation.test-evaluation.constraints.unique-types', ['Grass'])
+    evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+    library = LIBRARY.to_dict('records')
+
+    result = search(library, evaluation, 3, 4, SearchBudget(60))
+
+    expected = [r for r in _exhaustive(library, evaluation, len(library) ** 3)
+                if evaluation.team_follows_rules(r.team)][:3]
+    assert all(evaluation.team_follows_rules(r.team) for r in result)
+    assert [r.result for r in result] == pytest.approx([r.result for r in expected])
+
+def test_search_stops_when_budget_is_exhausted(search_setup):
+    evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+    budget = SearchBudget(60, evaluations=20)
+
+    result = search(LIBRARY.to_dict('records'), evaluation, 3, 4, budget)
+
+    assert len(result) >= 1
+    # completing the first team takes at most one evaluation per team size over budget
+    assert 20 <= budget.evaluations <= 23
+
+def test_handler_reports_gap_to_upper_bound(search_setup):
+    evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+    best = _exhaustive(LIBRARY.to_dict('records'), evaluation, 1)[0].result
+    exhaustive_result = DataFrame({'1': ['Ivysaur 0'], '2': ['Ivysaur 1'], '3': ['Ivysaur 2']})
+    write_store(DataType.RESULT, exhaustive_result, page_title='test-evaluation')
+
+    report = handler({'evaluation_name': 'test-evaluation'}, {})
+
+    result = read_store(DataType.SEARCH_RESULT, page_title='test-evaluation')
+    assert read_store(DataType.RESULT, page_title='test-evaluation') is exhaustive_result
+    assert list(result['result']) == sorted(result['result'], reverse=True)
+    assert report['best'] == pytest.approx(result['result'][0])
+    assert report['upper-bound'] >= best
+    assert report['gap'] == pytest.approx(report['upper-bound'] - report['best'])
@@ -0,0 +1,113 @@
+from itertools import permutations
+
+from pandas import DataFrame
+import pytest
+
+from main.core.configuration import configure, ConfigurationService
+from main.handler.sweep import handler, reduce_handler
+from main.model.evaluation import retrieve_evaluations, EvaluationResult
+from main.store import read_store, write_store, DataType
+
+from test.model.test_evaluation import CHARMANDER, IVYSAUR, PIDGEOT
+
+LIBRARY = DataFrame([IVYSAUR, CHARMANDER, PIDGEOT, {**PIDGEOT, 'Name': 'Pidgeot 2', 'CP': 1400}])
+PARTITION_0 = DataFrame({'1': [0, 4], '2': [0, 4], '3': [0, 4]})
+PARTITION_1 = DataFrame({'1': [1, 4], '2': [0, 2], '3': [2, 4]})
+# the weight sweep of the test evaluation in the test configuration
+WEIGHT_SWEEP = [
+    {'attack': 1, 'defence': 1, 'hp': 1},
+    {'attack-cycle-length-inverted': 1500, 'type-vulnerability': 100},
+    {'defence': 2, 'attack-cycle-damage': 10},
+]
+
+@pytest.fixture
+def sweep_setup(mocker):
+    mock_sys = mocker.patch('main.core.configuration.sys')
+    mock_sys.argv = [
+        'main.py',
+        'test/test-assets/test-configuration.yaml',
+        'store.enriched-library=memory',
+        'store.partition=memory',
+        'store.partition-result=memory',
+        'store.weight-sweep=configuration',
+        'store.weight-sweep-result=memory',
+    ]
+    configure()
+    write_store(DataType.ENRICHED_LIBRARY, LIBRARY, page_title='test-evaluation')
+    write_store(DataType.PARTITION, PARTITION_0, page_title='test-evaluation.0')
+    write_store(DataType.PARTITION, PARTITION_1, page_title='test-evaluation.1')
+    write_store(DataType.PARTITION, DataFrame({'partitions': [2]}), page_title='test-evaluation')
+    return mock_sys
+
+def _evaluate(partition, weights):
+    ConfigurationService().set_configuration_property('evaluation.test-evaluation.weights', weights)
+    evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+    rows = LIBRARY.to_dict('records')
+    results = [
+        EvaluationResult([rows[i], rows[j], rows[k]], evaluation)
+        for i in range(*partition['1']) for j in range(*partition['2'])
+        for k in range(*partition['3']) if len({i, j, k}) == 3]
+    return sorted(results, reverse=True)[:2]
+
+def test_weight_sweep_from_configuration(sweep_setup):
+    weights = read_store(DataType.WEIGHT_SWEEP, page_title='test-evaluation')
+
+    assert len(weights) == 3
+    assert list(weights['defence-weight']) == [1, 0, 2]
+    assert read_store(DataType.WEIGHT_SWEEP, page_title='missing-evaluation').empty
+
+@pytest.mark.parametrize('permutation, partition', [
+    ('test-evaluation.0', PARTITION_0),
+    ('test-evaluation.1', PARTITION_1),
+])
+def test_sweep_matches_evaluation_per_weight_vector(sweep_setup, permutation, partition):
+    handler({'permutation': permutation}, {})
+    result = read_store(DataType.WEIGHT_SWEEP_RESULT, page_title=permutation)
+
+    for number, weights in enumerate(WEIGHT_SWEEP):
+        expected = _evaluate(partition, weights)
+        swept = result[result['weights'] == number]
+        assert list(swept['result']) == pytest.approx([r.result for r in expected])
+        assert set(swept.iloc[0][['1', '2', '3']]) == set(expected[0].names)
+
+def test_sweep_reduce(sweep_setup):
+    handler({'permutation': 'test-evaluation.0'}, {})
+    handler({'permutation': 'test-evaluation.1'}, {})
+
+    reduce_handler()
+    result = read_store(DataType.WEIGHT_SWEEP_RESULT, page_title='test-evaluation')
+
+    assert list(result['weights']) == [0, 0, 1, 1, 2, 2]
+    for number in range(len(WEIGHT_SWEEP)):
+        scores = list(result[result['weights'] == number]['result'])
+        assert scores == sorted(scores, reverse=True)
+
+def test_sweep_uses_the_classes_of_the_results_diversity(sweep_setup):
+    sweep_setup.argv = sweep_setup.argv + ['results-diversity=species']
+    library = DataFrame([
+        IVYSAUR, {**IVYSAUR, 'Name': 'Venusaur', 'Pokemon': 'Venusaur'}, CHARMANDER, PIDGEOT])
+    # distribute groups the library into one class per Pokemon for this diversity
+    write_store(DataType.ENRICHED_LIBRARY, library, page_title='test-evaluation')
+    write_store(DataType.PARTITION, PARTITION_0, page_title='test-evaluation.0')
+
+    handler({'permutation': 'test-evaluation.0'}, {})
+    result = read_store(DataType.WEIGHT_SWEEP_RESULT, page_title='test-evaluation.0')
+
+    rows = library.to_dict('records')
+    species = dict(zip(library['Name'], library['Pokemon']))
+    for number, weights in enumerate(WEIGHT_SWEEP):
+        ConfigurationService().set_configuration_property(
+            'evaluation.test-evaluation.weights', weights)
+        evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+        best = max(EvaluationResult([rows[i] for i in team], evaluation).result
+                   for team in permutations(range(len(rows)), 3))
+        swept = result[result['weights'] == number]
+        assert swept['result'].iloc[0] == pytest.approx(best)
+        keys = [tuple(sorted(species[name] for name in team))
+                for team in swept[['1', '2', '3']].to_numpy().tolist()]
+        assert len(set(keys)) == len(keys)
+
+    write_store(DataType.WEIGHT_SWEEP_RESULT, DataFrame(), page_title='test-evaluation.1')
+    reduce_handler()
+    reduced = read_store(DataType.WEIGHT_SWEEP_RESULT, page_title='test-evaluation')
+    assert reduced.equals(result.reset_index(drop=True))
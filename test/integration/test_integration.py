@@ -20,7 +20,7 @@ def setup(mocker):
 def test_integration(setup):
     enrich_handler()
     partitions = distribute_handler()
-    assert len(partitions) == 84
+    assert len(partitions) == 10
     for partition in partitions:
         evaluate_handler(event={'permutation': partition}, context={})
     reduce_handler()
@@ -48,6 +48,14 @@ def test_integration(setup):
             'value': 343.0,
             'weight': 1
         },
+        'meta-battle': {
+            'value': 0.0,
+            'weight': 0
+        },
+        'meta-coverage': {
+            'value': 0.0,
+            'weight': 0
+        },
         'score': 1852.2857142857142,
         'type-vulnerability': {
             'value': 0.0,
@@ -0,0 +1,110 @@
+import numpy
+from pandas import concat, DataFrame, Series
+
+from main.model.battle import get_type_positions, pack_types, simulate_battles, \
+    BattleColumn
+from main.model.referencedata import PokemonType
+
+from test.model.test_evaluation import CHARMANDER, IVYSAUR, PIDGEOT
+
+TYPES = [pokemon_type.value for pokemon_type in PokemonType]
+NEUTRAL_TYPE_CHART = DataFrame({'Type': TYPES, **{type_name: 1.0 for type_name in TYPES}})
+TYPE_CHART = NEUTRAL_TYPE_CHART.copy()
+# grass attacks are strong against water and weak against fire
+TYPE_CHART.loc[TYPE_CHART['Type'] == 'Grass', ['Water', 'Fire']] = [1.6, 0.625]
+
+FAST_ONLY = {
+    'Type 1': 'Normal',
+    'Type 2': numpy.nan,
+    'Real attack': 100,
+    'Real defence': 100,
+    'Real HP': 100,
+    'Fast attack type': 'Normal',
+    'Fast attack duration': 1,
+    'Fast attack damage': 10,
+    'Fast attack energy generated': 5,
+    'Fast attack STAB': 1.0,
+    'Charged attack 1 type': 'Normal',
+    'Charged attack 1 damage': 100,
+    'Charged attack 1 energy cost': -1000,
+    'Charged attack 1 STAB': 1.0,
+    'Charged attack 2 type': 'Normal',
+    'Charged attack 2 damage': 100,
+    'Charged attack 2 energy cost': -1000,
+    'Charged attack 2 STAB': 1.0,
+}
+
+def test_battle_of_fast_attacks():
+    pokemon = DataFrame([FAST_ONLY])
+    opponent = DataFrame([{**FAST_ONLY, 'Real HP': 50}])
+
+    result = simulate_battles(pokemon, opponent, NEUTRAL_TYPE_CHART).iloc[0]
+
+    # each fast attack deals floor(0.5 * 10 * 1.3) + 1 = 7 damage,
+    # so the opponent faints in the 8th turn, after taking 56 damage
+    assert result[BattleColumn.WON.value]
+    assert result[BattleColumn.TURNS.value] == 8
+    assert result[BattleColumn.REMAINING_HP.value] == 0.44
+    assert result[BattleColumn.OPPONENT_REMAINING_HP.value] == 0
+
+def test_charged_attacks_use_energy():
+    charger = {**FAST_ONLY, 'Charged attack 1 energy cost': -20}
+    pokemon = DataFrame([charger])
+    opponent = DataFrame([FAST_ONLY])
+
+    result = simulate_battles(pokemon, opponent, NEUTRAL_TYPE_CHART).iloc[0]
+
+    assert result[BattleColumn.WON.value]
+    assert result[BattleColumn.TURNS.value] < 15
+
+def test_type_effectiveness_decides_mirror_battles():
+    grass = {**FAST_ONLY, 'Type 1': 'Grass', 'Fast attack type': 'Grass'}
+    water = {**FAST_ONLY, 'Type 1': 'Water', 'Fast attack type': 'Water'}
+    fire = {**FAST_ONLY, 'Type 1': 'Fire', 'Fast attack type': 'Fire'}
+
+    result = simulate_battles(
+        DataFrame([grass, grass]), DataFrame([water, fire]), TYPE_CHART)
+
+    assert list(result[BattleColumn.WON.value]) == [True, False]
+
+def test_battles_are_simulated_independently():
+    library = DataFrame([IVYSAUR, CHARMANDER, PIDGEOT])
+    pokemon = library.iloc[[0, 0, 1, 1, 2, 2]].reset_index(drop=True)
+    opponents = library.iloc[[1, 2, 0, 2, 0, 1]].reset_index(drop=True)
+
+    batch = simulate_battles(pokemon, opponents, TYPE_CHART)
+    single = concat([
+        simulate_battles(pokemon.iloc[[n]], opponents.iloc[[n]], TYPE_CHART)
+        for n in range(len(pokemon))])
+
+    assert batch.equals(single)
+    assert (batch[BattleColumn.WON.value] == (
+        (batch[BattleColumn.REMAINING_HP.value] > 0) &
+        (batch[BattleColumn.OPPONENT_REMAINING_HP.value] == 0))).all()
+
+def test_packed_types_keep_their_positions():
+    types = Series(['Grass', '', None, 'Fairy'])
+
+    packed = pack_types(types)
+
+    assert packed.cat.codes.dtype == numpy.int8
+    assert list(packed.isna()) == [False, False, True, False]
+    assert list(packed.dropna()) == ['Grass', '', 'Fairy']
+    assert list(get_type_positions(packed)) == list(get_type_positions(types)) == \
+        [list(PokemonType).index(PokemonType.GRASS), len(PokemonType), len(PokemonType),
+         list(PokemonType).index(PokemonType.FAIRY)]
+
+def test_unknown_types_are_not_packed():
+    types = Series(['Grass', 'Shadow'])
+
+    assert pack_types(types).equals(types)
+
+def test_packed_types_give_the_same_battles():
+    library = DataFrame([IVYSAUR, CHARMANDER, PIDGEOT])
+    packed = library.copy()
+    for column in ['Type 1', 'Type 2', 'Fast attack type', 'Charged attack 1 type',
+                   'Charged attack 2 type']:
+        packed[column] = pack_types(packed[column])
+
+    assert simulate_battles(packed, packed.iloc[::-1].reset_index(drop=True), TYPE_CHART) \
+        .equals(simulate_battles(library, library.iloc[::-1].reset_index(drop=True), TYPE_CHART))
@@ -0,0 +1,58 @@
+from collections import Counter
+from itertools import product
+
+import numpy
+from pandas import DataFrame
+
+from main.model.equivalence import Diversity, EquivalenceClasses
+
+from test.model.test_evaluation import CHARMANDER, IVYSAUR, PIDGEOT
+
+LIBRARY = DataFrame([
+    IVYSAUR,
+    CHARMANDER,
+    {**IVYSAUR, 'Name': 'Ivysaur 2', 'Charged attack 2': 'Solar Beam'},
+    PIDGEOT,
+    {**IVYSAUR, 'Name': 'Ivysaur 3'},
+    {**PIDGEOT, 'Name': 'Pidgeot 2', 'CP': 1400},
+])
+
+def test_pokemon_with_the_same_evaluated_values_are_equivalent():
+    classes = EquivalenceClasses(LIBRARY)
+
+    assert list(classes.classes) == [0, 1, 0, 2, 0, 3]
+    assert list(classes.representatives) == [0, 1, 3, 5]
+    assert list(classes.sizes) == [3, 1, 1, 1]
+    assert [list(members) for members in classes.members] == [[0, 2, 4], [1], [3], [5]]
+    assert len(classes) == 4
+
+def test_teams_use_classes_at_most_as_often_as_they_have_members():
+    classes = EquivalenceClasses(LIBRARY)
+    teams = numpy.array(list(product(range(len(classes)), repeat=3)))
+
+    allowed = classes.allow(teams)
+
+    assert list(allowed) == [
+        all(classes.sizes[c] >= count for c, count in Counter(team.tolist()).items())
+        for team in teams]
+
+def test_teams_expand_into_distinct_pokemon():
+    classes = EquivalenceClasses(LIBRARY)
+
+    assert list(classes.expand((0, 0, 1), 10)) == [
+        (0, 2, 1), (0, 4, 1), (2, 0, 1), (2, 4, 1), (4, 0, 1), (4, 2, 1)]
+    assert list(classes.expand((0, 0, 1), 2)) == [(0, 2, 1), (0, 4, 1)]
+    teams, scores = classes.expand_teams(
+        numpy.array([[3, 0, 5], [0, 1, 3]]), numpy.array([2.0, 1.0]), 4)
+    assert teams.tolist() == [[3, 0, 5], [3, 2, 5], [3, 4, 5], [0, 1, 3]]
+    assert scores.tolist() == [2.0, 2.0, 2.0, 1.0]
+
+def test_pokemon_of_different_species_are_not_equivalent_with_species_diversity():
+    library = DataFrame([IVYSAUR, {**IVYSAUR, 'Name': 'Venusaur', 'Pokemon': 'Venusaur'}, PIDGEOT])
+
+    classes = EquivalenceClasses(library, Diversity.SPECIES)
+
+    assert len(EquivalenceClasses(library)) == 2
+    assert len(classes) == 3
+    assert classes.team_key((2, 0, 1)) == classes.team_key((1, 2, 0))
+    assert classes.team_key((0, 0, 2)) != classes.team_key((0, 1, 2))
@@ -1,3 +1,9 @@
+import numpy
+from pandas import DataFrame
+import pytest
+
+from main.core.configuration import ConfigurationService
+import main.model.evaluation
 from main.model.evaluation import EvaluationColumn, EvaluationResult, retrieve_evaluations
 from main.store import read_store, DataType
 
@@ -274,6 +280,14 @@ def test_explanation(framework_setup):
             'value': 381.0,
             'weight': 1
         },
+        'meta-battle': {
+            'value': 0.0,
+            'weight': 0
+        },
+        'meta-coverage': {
+            'value': 0.0,
+            'weight': 0
+        },
         'score': 1628.2857142857142,
         'type-vulnerability': {
             'value': 0.0,
@@ -306,4 +320,77 @@ def test_compare_evaluation_results(framework_setup):
     assert result1 == result1
     assert result1 != {}
     assert result1 != result2
-    assert repr(result1) == 'test-evaluation([\'Ivysaur\', \'Charmander\', \'Pidgeot\']) = 0'
\ No newline at end of file
+    assert repr(result1) == 'test-evaluation([\'Ivysaur\', \'Charmander\', \'Pidgeot\']) = 0'
+
+def test_explanation_of_many_teams(framework_setup):
+    evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+    library = DataFrame([IVYSAUR, CHARMANDER, PIDGEOT])
+    teams = numpy.array([[0, 1, 2], [2, 1, 0], [1, 1, 2]])
+
+    explanations = evaluation.explain_teams(library, teams)
+
+    assert explanations == [
+        evaluation.explain_team([IVYSAUR, CHARMANDER, PIDGEOT]),
+        evaluation.explain_team([PIDGEOT, CHARMANDER, IVYSAUR]),
+        evaluation.explain_team([CHARMANDER, CHARMANDER, PIDGEOT]),
+    ]
+
+def test_meta_coverage(framework_setup):
+    evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+    evaluation.weights[EvaluationColumn.META_COVERAGE_WEIGHT] = 50
+    team = [
+        {**IVYSAUR, 'Azumarill_matchup': 1.5, 'Medicham_matchup': 0.5, 'Skarmory_matchup': 0.8},
+        {**CHARMANDER, 'Azumarill_matchup': 0.4, 'Medicham_matchup': 0.9, 'Skarmory_matchup': 1.1},
+        {**PIDGEOT, 'Azumarill_matchup': 1.2, 'Medicham_matchup': 0.7, 'Skarmory_matchup': 0.6},
+    ]
+
+    explanation = evaluation.explain_team(team)
+
+    assert explanation['meta-coverage'] == {'value': 2.0, 'weight': 50}
+    assert evaluation.evaluate_team(team) == 1628.2857142857142 + 100
+    assert evaluation.explain_teams(DataFrame(team), numpy.array([[0, 1, 2]])) == [explanation]
+    assert evaluation.bound_team_score(team) >= evaluation.evaluate_team(team) + 50
+
+def test_meta_columns_are_resolved_once_and_only_for_weighted_features(framework_setup, mocker):
+    evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+    team = [
+        {**IVYSAUR, 'Azumarill_matchup': 1.5, 'Azumarill_battle': 0.5},
+        {**CHARMANDER, 'Azumarill_matchup': 0.4, 'Azumarill_battle': -0.2},
+        {**PIDGEOT, 'Azumarill_matchup': 1.2, 'Azumarill_battle': 0.1},
+    ]
+    get_matchup_columns = mocker.spy(main.model.evaluation, '_get_matchup_columns')
+
+    # without weights for the meta, the meta features are not computed at all
+    assert evaluation.evaluate_team(team) == 1628.2857142857142
+    get_matchup_columns.assert_not_called()
+    evaluation.weights[EvaluationColumn.META_COVERAGE_WEIGHT] = 50
+    evaluation.weights[EvaluationColumn.META_BATTLE_WEIGHT] = 10
+    evaluation.use_library_columns(list(DataFrame(team).columns))
+    for _ in range(3):
+        assert evaluation.evaluate_team(team) == pytest.approx(1628.2857142857142 + 50 + 5)
+    assert get_matchup_columns.call_count == 2
+
+def test_cup_rules_from_configuration(framework_setup):
+    ConfigurationService().set_configuration_property(
+        'evaluation.test-evaluation.constraints.allowed-types', ['Fire', 'Normal'])
+    ConfigurationService().set_configuration_property(
+        'evaluation.test-evaluation.constraints.banned-species', ['Pidgeot'])
+    evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+    library = DataFrame([IVYSAUR, CHARMANDER, {**PIDGEOT, 'CP': 1400}])
+
+    assert [evaluation.matches_constraints(pokemon) for pokemon in library.to_dict('records')] \
+        == [False, True, False]
+    assert list(evaluation.library_matches_constraints(library)) == [False, True, False]
+
+def test_team_rules_are_compiled_into_bitmasks(framework_setup):
+    ConfigurationService().set_configuration_property(
+        'evaluation.test-evaluation.constraints.unique-types', ['Flying', 'Poison'])
+    evaluation = retrieve_evaluations(read_store(DataType.EVALUATION))[0]
+    library = DataFrame([IVYSAUR, CHARMANDER, PIDGEOT, {**PIDGEOT, 'Name': 'Pidgeot 2'}])
+
+    assert list(evaluation.get_team_masks(library)) == \
+        [evaluation.get_team_mask(pokemon) for pokemon in library.to_dict('records')] == \
+        [2, 0, 1, 1]
+    assert evaluation.team_follows_rules([IVYSAUR, CHARMANDER, PIDGEOT])
+    assert not evaluation.team_follows_rules([CHARMANDER, PIDGEOT, PIDGEOT])
+    assert EvaluationResult([CHARMANDER, PIDGEOT, PIDGEOT], evaluation).result == 0
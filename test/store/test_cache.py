@@ -0,0 +1,47 @@
+from pandas import DataFrame
+
+from main.store.cache import get_size, DataFrameCache
+
+FRAME_1 = DataFrame({'Header1': [1, 2, 3]})
+FRAME_2 = DataFrame({'Header1': [4, 5, 6]})
+FRAME_3 = DataFrame({'Header1': [7, 8, 9]})
+
+def test_cache_hit_and_miss():
+    cache = DataFrameCache(get_size(FRAME_1) * 3)
+    cache.put('1', FRAME_1)
+
+    assert cache.get('1') is FRAME_1
+    assert cache.get('2') is None
+    assert '1' in cache
+    assert cache.size == get_size(FRAME_1)
+
+def test_cache_evicts_least_recently_used():
+    evicted = []
+    cache = DataFrameCache(
+        get_size(FRAME_1) * 2, on_evict=lambda key, data: evicted.append(key))
+    cache.put('1', FRAME_1)
+    cache.put('2', FRAME_2)
+    cache.get('1')
+    cache.put('3', FRAME_3)
+
+    assert evicted == ['2']
+    assert '1' in cache and '3' in cache
+    assert cache.evictions == 1
+    assert cache.size == get_size(FRAME_1) * 2
+
+def test_cache_replaces_entry_without_eviction():
+    cache = DataFrameCache(get_size(FRAME_1) * 2)
+    cache.put('1', FRAME_1)
+    cache.put('1', FRAME_2)
+
+    assert cache.get('1') is FRAME_2
+    assert len(cache) == 1
+    assert cache.evictions == 0
+
+def test_cache_pop():
+    cache = DataFrameCache(get_size(FRAME_1))
+    cache.put('1', FRAME_1)
+
+    assert cache.pop('1') is FRAME_1
+    assert cache.pop('1') is None
+    assert cache.size == 0
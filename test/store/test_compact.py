@@ -0,0 +1,66 @@
+import numpy
+from pandas import CategoricalDtype, DataFrame
+
+from main.store.compact import compact, concat_compact
+
+LIBRARY = DataFrame({
+    'Name': ['Ivysaur', 'Charmander', 'Pidgeot', 'Pidgeot 2'],
+    'Type 1': ['Grass', 'Normal', 'Normal', 'Normal'],
+    'CP': [1498, 1099, 1555, 1400],
+    'Level': [40.0, 40.5, 40.0, 40.0],
+    'Real attack': [112.35, 116.28, 129.12, 121.75],
+    'Shadow': [False, True, False, False],
+})
+
+def test_values_are_unchanged():
+    result = compact(LIBRARY)
+
+    assert result.to_dict('records') == LIBRARY.to_dict('records')
+    assert list(result.columns) == list(LIBRARY.columns)
+
+def test_columns_use_narrow_types():
+    result = compact(LIBRARY)
+
+    assert result['CP'].dtype == numpy.int16
+    assert str(result['Type 1'].dtype) == 'category'
+    assert str(result['Level'].dtype) == 'category'
+    assert result['Real attack'].dtype == numpy.float64
+    assert result['Shadow'].dtype == bool
+    assert result['Name'].dtype == object
+
+def test_exact_floats_use_single_precision():
+    data = DataFrame({'Attack': [10.5, 11.25, 12.0, 13.75]})
+
+    result = compact(data)
+
+    assert result['Attack'].dtype == numpy.float32
+    assert (result['Attack'] == data['Attack']).all()
+
+def test_memory_usage_drops():
+    data = DataFrame({
+        'Type 1': ['Grass', 'Fire', 'Water', 'Normal'] * 100,
+        'CP': range(1000, 1400),
+    })
+
+    assert compact(data).memory_usage(deep=True).sum() < \
+        data.memory_usage(deep=True).sum() / 4
+
+def test_concatenated_chunks_keep_their_categories():
+    chunks = [compact(LIBRARY.iloc[:2]), compact(LIBRARY.iloc[2:])]
+
+    result = concat_compact(chunks)
+
+    assert result.to_dict('records') == LIBRARY.to_dict('records')
+    assert str(result['Type 1'].dtype) == 'category'
+    assert str(result['Level'].dtype) == 'category'
+
+def test_concatenated_chunks_keep_shared_categories_in_order():
+    dtype = CategoricalDtype(['Water', 'Grass', 'Normal'])
+    chunks = [compact(LIBRARY.iloc[:2]), compact(LIBRARY.iloc[2:])]
+    for chunk in chunks:
+        chunk['Type 1'] = chunk['Type 1'].astype(dtype)
+
+    result = concat_compact(chunks)
+
+    assert result['Type 1'].dtype == dtype
+    assert list(result['Type 1']) == list(LIBRARY['Type 1'])
@@ -1,6 +1,7 @@
 from pandas import DataFrame
 import pytest
 
+from main.core.configuration import ConfigurationService
 from main.store import read_store, write_store, DataType
 
 from test.util import framework_setup
@@ -19,4 +20,10 @@ def test_configuration_store_only_supports_evaluation_data(framework_setup):
 
 def test_configuration_store_does_not_support_writing(framework_setup):
     with pytest.raises(Exception, match='Writing not supported for configuration storage'):
-        write_store(DataType.EVALUATION, DataFrame())
\ No newline at end of file
+        write_store(DataType.EVALUATION, DataFrame())
+
+def test_single_list_constraint_value_is_not_split_into_characters(framework_setup):
+    ConfigurationService().set_configuration_property(
+        'evaluation.test-evaluation.constraints.banned-species', 'Dragonite')
+    evaluation_data: DataFrame = read_store(DataType.EVALUATION)
+    assert evaluation_data['banned-species-constraint'][0] == 'Dragonite'
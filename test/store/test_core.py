@@ -0,0 +1,134 @@
+import threading
+import time
+
+from pandas import read_csv, DataFrame
+import pytest
+
+from main.core.configuration import ConfigurationService
+from main.store import clear_cache, flush_store, get_fingerprint, prefetch_store, query_store, \
+    read_store, write_store, DataType
+from main.store.compact import compact
+from main.store.memory import InMemoryStore
+
+from test.util import framework_setup
+
+MOCK_VALUES = DataFrame({
+    'Header1' : ['Row1Col1', 'Row2Col1'],
+    'Header2' : ['Row1Col2', 'Row2Col2']
+})
+
+def test_prefetch_store(framework_setup):
+    write_store(DataType.CACHE, MOCK_VALUES)
+
+    data = prefetch_store([DataType.CACHE, DataType.EVALUATION])
+
+    assert data[DataType.CACHE].equals(MOCK_VALUES)
+    assert len(data[DataType.EVALUATION]) == 1
+
+def test_prefetch_store_reads_in_parallel(framework_setup, mocker):
+    ConfigurationService().set_configuration_property('store.delta', 'memory')
+    clear_cache(DataType.CACHE)
+    threads = set()
+    def _slow_read(data_type, page_title=''):
+        threads.add(threading.get_ident())
+        time.sleep(0.1)
+        return MOCK_VALUES
+    mocker.patch('main.store.memory.InMemoryStore.read_store', side_effect=_slow_read)
+
+    start = time.time()
+    data = prefetch_store([DataType.CACHE, DataType.DELTA])
+
+    assert time.time() - start < 0.2
+    assert len(threads) == 2
+    assert data[DataType.DELTA] is MOCK_VALUES
+
+def test_write_behind_reads_pending_writes(framework_setup, mocker):
+    ConfigurationService().set_configuration_property('store.write-behind', 'true')
+    clear_cache(DataType.CACHE)
+    released = threading.Event()
+    mocker.patch('main.store.memory.InMemoryStore.write_store',
+                 side_effect=lambda *args: released.wait())
+
+    write_store(DataType.CACHE, MOCK_VALUES, page_title='pending')
+
+    assert read_store(DataType.CACHE, page_title='pending') is MOCK_VALUES
+    assert len(query_store(DataType.CACHE, 'Header1', ['Row2Col1'], page_title='pending')) == 1
+    released.set()
+    flush_store()
+    assert read_store(DataType.CACHE, page_title='pending').empty
+
+def test_write_behind_coalesces_writes_into_batches(framework_setup, mocker):
+    ConfigurationService().set_configuration_property('store.write-behind', 'true')
+    clear_cache(DataType.CACHE)
+    released = threading.Event()
+    mocker.patch('main.store.memory.InMemoryStore.write_store',
+                 side_effect=lambda *args: released.wait())
+    write_pages = mocker.patch(
+        'main.store.memory.InMemoryStore.write_pages', create=True)
+    write_store(DataType.CACHE, MOCK_VALUES, page_title='first')
+    # the next writes queue up while the first one is being applied
+    time.sleep(0.1)
+
+    for page_title in ['second', 'third', 'second']:
+        write_store(DataType.CACHE, MOCK_VALUES.head(1), page_title=page_title)
+    released.set()
+    flush_store()
+
+    write_pages.assert_called_once()
+    assert list(write_pages.call_args.args[1]) == ['second', 'third']
+
+def test_write_behind_raises_errors_on_flush(framework_setup, mocker):
+    ConfigurationService().set_configuration_property('store.write-behind', 'true')
+    clear_cache(DataType.CACHE)
+    mocker.patch('main.store.memory.InMemoryStore.write_store', side_effect=OSError('disk full'))
+
+    write_store(DataType.CACHE, MOCK_VALUES, page_title='failed')
+
+    with pytest.raises(OSError, match='disk full'):
+        flush_store()
+    flush_store()
+
+def test_write_behind_writes_the_rest_of_a_batch_that_fails(framework_setup, mocker):
+    ConfigurationService().set_configuration_property('store.write-behind', 'true')
+    clear_cache(DataType.CACHE)
+    write_page = InMemoryStore.write_store
+    released = threading.Event()
+    def _write(store, data_type, data, page_title=''):
+        released.wait()
+        if page_title == 'second':
+            raise OSError('disk full')
+        write_page(store, data_type, data, page_title)
+    def _write_pages(store, data_type, pages):
+        for page_title, data in pages.items():
+            _write(store, data_type, data, page_title)
+    mocker.patch('main.store.memory.InMemoryStore.write_store', autospec=True, side_effect=_write)
+    mocker.patch('main.store.memory.InMemoryStore.write_pages', create=True,
+                 new=_write_pages)
+    write_store(DataType.CACHE, MOCK_VALUES, page_title='first')
+    # the next writes queue up while the first one is being applied
+    time.sleep(0.1)
+
+    for page_title in ['second', 'third', 'fourth']:
+        write_store(DataType.CACHE, MOCK_VALUES.head(1), page_title=page_title)
+    released.set()
+
+    with pytest.raises(OSError, match='disk full'):
+        flush_store()
+    assert read_store(DataType.CACHE, page_title='first').equals(MOCK_VALUES)
+    assert read_store(DataType.CACHE, page_title='second').empty
+    for page_title in ['third', 'fourth']:
+        assert read_store(DataType.CACHE, page_title=page_title).equals(MOCK_VALUES.head(1))
+
+def test_fingerprint_depends_only_on_values(tmp_path):
+    data = DataFrame({
+        'Name': ['Ivysaur', 'Ivysaur', 'Ivysaur', 'Pidgeot'],
+        'Type 2': ['Poison', 'Poison', 'Poison', ''],
+        'CP': [1498, 1498, 1498, 1555],
+        'Level': [20.5, 20.5, 20.5, 21.0],
+    })
+    data.to_csv(tmp_path / 'data.csv', index=False)
+    parsed = read_csv(tmp_path / 'data.csv', dtype={'CP': float})
+
+    assert get_fingerprint(compact(data)) == get_fingerprint(data)
+    assert get_fingerprint(parsed) == get_fingerprint(data)
+    assert get_fingerprint(data.assign(CP=1500)) != get_fingerprint(data)
@@ -1,10 +1,11 @@
-from googleapiclient.discovery import Resource
+import time
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from pandas import DataFrame
 import pytest
-from unittest.mock import call, patch, mock_open, MagicMock
+from unittest.mock import patch, mock_open, MagicMock
 
+from main.core.configuration import ConfigurationService
 from main.store import clear_cache, read_store, write_store, DataType
 
 from test.util import framework_setup
@@ -19,6 +20,31 @@ MOCK_VALUES = {
     ]
 }
 
+MOCK_FAST_ATTACK_VALUES = {
+    'values': [
+        ['Fast attack', 'Fast attack type', 'Fast attack duration', 'Fast attack damage', 'Fast attack energy generated'],
+        ['Vine Whip', 'Grass', 2, 5, 8],
+        ['Ember', 'Fire', 2, 7],
+    ]
+}
+
+class LocalSheetsService:
+    '''
+    A local stand-in for the spreadsheets resource of the Google Sheets API.
+    '''
+    def __init__(self, sheets):
+        self.sheets = sheets
+        self.batch_get_calls = []
+
+    def values(self):
+        return self
+
+    def batchGet(self, spreadsheetId, ranges, valueRenderOption):
+        self.batch_get_calls.append((spreadsheetId, ranges, valueRenderOption))
+        response = {'valueRanges': [
+            {'range': range_name, **self.sheets[(spreadsheetId, range_name)]} for range_name in ranges]}
+        return MagicMock(execute=MagicMock(return_value=response))
+
 @pytest.fixture
 def googlesheets_setup(mocker):
     mock_creds_from_file = mocker.patch('main.store.googlesheets.Credentials.from_authorized_user_file')
@@ -34,11 +60,11 @@ def googlesheets_setup(mocker):
     mock_flow_from_secrets_file.return_value = mock_flow
 
     mock_build = mocker.patch('main.store.googlesheets.build')
-    mock_sheets_service = MagicMock(spec=Resource)
-    mock_sheets_service.values = MagicMock()
-    mock_values = mock_sheets_service.values.return_value
-    mock_values.get.return_value.execute.return_value = MOCK_VALUES
-    mock_build.return_value.spreadsheets.return_value = mock_sheets_service
+    sheets_service = LocalSheetsService({
+        ('abcde12345', 'Charged Attacks!A1:D250'): MOCK_VALUES,
+        ('abcde12345', 'Fast Attacks!A1:E100'): MOCK_FAST_ATTACK_VALUES,
+    })
+    mock_build.return_value.spreadsheets.return_value = sheets_service
 
     mock_request = mocker.patch('main.store.googlesheets.Request')
 
@@ -49,7 +75,8 @@ def googlesheets_setup(mocker):
         'mock_creds': mock_creds,
         'mock_flow': mock_flow,
         'mock_flow_from_secrets_file': mock_flow_from_secrets_file,
-        'mock_values': mock_values,
+        'mock_build': mock_build,
+        'sheets_service': sheets_service,
         'mock_request': mock_request,
         'open_mock': open_mock
     }
@@ -62,9 +89,8 @@ def test_login_with_cached_token(mock_path_exists, framework_setup, googlesheets
     read_store(DataType.CHARGED_ATTACK_REFERENCE_DATA)
 
     mock_path_exists.assert_any_call('token.json')
-    mock_creds_from_file.assert_has_calls([
-        call('token.json', ['https://www.googleapis.com/auth/spreadsheets.readonly']),
-        call('token.json', ['https://www.googleapis.com/auth/spreadsheets.readonly'])])
+    mock_creds_from_file.assert_called_once_with(
+        'token.json', ['https://www.googleapis.com/auth/spreadsheets.readonly'])
 
 @patch('main.store.googlesheets.os.path.exists', return_value=False)
 def test_login_without_cached_token(mock_path_exists, framework_setup, googlesheets_setup):
@@ -96,14 +122,14 @@ def test_login_with_expired_token(mock_path_exists, framework_setup, googlesheet
 @patch('main.store.googlesheets.os.path.exists', return_value=True)
 def test_google_sheets_store_read_store(mock_path_exists, framework_setup, googlesheets_setup):
     clear_cache(DataType.CHARGED_ATTACK_REFERENCE_DATA)
-    mock_values = googlesheets_setup['mock_values']
+    sheets_service = googlesheets_setup['sheets_service']
 
     df = read_store(DataType.CHARGED_ATTACK_REFERENCE_DATA)
 
-    mock_values.get.assert_called_once_with(
-        spreadsheetId='abcde12345',
-        range='Charged Attacks!A1:D250',
-    )
+    assert sheets_service.batch_get_calls == [(
+        'abcde12345',
+        ['Charged Attacks!A1:D250', 'Fast Attacks!A1:E100'],
+        'UNFORMATTED_VALUE')]
 
     expected_df = DataFrame(
         columns=['Header1', 'Header2', 'Header3'],
@@ -124,4 +150,60 @@ def test_google_sheets_store_read_store_with_page_title(mock_path_exists, framew
 def test_google_sheets_store_write_store(mock_path_exists, framework_setup, googlesheets_setup):
     clear_cache(DataType.CHARGED_ATTACK_REFERENCE_DATA)
     with pytest.raises(Exception, match='Writing not supported for Google Sheets storage'):
-        write_store(DataType.CHARGED_ATTACK_REFERENCE_DATA, DataFrame())
\ No newline at end of file
+        write_store(DataType.CHARGED_ATTACK_REFERENCE_DATA, DataFrame())
+
+@patch('main.store.googlesheets.os.path.exists', return_value=True)
+def test_google_sheets_store_reads_batch_once(mock_path_exists, framework_setup, googlesheets_setup):
+    clear_cache(DataType.CHARGED_ATTACK_REFERENCE_DATA)
+    sheets_service = googlesheets_setup['sheets_service']
+
+    read_store(DataType.CHARGED_ATTACK_REFERENCE_DATA)
+    read_store(DataType.FAST_ATTACK_REFERENCE_DATA)
+    read_store(DataType.CHARGED_ATTACK_REFERENCE_DATA)
+
+    assert len(sheets_service.batch_get_calls) == 1
+
+@patch('main.store.googlesheets.os.path.exists', return_value=True)
+def test_google_sheets_store_converts_declared_columns(mock_path_exists, framework_setup, googlesheets_setup):
+    clear_cache(DataType.FAST_ATTACK_REFERENCE_DATA)
+
+    df = read_store(DataType.FAST_ATTACK_REFERENCE_DATA)
+
+    assert str(df['Fast attack duration'].dtype) == 'int64'
+    assert str(df['Fast attack damage'].dtype) == 'int64'
+    assert str(df['Fast attack energy generated'].dtype) == 'float64'
+    assert list(df['Fast attack']) == ['Vine Whip', 'Ember']
+
+def test_google_sheets_store_disk_cache(framework_setup, googlesheets_setup, tmp_path, mocker):
+    mocker.patch('main.store.googlesheets.open', open)
+    mocker.patch('main.store.googlesheets._login')
+    sheets_service = googlesheets_setup['sheets_service']
+    mock_build = googlesheets_setup['mock_build']
+    ConfigurationService().set_configuration_property('googlesheets.cache-directory', str(tmp_path))
+    ConfigurationService().set_configuration_property('googlesheets.cache-ttl', '3600')
+    clear_cache(DataType.CHARGED_ATTACK_REFERENCE_DATA)
+    first = read_store(DataType.CHARGED_ATTACK_REFERENCE_DATA)
+
+    clear_cache(DataType.CHARGED_ATTACK_REFERENCE_DATA)
+    second = read_store(DataType.CHARGED_ATTACK_REFERENCE_DATA)
+
+    assert second.equals(first)
+    assert len(sheets_service.batch_get_calls) == 1
+    assert mock_build.call_count == 1
+    assert (tmp_path / 'charged-attack-reference-data.json').exists()
+    assert (tmp_path / 'fast-attack-reference-data.json').exists()
+
+def test_google_sheets_store_disk_cache_expired(framework_setup, googlesheets_setup, tmp_path, mocker):
+    mocker.patch('main.store.googlesheets.open', open)
+    mocker.patch('main.store.googlesheets._login')
+    sheets_service = googlesheets_setup['sheets_service']
+    ConfigurationService().set_configuration_property('googlesheets.cache-directory', str(tmp_path))
+    ConfigurationService().set_configuration_property('googlesheets.cache-ttl', '3600')
+    clear_cache(DataType.CHARGED_ATTACK_REFERENCE_DATA)
+    read_store(DataType.CHARGED_ATTACK_REFERENCE_DATA)
+
+    with patch('main.store.googlesheets.time.time', return_value=time.time() + 7200):
+        clear_cache(DataType.CHARGED_ATTACK_REFERENCE_DATA)
+        read_store(DataType.CHARGED_ATTACK_REFERENCE_DATA)
+
+    assert len(sheets_service.batch_get_calls) == 2
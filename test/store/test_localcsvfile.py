@@ -2,8 +2,9 @@ from pandas import DataFrame
 import pytest
 from unittest.mock import call, patch, MagicMock
 
-from main.core.configuration import ConfigurationException
+from main.core.configuration import ConfigurationException, ConfigurationService
 from main.store import clear_cache, read_store, write_store, DataType
+from main.store.schema import ENRICHED_LIBRARY_SCHEMA
 
 from test.util import framework_setup
 
@@ -25,7 +26,11 @@ def localcsv_setup(mocker):
     mock_isdir.return_value = True
 
     mock_mkdir = mocker.patch('main.store.localcsvfile.os.mkdir')
-    
+
+    mock_stat = mocker.patch('main.store.localcsvfile.os.stat')
+    mock_stat.return_value.st_mtime_ns = 1
+    mock_stat.return_value.st_size = 1
+
     mock_open = mocker.patch('main.store.localcsvfile.open')
     mock_file = MagicMock()
     mock_open.return_value.__enter__.return_value = mock_file
@@ -35,6 +40,7 @@ def localcsv_setup(mocker):
         'mock_path_exists': mock_path_exists,
         'mock_isdir': mock_isdir,
         'mock_mkdir': mock_mkdir,
+        'mock_stat': mock_stat,
         'mock_open': mock_open,
         'mock_file': mock_file
     }
@@ -45,7 +51,9 @@ def test_read_store(framework_setup, localcsv_setup):
 
     df = read_store(DataType.ENRICHED_LIBRARY)
 
-    mock_read_csv.assert_called_once_with('test/temp/enriched-library.csv')
+    mock_read_csv.assert_called_once_with(
+        'test/temp/enriched-library.csv', dtype=ENRICHED_LIBRARY_SCHEMA,
+        float_precision='round_trip')
     assert df.equals(MOCK_VALUES)
 
 def test_read_store_paginated(framework_setup, localcsv_setup):
@@ -54,7 +62,9 @@ def test_read_store_paginated(framework_setup, localcsv_setup):
 
     df = read_store(DataType.ENRICHED_LIBRARY, page_title='page-title')
 
-    mock_read_csv.assert_called_once_with('test/temp/enriched-library.page-title.csv')
+    mock_read_csv.assert_called_once_with(
+        'test/temp/enriched-library.page-title.csv', dtype=ENRICHED_LIBRARY_SCHEMA,
+        float_precision='round_trip')
     assert df.equals(MOCK_VALUES)
 
 def test_read_store_cached(framework_setup, localcsv_setup):
@@ -64,7 +74,9 @@ def test_read_store_cached(framework_setup, localcsv_setup):
     read_store(DataType.ENRICHED_LIBRARY)
     df = read_store(DataType.ENRICHED_LIBRARY)
 
-    mock_read_csv.assert_called_once_with('test/temp/enriched-library.csv')
+    mock_read_csv.assert_called_once_with(
+        'test/temp/enriched-library.csv', dtype=ENRICHED_LIBRARY_SCHEMA,
+        float_precision='round_trip')
     assert df.equals(MOCK_VALUES)
 
 def test_read_store_directory_does_not_exist(framework_setup, localcsv_setup):
@@ -119,4 +131,26 @@ def test_read_store_after_write(framework_setup, localcsv_setup):
     write_store(data_type=DataType.ENRICHED_LIBRARY, data=data)
     df = read_store(DataType.ENRICHED_LIBRARY)
 
-    assert df == data
\ No newline at end of file
+    assert df == data
+
+def test_read_store_reloads_changed_file(framework_setup, localcsv_setup):
+    mock_read_csv = localcsv_setup['mock_read_csv']
+    mock_stat = localcsv_setup['mock_stat']
+    clear_cache(DataType.ENRICHED_LIBRARY)
+
+    read_store(DataType.ENRICHED_LIBRARY)
+    mock_stat.return_value.st_mtime_ns = 2
+    read_store(DataType.ENRICHED_LIBRARY)
+    read_store(DataType.ENRICHED_LIBRARY)
+
+    assert mock_read_csv.call_count == 2
+
+def test_read_store_reloads_evicted_file(framework_setup, localcsv_setup):
+    mock_read_csv = localcsv_setup['mock_read_csv']
+    clear_cache(DataType.ENRICHED_LIBRARY)
+    ConfigurationService().set_configuration_property('localcsvfile.cache-size', '1')
+
+    read_store(DataType.ENRICHED_LIBRARY)
+    read_store(DataType.ENRICHED_LIBRARY)
+
+    assert mock_read_csv.call_count == 2
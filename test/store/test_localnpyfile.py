@@ -0,0 +1,109 @@
+import numpy
+from pandas import DataFrame
+import pytest
+
+from main.core.configuration import ConfigurationException, ConfigurationService
+from main.store import clear_cache, read_store, write_store, DataType
+
+from test.util import framework_setup
+
+MOCK_VALUES = DataFrame({
+    'Name': ['Ivysaur', 'Charmander', 'Pidgeot'],
+    'Type 2': ['Poison', numpy.nan, 'Flying'],
+    'CP': [1498, 1099, 1555],
+    'Multiplier': [0.7527290867, 0.84529999, 0.6811649],
+    'Shadow': [False, True, False]
+})
+
+@pytest.fixture
+def localnpy_setup(tmp_path):
+    ConfigurationService().set_configuration_property('localnpyfile.directory', str(tmp_path))
+    clear_cache(DataType.PARTITION_RESULT)
+    yield tmp_path
+
+def _reopen() -> None:
+    # drop the in-process cache so that the next read goes to the file system
+    clear_cache(DataType.PARTITION_RESULT)
+
+def test_read_write(framework_setup, localnpy_setup):
+    write_store(DataType.PARTITION_RESULT, MOCK_VALUES)
+    _reopen()
+
+    df = read_store(DataType.PARTITION_RESULT)
+
+    assert df.equals(MOCK_VALUES)
+    assert list(df.dtypes) == list(MOCK_VALUES.dtypes)
+
+def test_read_write_paginated(framework_setup, localnpy_setup):
+    write_store(DataType.PARTITION_RESULT, MOCK_VALUES, page_title='page-title')
+    _reopen()
+
+    assert read_store(DataType.PARTITION_RESULT, page_title='page-title').equals(MOCK_VALUES)
+    assert read_store(DataType.PARTITION_RESULT).empty
+    assert (localnpy_setup / 'partition-result.page-title.columns' / 'schema.json').exists()
+
+def test_numeric_columns_are_memory_mapped(framework_setup, localnpy_setup):
+    write_store(DataType.PARTITION_RESULT, MOCK_VALUES)
+    _reopen()
+
+    df = read_store(DataType.PARTITION_RESULT)
+
+    assert isinstance(df['CP'].values, numpy.memmap)
+    assert isinstance(df['Multiplier'].values, numpy.memmap)
+
+def test_floats_round_trip_exactly(framework_setup, localnpy_setup):
+    data = DataFrame({'DPT 1': [1.0 / 3.0, 10.7142857142857, numpy.pi]})
+    write_store(DataType.PARTITION_RESULT, data)
+    _reopen()
+
+    assert (read_store(DataType.PARTITION_RESULT)['DPT 1'] == data['DPT 1']).all()
+
+def test_in_place_edits_do_not_reach_the_file(framework_setup, localnpy_setup):
+    write_store(DataType.PARTITION_RESULT, MOCK_VALUES)
+    _reopen()
+    read_store(DataType.PARTITION_RESULT)['CP'].values[0] = 0
+    _reopen()
+
+    assert read_store(DataType.PARTITION_RESULT)['CP'][0] == 1498
+
+def test_overwrite_keeps_earlier_reads_valid(framework_setup, localnpy_setup):
+    write_store(DataType.PARTITION_RESULT, MOCK_VALUES)
+    _reopen()
+    earlier = read_store(DataType.PARTITION_RESULT)
+
+    write_store(DataType.PARTITION_RESULT, MOCK_VALUES.head(1))
+    _reopen()
+
+    assert earlier['CP'].sum() == 4152
+    assert len(read_store(DataType.PARTITION_RESULT)) == 1
+
+def test_read_store_cached(framework_setup, localnpy_setup):
+    write_store(DataType.PARTITION_RESULT, MOCK_VALUES)
+
+    assert read_store(DataType.PARTITION_RESULT) is MOCK_VALUES
+
+def test_read_store_file_not_found(framework_setup, localnpy_setup):
+    assert read_store(DataType.PARTITION_RESULT, page_title='missing').empty
+
+def test_read_store_directory_is_not_directory(framework_setup, localnpy_setup):
+    not_a_directory = localnpy_setup / 'file'
+    not_a_directory.write_text('')
+    _reopen()
+    ConfigurationService().set_configuration_property(
+        'localnpyfile.directory', str(not_a_directory))
+
+    with pytest.raises(ConfigurationException, match='is not a directory'):
+        read_store(DataType.PARTITION_RESULT)
+
+def test_categories_round_trip(framework_setup, localnpy_setup):
+    data = DataFrame({
+        'Type 1': ['Grass', 'Fire', numpy.nan, 'Fire'],
+        'Fire': [1.6, 0.625, 1.0, 1.0],
+    }).astype('category')
+    write_store(DataType.PARTITION_RESULT, data)
+    _reopen()
+
+    df = read_store(DataType.PARTITION_RESULT)
+
+    assert df.equals(data)
+    assert df.to_dict('records') == data.to_dict('records')
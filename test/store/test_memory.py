@@ -1,6 +1,10 @@
+import os
 from pandas import DataFrame
 
+from main.core.configuration import ConfigurationService
 from main.store import clear_cache, read_store, write_store, DataType
+from main.store.cache import get_size
+from main.store.memory import InMemoryStore
 
 from test.util import framework_setup
 
@@ -20,4 +24,55 @@ def test_read_write_paginated(framework_setup):
 
 def test_read_cache_miss(framework_setup):
     clear_cache(DataType.CACHE)
-    assert read_store(DataType.CACHE).empty
\ No newline at end of file
+    assert read_store(DataType.CACHE).empty
+
+def test_read_write_spilled(framework_setup):
+    clear_cache(DataType.CACHE)
+    ConfigurationService().set_configuration_property('memory.cache-size', '1')
+    write_store(DataType.CACHE, MOCK_VALUES, page_title='page-1')
+    write_store(DataType.CACHE, MOCK_VALUES, page_title='page-2')
+
+    assert read_store(DataType.CACHE, page_title='page-1').equals(MOCK_VALUES)
+    assert read_store(DataType.CACHE, page_title='page-2').equals(MOCK_VALUES)
+    statistics = InMemoryStore().get_statistics()
+    assert statistics['cached'] == 0
+    assert statistics['evicted'] == 2
+    assert statistics['spilled'] == 2
+    assert statistics['reloaded'] == 2
+
+def test_read_spilled_larger_than_cache(framework_setup):
+    clear_cache(DataType.CACHE)
+    ConfigurationService().set_configuration_property('memory.cache-size', '1')
+    write_store(DataType.CACHE, MOCK_VALUES)
+
+    assert read_store(DataType.CACHE).equals(MOCK_VALUES)
+    assert read_store(DataType.CACHE).equals(MOCK_VALUES)
+    statistics = InMemoryStore().get_statistics()
+    assert statistics['cached'] == 0
+    assert statistics['spilled'] == 1
+    assert statistics['reloaded'] == 2
+
+def test_read_write_evicts_least_recently_used(framework_setup):
+    clear_cache(DataType.CACHE)
+    ConfigurationService().set_configuration_property(
+        'memory.cache-size', str(get_size(MOCK_VALUES) * 2))
+    write_store(DataType.CACHE, MOCK_VALUES, page_title='page-1')
+    write_store(DataType.CACHE, MOCK_VALUES, page_title='page-2')
+    read_store(DataType.CACHE, page_title='page-1')
+    write_store(DataType.CACHE, MOCK_VALUES, page_title='page-3')
+
+    statistics = InMemoryStore().get_statistics()
+    assert statistics['cached'] == 2
+    assert statistics['cached-bytes'] == get_size(MOCK_VALUES) * 2
+    assert 'cache.page-2' in InMemoryStore().spilled
+    assert read_store(DataType.CACHE, page_title='page-2').equals(MOCK_VALUES)
+
+def test_overwrite_spilled(framework_setup):
+    clear_cache(DataType.CACHE)
+    ConfigurationService().set_configuration_property('memory.cache-size', '1')
+    write_store(DataType.CACHE, MOCK_VALUES)
+    spilled_file = InMemoryStore().spilled['cache']
+    write_store(DataType.CACHE, MOCK_VALUES.head(1))
+
+    assert not os.path.exists(spilled_file)
+    assert read_store(DataType.CACHE).equals(MOCK_VALUES.head(1))
@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+import sqlite3
+
+import numpy
+from pandas import DataFrame
+import pytest
+
+from main.core.configuration import ConfigurationService
+from main.store import clear_cache, query_store, read_store, write_store, DataType
+from main.store.sqlite import SqliteStore
+
+from test.util import framework_setup
+
+MOCK_VALUES = DataFrame({
+    'Name': ['Ivysaur', 'Charmander', 'Pidgeot'],
+    'Type 2': ['Poison', numpy.nan, 'Flying'],
+    'CP': [1498, 1099, 1555],
+    'Multiplier': [0.7527290867, 0.84529999, 0.6811649],
+    'Shadow': [False, True, False]
+})
+
+@pytest.fixture
+def sqlite_setup(tmp_path):
+    database = str(tmp_path / 'test.db')
+    ConfigurationService().set_configuration_property('sqlite.database', database)
+    clear_cache(DataType.LIBRARY)
+    yield database
+
+def test_read_write(framework_setup, sqlite_setup):
+    write_store(DataType.LIBRARY, MOCK_VALUES)
+
+    df = read_store(DataType.LIBRARY)
+
+    assert df.equals(MOCK_VALUES)
+    assert list(df.dtypes) == list(MOCK_VALUES.dtypes)
+
+def test_read_write_paginated(framework_setup, sqlite_setup):
+    write_store(DataType.LIBRARY, MOCK_VALUES, page_title='page-1')
+    write_store(DataType.LIBRARY, MOCK_VALUES.head(1), page_title='page-2')
+
+    assert read_store(DataType.LIBRARY, page_title='page-1').equals(MOCK_VALUES)
+    assert read_store(DataType.LIBRARY, page_title='page-2').equals(MOCK_VALUES.head(1))
+    assert read_store(DataType.LIBRARY).empty
+
+def test_write_pages_in_one_transaction(framework_setup, sqlite_setup):
+    write_store(DataType.LIBRARY, MOCK_VALUES, page_title='page-1')
+    pages = {'page-1': MOCK_VALUES.head(1), 'page-2': DataFrame({'Name': [('Bulbasaur',)]})}
+
+    # the second page cannot be stored, so neither page is replaced
+    with pytest.raises(sqlite3.Error):
+        SqliteStore().write_pages(DataType.LIBRARY, pages)
+    assert read_store(DataType.LIBRARY, page_title='page-1').equals(MOCK_VALUES)
+    pages['page-2'] = MOCK_VALUES.tail(1)
+    SqliteStore().write_pages(DataType.LIBRARY, pages)
+
+    assert read_store(DataType.LIBRARY, page_title='page-1').equals(MOCK_VALUES.head(1))
+    assert read_store(DataType.LIBRARY, page_title='page-2').reset_index(drop=True).equals(
+        MOCK_VALUES.tail(1).reset_index(drop=True))
+
+def test_overwrite_page(framework_setup, sqlite_setup):
+    write_store(DataType.LIBRARY, MOCK_VALUES)
+    write_store(DataType.LIBRARY, DataFrame({'Name': ['Bulbasaur'], 'Level': [20.5]}))
+
+    assert read_store(DataType.LIBRARY).equals(DataFrame({'Name': ['Bulbasaur'], 'Level': [20.5]}))
+
+def test_read_cache_miss(framework_setup, sqlite_setup):
+    assert read_store(DataType.LIBRARY, page_title='missing').empty
+
+def test_query_store(framework_setup, sqlite_setup):
+    write_store(DataType.LIBRARY, MOCK_VALUES, page_title='page-1')
+    write_store(DataType.LIBRARY, MOCK_VALUES, page_title='page-2')
+
+    df = query_store(DataType.LIBRARY, 'Name', ['Pidgeot', 'Ivysaur'], page_title='page-1')
+
+    assert list(df['Name']) == ['Ivysaur', 'Pidgeot']
+    assert list(df['CP']) == [1498, 1555]
+
+def test_query_store_uses_index(framework_setup, sqlite_setup):
+    write_store(DataType.LIBRARY, MOCK_VALUES)
+
+    with sqlite3.connect(sqlite_setup) as connection:
+        plan = connection.execute(
+            'EXPLAIN QUERY PLAN SELECT * FROM library WHERE page_title = ? AND "Name" IN (?)',
+            ('', 'Ivysaur')).fetchall()
+
+    assert 'library_Name' in str(plan)
+
+def test_database_uses_write_ahead_logging(framework_setup, sqlite_setup):
+    write_store(DataType.LIBRARY, MOCK_VALUES)
+
+    with sqlite3.connect(sqlite_setup) as connection:
+        assert connection.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+def test_concurrent_reads(framework_setup, sqlite_setup):
+    write_store(DataType.LIBRARY, MOCK_VALUES)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: read_store(DataType.LIBRARY), range(16)))
+
+    assert all(result.equals(MOCK_VALUES) for result in results)
+
+def test_query_store_without_index_support(framework_setup):
+    write_store(DataType.CACHE, MOCK_VALUES)
+
+    df = query_store(DataType.CACHE, 'Name', ['Charmander'])
+
+    assert list(df['CP']) == [1099]